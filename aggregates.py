@@ -0,0 +1,210 @@
+"""
+Team-, head-to-head- and venue-strength features from match history.
+
+For every match in matches.csv, computed strictly from matches played on
+earlier dates (same-day matches never see each other's results):
+
+* batting_form / bowling_form: each side's win rate over its last
+  FORM_WINDOW matches,
+* head_to_head: the batting side's win rate against this opponent,
+* venue_chase_rate: share of decided matches at the city won chasing,
+* venue_par: mean first-innings total at the city.
+
+Rates are smoothed towards 0.5 and par towards the league mean with a few
+pseudo-matches, so a team's or venue's first games get neutral values
+instead of 0/0.
+
+StrengthTable keeps these as-of values per (match, team) for training and
+backtesting, plus a snapshot after the latest match in arrays indexed by
+integer team/city codes, so serving costs a dict lookup and an array
+index per row. It is saved next to the model as strength.npz.
+"""
+import io
+from collections import defaultdict, deque
+
+import numpy as np
+import pandas as pd
+
+from artifact import atomic_write
+from schema import canonical_city, canonical_team
+
+STRENGTH_FEATURES = ['batting_form', 'bowling_form', 'head_to_head', 'venue_chase_rate',
+                     'venue_par']
+DEFAULT_STRENGTH_PATH = "strength.npz"
+FORM_WINDOW = 10
+PRIOR_MATCHES = 2
+PAR_PRIOR_MATCHES = 3
+DEFAULT_PAR = 160.0
+
+
+def _rate(wins, played, prior=PRIOR_MATCHES):
+    return (wins + 0.5 * prior) / (played + prior)
+
+
+def _par(total, played, league_par):
+    return (total + PAR_PRIOR_MATCHES * league_par) / (played + PAR_PRIOR_MATCHES)
+
+
+def _canonical(name, canonicalize):
+    if pd.isna(name):
+        return None
+    return canonicalize(name) or str(name)
+
+
+def match_dates(match):
+    return pd.to_datetime(match['date'], format="%d-%m-%Y", errors="coerce").fillna(
+        pd.to_datetime(match['date'], dayfirst=True, errors="coerce"))
+
+
+class StrengthTable:
+    """As-of strength features per match plus an O(1) snapshot for inference"""
+
+    def __init__(self, teams, cities, form, h2h, venue_chase, venue_par, league_par,
+                 team_rows, venue_rows):
+        self.teams = list(teams)
+        self.cities = list(cities)
+        self.form = form                # (n_teams,)
+        self.h2h = h2h                  # (n_teams, n_teams) row team vs column team
+        self.venue_chase = venue_chase  # (n_cities,)
+        self.venue_par = venue_par      # (n_cities,)
+        self.league_par = float(league_par)
+        self.team_rows = team_rows      # match_id, team, form, head_to_head (vs opponent)
+        self.venue_rows = venue_rows    # match_id, venue_chase_rate, venue_par
+        self._team_codes = {t: i for i, t in enumerate(self.teams)}
+        self._city_codes = {c: i for i, c in enumerate(self.cities)}
+
+    @classmethod
+    def build(cls, match, first_innings=None):
+        """match: matches.csv frame; first_innings: match_id -> first-innings total (optional)"""
+        df = pd.DataFrame({
+            "match_id": match['id'].to_numpy(),
+            "date": match_dates(match).to_numpy(),
+            "team1": [_canonical(t, canonical_team) for t in match['team1']],
+            "team2": [_canonical(t, canonical_team) for t in match['team2']],
+            "winner": [_canonical(t, canonical_team) for t in match['winner']],
+            "city": [_canonical(c, canonical_city) for c in match['city']],
+            "chased": match['win_by_wickets'].to_numpy() > 0,
+        })
+        totals = {} if first_innings is None else dict(zip(first_innings['match_id'],
+                                                           first_innings['total_runs']))
+        df = df.sort_values(["date", "match_id"], kind="stable")
+
+        recent = defaultdict(lambda: deque(maxlen=FORM_WINDOW))
+        meetings = defaultdict(lambda: [0, 0])      # (team, opponent) -> [wins, played]
+        venue = defaultdict(lambda: [0, 0, 0.0, 0])  # city -> [chase wins, decided, runs, innings]
+        league = [0.0, 0]
+        team_rows, venue_rows = [], []
+
+        for _, day in df.groupby("date", sort=True):
+            # Features for every match on this date first, then update the state
+            league_par = league[0] / league[1] if league[1] else DEFAULT_PAR
+            for m in day.itertuples(index=False):
+                for team, opponent in ((m.team1, m.team2), (m.team2, m.team1)):
+                    form = recent[team]
+                    wins, played = meetings[(team, opponent)]
+                    team_rows.append((m.match_id, team, _rate(sum(form), len(form)),
+                                      _rate(wins, played)))
+                chase_wins, decided, runs, innings = venue[m.city]
+                venue_rows.append((m.match_id, _rate(chase_wins, decided),
+                                   _par(runs, innings, league_par)))
+            for m in day.itertuples(index=False):
+                if m.winner is not None:
+                    for team, opponent in ((m.team1, m.team2), (m.team2, m.team1)):
+                        won = int(m.winner == team)
+                        recent[team].append(won)
+                        meetings[(team, opponent)][0] += won
+                        meetings[(team, opponent)][1] += 1
+                    venue[m.city][0] += int(m.chased)
+                    venue[m.city][1] += 1
+                if m.match_id in totals:
+                    venue[m.city][2] += totals[m.match_id]
+                    venue[m.city][3] += 1
+                    league[0] += totals[m.match_id]
+                    league[1] += 1
+
+        teams = sorted({t for t in df['team1']} | {t for t in df['team2']})
+        cities = sorted(c for c in venue if c is not None)
+        league_par = league[0] / league[1] if league[1] else DEFAULT_PAR
+        codes = {t: i for i, t in enumerate(teams)}
+        h2h = np.full((len(teams), len(teams)), 0.5)
+        for (team, opponent), (wins, played) in meetings.items():
+            h2h[codes[team], codes[opponent]] = _rate(wins, played)
+        return cls(
+            teams, cities,
+            np.array([_rate(sum(recent[t]), len(recent[t])) for t in teams]),
+            h2h,
+            np.array([_rate(venue[c][0], venue[c][1]) for c in cities]),
+            np.array([_par(venue[c][2], venue[c][3], league_par) for c in cities]),
+            league_par,
+            pd.DataFrame(team_rows, columns=["match_id", "team", "form", "head_to_head"]),
+            pd.DataFrame(venue_rows, columns=["match_id", "venue_chase_rate", "venue_par"]),
+        )
+
+    def as_of_match(self, states):
+        """Strength columns for states with match_id, batting_team, bowling_team"""
+        rows = self.team_rows.set_index(["match_id", "team"])
+        keys = pd.MultiIndex.from_arrays([states['match_id'], states['batting_team']])
+        bat = rows.reindex(keys)
+        bowl = rows['form'].reindex(pd.MultiIndex.from_arrays([states['match_id'],
+                                                               states['bowling_team']]))
+        ven = self.venue_rows.set_index("match_id").reindex(states['match_id'])
+        return pd.DataFrame({
+            "batting_form": bat['form'].to_numpy(),
+            "bowling_form": bowl.to_numpy(),
+            "head_to_head": bat['head_to_head'].to_numpy(),
+            "venue_chase_rate": ven['venue_chase_rate'].to_numpy(),
+            "venue_par": ven['venue_par'].to_numpy(),
+        }, index=states.index)
+
+    def lookup(self, batting_team, bowling_team, city):
+        """Current strength columns for arrays of (canonical) names; unknown -> neutral"""
+        bat = self._codes(batting_team, self._team_codes)
+        bowl = self._codes(bowling_team, self._team_codes)
+        ven = self._codes(city, self._city_codes)
+        known_pair = (bat >= 0) & (bowl >= 0)
+        return {
+            "batting_form": np.where(bat >= 0, self.form[bat], 0.5),
+            "bowling_form": np.where(bowl >= 0, self.form[bowl], 0.5),
+            "head_to_head": np.where(known_pair, self.h2h[bat, bowl], 0.5),
+            "venue_chase_rate": np.where(ven >= 0, self.venue_chase[ven], 0.5),
+            "venue_par": np.where(ven >= 0, self.venue_par[ven], self.league_par),
+        }
+
+    def add_features(self, features):
+        """Model feature frame with the strength columns appended (inference)"""
+        out = features.copy()
+        for column, values in self.lookup(features['batting_team'], features['bowling_team'],
+                                          features['city']).items():
+            out[column] = values
+        return out
+
+    @staticmethod
+    def _codes(names, codes):
+        return np.fromiter((codes.get(n, -1) for n in names), dtype=np.intp,
+                           count=len(names))
+
+    def save(self, path=DEFAULT_STRENGTH_PATH):
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer, teams=np.array(self.teams), cities=np.array(self.cities), form=self.form,
+            h2h=self.h2h, venue_chase=self.venue_chase, venue_par=self.venue_par,
+            league_par=self.league_par,
+            team_match=self.team_rows['match_id'].to_numpy(),
+            team_name=self.team_rows['team'].to_numpy(dtype=str),
+            team_values=self.team_rows[['form', 'head_to_head']].to_numpy(),
+            venue_match=self.venue_rows['match_id'].to_numpy(),
+            venue_values=self.venue_rows[['venue_chase_rate', 'venue_par']].to_numpy(),
+        )
+        atomic_write(path, buffer.getvalue())
+
+    @classmethod
+    def load(cls, path=DEFAULT_STRENGTH_PATH):
+        with np.load(path) as z:
+            team_rows = pd.DataFrame(z['team_values'], columns=["form", "head_to_head"])
+            team_rows.insert(0, "team", z['team_name'].astype(object))
+            team_rows.insert(0, "match_id", z['team_match'])
+            venue_rows = pd.DataFrame(z['venue_values'], columns=["venue_chase_rate", "venue_par"])
+            venue_rows.insert(0, "match_id", z['venue_match'])
+            return cls(z['teams'].tolist(), z['cities'].tolist(), z['form'], z['h2h'],
+                       z['venue_chase'], z['venue_par'], float(z['league_par']),
+                       team_rows, venue_rows)
@@ -1,9 +1,22 @@
 import streamlit as st
-import pickle
 import pandas as pd
 import numpy as np
 import os
 import time
+import uuid
+
+import artifact
+import assets
+import metrics
+import prediction_cache
+import profiling
+import schema
+from aggregates import StrengthTable
+from ensemble import DEFAULT_ENSEMBLE_PATH, DEFAULT_LEVEL
+from first_innings import DEFAULT_FIRST_INNINGS_PATH
+from prediction_log import PredictionLogger
+from registry import ModelRegistry
+from situations import DEFAULT_SITUATIONS_PATH, SituationIndex
 
 # ---------------------------------------------------------
 # PAGE CONFIG
@@ -25,6 +38,7 @@ defaults = {
     "target": 189,
     "overs": 14,
     "balls": 2,
+    "max_overs": 20,
     "prediction_made": False,
     "show_loading": False,
     "toast_message": None,
@@ -32,350 +46,170 @@ defaults = {
     "win": 0,
     "loss": 0,
     "batting_team": None,
-    "bowling_team": None
+    "bowling_team": None,
+    "contributions": None,
+    "win_interval": None,
+    "similar": None,
+    "innings": 2,
+    "projection": None
 }
 
 for key, val in defaults.items():
     if key not in st.session_state:
         st.session_state[key] = val
 
+# A/B routing key: one model version per session
+if "route_key" not in st.session_state:
+    st.session_state.route_key = uuid.uuid4().hex
+
+# Per-rerun profile when IPL_PROFILE is set (a no-op otherwise); stopped at
+# the end of the script or by rerun(). A run cut short by a widget rerun is
+# stopped when the next run on this thread starts its "rerun" section.
+rerun_profile = profiling.start("rerun")
+
+def rerun():
+    rerun_profile.stop()
+    st.rerun()
+
 # ---------------------------------------------------------
 # STATIC DATA
 # ---------------------------------------------------------
-teams = [
-    'Sunrisers Hyderabad', 'Mumbai Indians', 'Royal Challengers Bangalore',
-    'Kolkata Knight Riders', 'Kings XI Punjab', 'Chennai Super Kings',
-    'Rajasthan Royals', 'Delhi Capitals'
-]
-
-cities = [
-    'Hyderabad', 'Bangalore', 'Mumbai', 'Indore', 'Kolkata', 'Delhi',
-    'Chandigarh', 'Jaipur', 'Chennai', 'Cape Town', 'Port Elizabeth',
-    'Durban', 'Centurion', 'East London', 'Johannesburg', 'Kimberley',
-    'Bloemfontein', 'Ahmedabad', 'Cuttack', 'Nagpur', 'Dharamsala',
-    'Visakhapatnam', 'Pune', 'Raipur', 'Ranchi', 'Abu Dhabi',
-    'Sharjah', 'Mohali', 'Bengaluru'
-]
-
-team_icons = {
-    'Sunrisers Hyderabad': '🌅',
-    'Mumbai Indians': '🔵',
-    'Royal Challengers Bangalore': '❤️‍🔥',
-    'Kolkata Knight Riders': '💜',
-    'Kings XI Punjab': '❤️',
-    'Chennai Super Kings': '💛',
-    'Rajasthan Royals': '💙',
-    'Delhi Capitals': '🔷'
-}
+teams = schema.TEAMS
+cities = schema.CITIES
+
+team_icons = schema.TEAM_ICONS
 
 # ---------------------------------------------------------
 # LOAD MODEL
 # ---------------------------------------------------------
 @st.cache_resource(ttl=None)
 def load_model():
-    """Load the machine learning model with error handling"""
+    """Load the newest model artifact that passes its manifest check"""
+    start = time.perf_counter()
     try:
-        model_path = "pipe.pkl"
-        with open(model_path, "rb") as f:
-            model = pickle.load(f)
-        return model
-    except FileNotFoundError:
-        st.error("⚠️ Model file (pipe.pkl) not found!")
+        with profiling.section("model-load"):
+            loaded = artifact.load_verified("pipe.pkl", "pipe.pkl.backup")
+    except artifact.ArtifactError as e:
+        metrics.ERRORS.labels(type(e).__name__).inc()
+        st.error(f"⚠️ No usable model file: {e}")
         return None
     except Exception as e:
+        metrics.ERRORS.labels(type(e).__name__).inc()
         st.error(f"⚠️ Error loading model: {str(e)}")
         import traceback
         st.error(f"```\n{traceback.format_exc()}\n```")
         return None
+    metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - start)
+    metrics.MODEL_VERIFY_SECONDS.set(loaded.verify_seconds)
+    metrics.MODEL_FALLBACK.set(1 if loaded.problems else 0)
+    if loaded.problems:
+        metrics.ERRORS.labels("ArtifactError").inc(len(loaded.problems))
+        st.warning(f"⚠️ Serving last good model ({loaded.path}): {'; '.join(loaded.problems)}")
+    return loaded
+
+@st.cache_resource
+def start_metrics_server():
+    """Expose Prometheus metrics on IPL_METRICS_PORT (0 disables)"""
+    port = int(os.environ.get("IPL_METRICS_PORT", "9108"))
+    if not port:
+        return None
+    try:
+        return metrics.start_http_server(port, metrics.REGISTRY)
+    except OSError:
+        # Another replica on this host already owns the port
+        return None
+
+start_metrics_server()
+model_artifact = load_model()
+pipe = model_artifact.model if model_artifact is not None else None
+
+@st.cache_resource
+def get_registry(_artifact):
+    """Served model plus optional challenger/shadow versions from the environment"""
+    registry = ModelRegistry()
+    registry.promote(registry.register(_artifact.model, _artifact.version, _artifact.path))
+    try:
+        registry.configure_from_env()
+    except (artifact.ArtifactError, KeyError, ValueError) as e:
+        metrics.ERRORS.labels(type(e).__name__).inc()
+        st.warning(f"⚠️ Challenger/shadow models not loaded: {e}")
+    try:
+        registry.cache = prediction_cache.from_env()
+    except (OSError, ValueError) as e:
+        metrics.ERRORS.labels(type(e).__name__).inc()
+        st.warning(f"⚠️ Prediction cache disabled: {e}")
+    return registry
+
+# Contribution bars shown in the results panel, in display order
+contribution_labels = {
+    'batting_team': 'Batting team',
+    'bowling_team': 'Bowling team',
+    'city': 'Venue',
+    'runs_left': 'Runs left',
+    'balls_left': 'Balls left',
+    'wickets': 'Wickets in hand',
+    'rrr': 'Required rate'
+}
+
+@st.cache_resource
+def get_ensemble():
+    """Bootstrap ensemble for confidence intervals, if one was trained"""
+    if not os.path.exists(DEFAULT_ENSEMBLE_PATH):
+        return None
+    try:
+        return artifact.verify_artifact(DEFAULT_ENSEMBLE_PATH).model
+    except artifact.ArtifactError as e:
+        metrics.ERRORS.labels(type(e).__name__).inc()
+        st.warning(f"⚠️ Confidence intervals unavailable: {e}")
+        return None
 
-pipe = load_model()
+@st.cache_resource
+def get_first_innings_artifact():
+    """Projected-total / batting-first win model (verified artifact), if one was trained"""
+    if not os.path.exists(DEFAULT_FIRST_INNINGS_PATH):
+        return None
+    try:
+        return artifact.verify_artifact(DEFAULT_FIRST_INNINGS_PATH)
+    except artifact.ArtifactError as e:
+        metrics.ERRORS.labels(type(e).__name__).inc()
+        st.warning(f"⚠️ First-innings projections unavailable: {e}")
+        return None
+
+@st.cache_resource
+def get_strength_table():
+    """Team/venue strength snapshot for models trained with strength features"""
+    try:
+        return StrengthTable.load("strength.npz")
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource
+def get_situation_index():
+    """Historical chase states for the nearest-situations panel, if built"""
+    try:
+        return SituationIndex.load(DEFAULT_SITUATIONS_PATH)
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource
+def get_prediction_logger():
+    """One background log writer shared by all sessions"""
+    return PredictionLogger()
 
 # ---------------------------------------------------------
 # THEMES
 # ---------------------------------------------------------
-themes = {
-    'dark': {
-        'bg_gradient': 'linear-gradient(135deg, #0f172a 0%, #1e293b 50%, #0f172a 100%)',
-        'text': 'white',
-        'card': 'rgba(255,255,255,0.05)',
-        'border': 'rgba(255,255,255,0.2)',
-        'primary': '#3b82f6',
-        'secondary': '#a855f7',
-        'success': '#10b981',
-        'danger': '#ef4444',
-        'warning': '#f59e0b'
-    },
-    'light': {
-        'bg_gradient': 'linear-gradient(135deg, #f8fafc 0%, #e2e8f0 50%, #f8fafc 100%)',
-        'text': '#1e293b',
-        'card': 'rgba(255,255,255,0.95)',
-        'border': 'rgba(0,0,0,0.1)',
-        'primary': '#3b82f6',
-        'secondary': '#a855f7',
-        'success': '#10b981',
-        'danger': '#ef4444',
-        'warning': '#f59e0b'
-    }
-}
+themes = assets.THEMES
 
 T = themes[st.session_state.theme]
 
 # ---------------------------------------------------------
 # CSS STYLES
 # ---------------------------------------------------------
-st.markdown(f"""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap');
-    @import url('https://fonts.googleapis.com/icon?family=Material+Icons');
-    
-    * {{
-        font-family: 'Inter', sans-serif;
-    }}
-    
-    .stApp {{
-        background: {T['bg_gradient']};
-        color: {T['text']};
-    }}
-
-    /* Hide Streamlit Branding */
-    #MainMenu, footer {{visibility: hidden;}}
-    
-    /* Hide default padding */
-    .block-container {{
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-    }}
-
-    /* MAIN TITLE */
-    .title {{
-        text-align: center;
-        font-size: 3rem;
-        font-weight: 800;
-        background: linear-gradient(135deg, {T['primary']} 0%, {T['secondary']} 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        margin-bottom: 1rem;
-        animation: slideDown 0.6s ease-out;
-    }}
-    
-    /* Team VS Header */
-    .vs-header {{
-        text-align: center;
-        font-size: 1.5rem;
-        font-weight: 700;
-        margin: 1.5rem 0;
-        padding: 1rem;
-        background: {T['card']};
-        border-radius: 16px;
-        border: 1px solid {T['border']};
-        backdrop-filter: blur(10px);
-    }}
-    
-    .vs-text {{
-        color: {T['secondary']};
-        font-size: 1.2rem;
-        margin: 0 1rem;
-    }}
-
-    /* CARDS */
-    .card {{
-        background: {T['card']};
-        padding: 2rem;
-        border-radius: 20px;
-        border: 1px solid {T['border']};
-        backdrop-filter: blur(20px);
-        box-shadow: 0 8px 32px rgba(0,0,0,0.1);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }}
-    
-    .card:hover {{
-        transform: translateY(-4px);
-        box-shadow: 0 12px 48px rgba(0,0,0,0.15);
-    }}
-    
-    /* Metric Cards */
-    .metric-card {{
-        background: {T['card']};
-        padding: 1rem;
-        border-radius: 12px;
-        border: 1px solid {T['border']};
-        text-align: center;
-        margin: 0.5rem 0;
-    }}
-    
-    .metric-label {{
-        font-size: 0.85rem;
-        opacity: 0.7;
-        margin-bottom: 0.5rem;
-    }}
-    
-    .metric-value {{
-        font-size: 1.8rem;
-        font-weight: 700;
-        color: {T['primary']};
-    }}
-
-    /* INPUT LABELS */
-    .input-label {{
-        font-size: 0.9rem;
-        font-weight: 600;
-        color: {T['text']};
-        opacity: 0.8;
-        margin-bottom: 0.5rem;
-        text-align: center;
-    }}
-
-    /* TOAST NOTIFICATIONS */
-    .toast {{
-        position: fixed;
-        top: 80px;
-        right: 20px;
-        padding: 16px 24px;
-        border-radius: 12px;
-        font-weight: 600;
-        color: white;
-        z-index: 9999;
-        animation: slideIn 0.3s ease-out, fadeOut 0.5s ease-out 2.5s forwards;
-        box-shadow: 0 8px 24px rgba(0,0,0,0.2);
-    }}
-    .toast-error {{ background: {T['danger']}; }}
-    .toast-warning {{ background: {T['warning']}; }}
-    .toast-success {{ background: {T['success']}; }}
-
-    @keyframes slideIn {{
-        from {{ transform: translateX(400px); opacity: 0; }}
-        to {{ transform: translateX(0); opacity: 1; }}
-    }}
-    
-    @keyframes fadeOut {{
-        to {{ opacity: 0; transform: translateX(100px); }}
-    }}
-    
-    @keyframes slideDown {{
-        from {{ transform: translateY(-50px); opacity: 0; }}
-        to {{ transform: translateY(0); opacity: 1; }}
-    }}
-
-    /* WIN PROBABILITY RING */
-    .ring {{
-        width: 280px;
-        height: 280px;
-        margin: 2rem auto;
-        position: relative;
-    }}
-    .ring-center {{
-        position: absolute;
-        top: 50%; 
-        left: 50%;
-        transform: translate(-50%, -50%);
-        text-align: center;
-    }}
-    
-    .ring-percentage {{
-        font-size: 3.5rem;
-        font-weight: 800;
-        background: linear-gradient(135deg, {T['primary']} 0%, {T['secondary']} 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }}
-    
-    .ring-label {{
-        opacity: 0.7;
-        font-size: 0.9rem;
-        margin-top: 0.5rem;
-    }}
-    
-    /* Match Ended Card */
-    .match-ended {{
-        background: linear-gradient(135deg, {T['danger']} 0%, {T['warning']} 100%);
-        color: white;
-        padding: 2rem;
-        border-radius: 16px;
-        text-align: center;
-        font-size: 1.5rem;
-        font-weight: 700;
-        animation: pulse 2s infinite;
-        margin: 2rem 0;
-    }}
-    
-    @keyframes pulse {{
-        0%, 100% {{ transform: scale(1); }}
-        50% {{ transform: scale(1.02); }}
-    }}
-    
-    /* Probability Bars */
-    .prob-bar {{
-        height: 40px;
-        border-radius: 20px;
-        overflow: hidden;
-        background: {T['card']};
-        border: 1px solid {T['border']};
-        margin: 0.5rem 0;
-        position: relative;
-    }}
-    
-    .prob-fill {{
-        height: 100%;
-        transition: width 1s ease-out;
-        display: flex;
-        align-items: center;
-        justify-content: flex-end;
-        padding-right: 1rem;
-        font-weight: 700;
-        color: white;
-    }}
-    
-    /* Theme Toggle */
-    .theme-toggle {{
-        position: fixed;
-        top: 20px;
-        left: 20px;
-        background: {T['card']};
-        border: 1px solid {T['border']};
-        padding: 8px 12px;
-        border-radius: 12px;
-        cursor: pointer;
-        backdrop-filter: blur(10px);
-        z-index: 999;
-        font-size: 1.2rem;
-    }}
-    
-    /* Stepper Controls */
-    .stepper {{
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        gap: 1rem;
-        margin: 1rem 0;
-    }}
-    
-    .stepper-btn {{
-        background: {T['primary']};
-        color: white;
-        border: none;
-        width: 40px;
-        height: 40px;
-        border-radius: 50%;
-        font-size: 1.5rem;
-        font-weight: 700;
-        cursor: pointer;
-        transition: all 0.2s ease;
-    }}
-    
-    .stepper-btn:hover {{
-        transform: scale(1.1);
-        box-shadow: 0 4px 12px rgba(59, 130, 246, 0.4);
-    }}
-    
-    .stepper-value {{
-        font-size: 2rem;
-        font-weight: 700;
-        min-width: 100px;
-        text-align: center;
-    }}
-
-</style>
-""", unsafe_allow_html=True)
+# Compiled once per theme into static/ and linked, so the browser caches it
+# instead of every rerun resending it; inlined if static serving is off
+st.markdown(assets.stylesheet(st.session_state.theme, st.get_option("server.enableStaticServing")),
+            unsafe_allow_html=True)
 
 # ---------------------------------------------------------
 # HELPER FUNCTIONS
@@ -388,11 +222,8 @@ def toast(msg, type="error"):
 def render_toast():
     """Render active toast notification"""
     if st.session_state.toast_message:
-        st.markdown(f"""
-        <div class="toast toast-{st.session_state.toast_type}">
-            {st.session_state.toast_message}
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("toast", type=st.session_state.toast_type,
+                                message=st.session_state.toast_message), unsafe_allow_html=True)
         st.session_state.toast_message = None
 
 def format_overs(overs, balls):
@@ -403,6 +234,22 @@ def calculate_total_balls(overs, balls):
     """Convert overs and balls to total balls"""
     return overs * 6 + balls
 
+def step_overs(delta):
+    """Stepper callback: move the overs counter within 0 and the overs per side"""
+    value = st.session_state.overs + delta
+    if value > st.session_state.max_overs:
+        toast(f"⚠️ Maximum {st.session_state.max_overs} overs!", "warning")
+    elif value >= 0:
+        st.session_state.overs = value
+
+def step_balls(delta):
+    """Stepper callback: move the balls counter within 0-5"""
+    value = st.session_state.balls + delta
+    if value > 5:
+        toast("⚠️ Maximum 5 balls!", "warning")
+    elif value >= 0:
+        st.session_state.balls = value
+
 
 # ---------------------------------------------------------
 # THEME TOGGLE
@@ -415,7 +262,7 @@ with st.sidebar:
     theme_label = "🌙 Dark Mode" if st.session_state.theme == "dark" else "☀️ Light Mode"
     if st.button(theme_label, use_container_width=True):
         st.session_state.theme = "light" if st.session_state.theme == "dark" else "dark"
-        st.rerun()
+        rerun()
     
     st.divider()
     
@@ -423,44 +270,39 @@ with st.sidebar:
     if st.button("🔄 Reset All", use_container_width=True, type="primary"):
         for key, val in defaults.items():
             st.session_state[key] = val
-        st.rerun()
+        rerun()
     
     # Add cache clear button for troubleshooting
     st.divider()
     st.caption("Troubleshooting")
     if st.button("🔧 Clear Model Cache", use_container_width=True):
-        st.cache_resource.clear()
+        # Only the model loaders: the metrics server and prediction logger
+        # must keep running (a second metrics server cannot bind the port)
+        for loader in (load_model, get_registry, get_ensemble, get_first_innings_artifact,
+                       get_strength_table, get_situation_index):
+            loader.clear()
         st.success("Cache cleared! Refreshing...")
-        st.rerun()
+        rerun()
 
 # ---------------------------------------------------------
 # HEADER
 # ---------------------------------------------------------
-st.markdown("<div class='title'>🏏 IPL Win Predictor</div>", unsafe_allow_html=True)
+st.markdown(assets.html("title", text="🏏 IPL Win Predictor"), unsafe_allow_html=True)
 
 # Display selected teams if prediction has been made
 if st.session_state.prediction_made and st.session_state.batting_team and st.session_state.bowling_team:
     bat_icon = team_icons.get(st.session_state.batting_team, "🏏")
     bowl_icon = team_icons.get(st.session_state.bowling_team, "🏏")
-    st.markdown(f"""
-    <div class="vs-header">
-        <span>{bat_icon} {st.session_state.batting_team}</span>
-        <span class="vs-text">VS</span>
-        <span>{bowl_icon} {st.session_state.bowling_team}</span>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(assets.html("vs_header", bat_icon=bat_icon, bat=st.session_state.batting_team,
+                            bowl_icon=bowl_icon, bowl=st.session_state.bowling_team),
+                unsafe_allow_html=True)
 
 st.markdown("<br>", unsafe_allow_html=True)
 
-# ---------------------------------------------------------
-# MAIN LAYOUT
-# ---------------------------------------------------------
-left_col, right_col = st.columns([1, 1], gap="large")
-
 # ==========================
 # LEFT COLUMN – INPUT FORM
 # ==========================
-with left_col:
+def render_inputs():
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("⚡ Match Configuration")
     
@@ -469,13 +311,11 @@ with left_col:
     
     with col_bat:
         bat = st.selectbox("🏏 Batting Team", teams, key="select_bat")
-        st.markdown(f"<div style='text-align:center; font-size:3rem;'>{team_icons[bat]}</div>", 
-                   unsafe_allow_html=True)
+        st.markdown(assets.html("team_icon", icon=team_icons[bat]), unsafe_allow_html=True)
     
     with col_bowl:
         bowl = st.selectbox("🎯 Bowling Team", teams, key="select_bowl")
-        st.markdown(f"<div style='text-align:center; font-size:3rem;'>{team_icons[bowl]}</div>", 
-                   unsafe_allow_html=True)
+        st.markdown(assets.html("team_icon", icon=team_icons[bowl]), unsafe_allow_html=True)
     
     # Validation: Same team check
     if bat == bowl:
@@ -484,6 +324,31 @@ with left_col:
     # Venue Selection
     venue = st.selectbox("📍 Venue", cities, key="select_venue")
     
+    # Innings: the chase model, or the projected total while batting first
+    innings = st.radio(
+        "🏏 Innings",
+        [2, 1],
+        format_func=lambda i: "Chasing (2nd)" if i == 2 else "Batting first (1st)",
+        key="innings",
+        horizontal=True,
+        disabled=get_first_innings_artifact() is None,
+        help="Batting first: projected total and win probability without a target"
+    )
+    
+    # Overs per side: reduced for rain-shortened (D/L) matches
+    max_overs = st.number_input(
+        "🌧️ Overs per side",
+        min_value=1,
+        max_value=schema.MAX_OVERS,
+        value=st.session_state.max_overs,
+        key="max_overs_input",
+        step=1,
+        help="Reduce for rain-shortened (D/L) matches and enter the revised target"
+    )
+    st.session_state.max_overs = max_overs
+    if st.session_state.overs > max_overs:
+        st.session_state.overs, st.session_state.balls = max_overs, 0
+    
     st.markdown("---")
     
     # Match Statistics Inputs with improved styling
@@ -494,11 +359,7 @@ with left_col:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.markdown("""
-        <div style='text-align: center;'>
-            <label style='font-size: 0.875rem; color: #9CA3AF; margin-bottom: 0.5rem; display: block;'>Current Score</label>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("stat_label", label="Current Score"), unsafe_allow_html=True)
         score_val = st.number_input(
             "Score", 
             min_value=0, 
@@ -510,11 +371,7 @@ with left_col:
         st.session_state.score = score_val
         
     with col2:
-        st.markdown("""
-        <div style='text-align: center;'>
-            <label style='font-size: 0.875rem; color: #9CA3AF; margin-bottom: 0.5rem; display: block;'>Wickets Lost</label>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("stat_label", label="Wickets Lost"), unsafe_allow_html=True)
         wickets_val = st.number_input(
             "Wickets",
             min_value=0,
@@ -529,98 +386,61 @@ with left_col:
             toast("⚠️ Maximum 10 wickets!", "warning")
     
     with col3:
-        st.markdown("""
-        <div style='text-align: center;'>
-            <label style='font-size: 0.875rem; color: #9CA3AF; margin-bottom: 0.5rem; display: block;'>Target Score</label>
-        </div>
-        """, unsafe_allow_html=True)
-        target_val = st.number_input(
-            "Target",
-            min_value=1,
-            value=st.session_state.target,
-            key="target_input",
-            step=1,
-            label_visibility="collapsed"
-        )
-        st.session_state.target = target_val
+        st.markdown(assets.html("stat_label", label="Target Score"), unsafe_allow_html=True)
+        if innings == 1:
+            st.markdown(assets.html("overs_box", value="—"), unsafe_allow_html=True)
+        else:
+            target_val = st.number_input(
+                "Target",
+                min_value=1,
+                value=st.session_state.target,
+                key="target_input",
+                step=1,
+                label_visibility="collapsed"
+            )
+            st.session_state.target = target_val
     
     with col4:
-        st.markdown("""
-        <div style='text-align: center;'>
-            <label style='font-size: 0.875rem; color: #9CA3AF; margin-bottom: 0.5rem; display: block;'>Overs</label>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("stat_label", label="Overs"), unsafe_allow_html=True)
         # Display overs in cricket format (e.g., 14.2)
         overs_display = format_overs(st.session_state.overs, st.session_state.balls)
-        st.markdown(f"""
-        <div style='text-align: center; background: {T['card']}; padding: 0.75rem; border-radius: 12px; border: 1px solid {T['border']};'>
-            <div style='font-size: 2rem; font-weight: 700; color: #3b82f6;'>{overs_display}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("overs_box", value=overs_display), unsafe_allow_html=True)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Overs and Balls stepper section with better styling
-    st.markdown("""
-    <div style='display: flex; align-items: center; gap: 0.5rem; margin-bottom: 1rem;'>
-        <span class='material-icons' style='color: #9CA3AF;'>schedule</span>
-        <h3 style='margin: 0; font-size: 1.25rem; font-weight: 700;'>Overs Completed</h3>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(assets.html("section_heading", icon="schedule", text="Overs Completed"),
+                unsafe_allow_html=True)
     
     overs_col, balls_col = st.columns(2)
     
     with overs_col:
-        st.markdown("""
-        <label style='font-size: 0.875rem; font-weight: 500; color: #9CA3AF; margin-bottom: 0.5rem; display: block;'>Overs</label>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("stepper_label", label="Overs"), unsafe_allow_html=True)
         
         # Overs value display
-        st.markdown(f"""
-        <div style='text-align: center; background: {T['card']}; padding: 1rem; border-radius: 8px; border: 1px solid {T['border']}; margin-bottom: 0.5rem;'>
-            <span style='font-size: 1.8rem; font-weight: 700; color: {T['text']};'>{st.session_state.overs}</span>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("value_box", value=st.session_state.overs), unsafe_allow_html=True)
         
         # Decrement button
-        if st.button("➖ Decrease Overs", key="overs_dec", use_container_width=True):
-            if st.session_state.overs > 0:
-                st.session_state.overs -= 1
-                st.rerun()
+        st.button("➖ Decrease Overs", key="overs_dec", use_container_width=True,
+                  on_click=step_overs, args=(-1,))
         
         # Increment button
-        if st.button("➕ Increase Overs", key="overs_inc", use_container_width=True):
-            if st.session_state.overs < 20:
-                st.session_state.overs += 1
-                st.rerun()
-            else:
-                toast("⚠️ Maximum 20 overs!", "warning")
+        st.button("➕ Increase Overs", key="overs_inc", use_container_width=True,
+                  on_click=step_overs, args=(1,))
     
     with balls_col:
-        st.markdown("""
-        <label style='font-size: 0.875rem; font-weight: 500; color: #9CA3AF; margin-bottom: 0.5rem; display: block;'>Balls</label>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("stepper_label", label="Balls"), unsafe_allow_html=True)
         
         # Balls value display
-        st.markdown(f"""
-        <div style='text-align: center; background: {T['card']}; padding: 1rem; border-radius: 8px; border: 1px solid {T['border']}; margin-bottom: 0.5rem;'>
-            <span style='font-size: 1.8rem; font-weight: 700; color: {T['text']};'>{st.session_state.balls}</span>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("value_box", value=st.session_state.balls), unsafe_allow_html=True)
         
         # Decrement button
-        if st.button("➖ Decrease Balls", key="balls_dec", use_container_width=True):
-            if st.session_state.balls > 0:
-                st.session_state.balls -= 1
-                st.rerun()
+        st.button("➖ Decrease Balls", key="balls_dec", use_container_width=True,
+                  on_click=step_balls, args=(-1,))
         
         # Increment button
-        if st.button("➕ Increase Balls", key="balls_inc", use_container_width=True):
-            if st.session_state.balls < 5:
-                st.session_state.balls += 1
-                st.rerun()
-            else:
-                toast("⚠️ Maximum 5 balls!", "warning")
+        st.button("➕ Increase Balls", key="balls_inc", use_container_width=True,
+                  on_click=step_balls, args=(1,))
     
     
     
@@ -628,31 +448,41 @@ with left_col:
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Predict Button
-    predict_disabled = (bat == bowl) or (pipe is None)
-    if st.button("🎯 Predict Win Probability", type="primary", use_container_width=True, disabled=predict_disabled):
+    predict_disabled = (bat == bowl) or (pipe is None if innings == 2
+                                         else get_first_innings_artifact() is None)
+    if st.button("🎯 Predict Win Probability", key="predict", type="primary", use_container_width=True, disabled=predict_disabled):
         st.session_state.show_loading = True
         st.session_state.prediction_made = False
-        st.rerun()
+        rerun()
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Toasts raised by the stepper callbacks during a fragment rerun
+    render_toast()
+
 # ==========================
 # RIGHT COLUMN – RESULTS
 # ==========================
-with right_col:
+def render_results():
+    # Widget values are read back from session state so this panel does not
+    # depend on locals of render_inputs().
+    bat = st.session_state.select_bat
+    bowl = st.session_state.select_bowl
+    venue = st.session_state.select_venue
+    first_innings = st.session_state.innings == 1
+
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("📊 Prediction Results")
     
     # Check if match has ended
     total_balls = calculate_total_balls(st.session_state.overs, st.session_state.balls)
-    match_ended = total_balls >= 120 or st.session_state.wickets >= 10
-    
-    if match_ended and not st.session_state.show_loading:
-        st.markdown("""
-        <div class="match-ended">
-            🏁 Match Ended!
-        </div>
-        """, unsafe_allow_html=True)
+    match_ended = total_balls >= st.session_state.max_overs * 6 or st.session_state.wickets >= 10
+    
+    if match_ended and not st.session_state.show_loading and first_innings:
+        st.info(f"🏁 Innings complete: {bat} set a target of {st.session_state.score + 1}")
+    
+    elif match_ended and not st.session_state.show_loading:
+        st.markdown(assets.html("match_ended"), unsafe_allow_html=True)
         
         if st.session_state.score >= st.session_state.target:
             st.success(f"🎉 {bat} wins by {10 - st.session_state.wickets} wickets!")
@@ -662,76 +492,152 @@ with right_col:
     # LOADING ANIMATION
     elif st.session_state.show_loading:
         with st.spinner(""):
-            st.markdown("<h2 style='text-align:center;'>🏏 Analyzing Match Data...</h2>", 
-                       unsafe_allow_html=True)
+            st.markdown(assets.html("loading", text="🏏 Analyzing Match Data..."),
+                        unsafe_allow_html=True)
             time.sleep(1.2)
         
         st.session_state.show_loading = False
         
-        # Calculate match statistics
-        total_balls_played = calculate_total_balls(st.session_state.overs, st.session_state.balls)
-        runs_left = st.session_state.target - st.session_state.score
-        balls_left = 120 - total_balls_played
-        wickets_left = 10 - st.session_state.wickets
-        
-        # Calculate rates
-        crr = (st.session_state.score * 6) / total_balls_played if total_balls_played > 0 else 0
-        rrr = (runs_left * 6) / balls_left if balls_left > 0 else 0
-        
-        # Prepare dataframe for prediction
-        df = pd.DataFrame({
-            "batting_team": [bat],
-            "bowling_team": [bowl],
-            "city": [venue],
-            "runs_left": [runs_left],
-            "balls_left": [balls_left],
-            "wickets": [wickets_left],
-            "total_runs_x": [st.session_state.target],
-            "crr": [crr],
-            "rrr": [rrr]
-        })
+        # Validate the match state and derive the model features
+        with profiling.section("features"):
+            state = {
+                "batting_team": [bat],
+                "bowling_team": [bowl],
+                "city": [venue],
+                "score": [st.session_state.score],
+                "wickets": [st.session_state.wickets],
+                "target": [st.session_state.target],
+                "overs": [st.session_state.overs],
+                "balls": [st.session_state.balls],
+                "total_balls": [st.session_state.max_overs * 6]
+            }
+            if first_innings:
+                result = schema.build_first_innings_features(state)
+                df = result.features
+            else:
+                result = schema.build_features(state)
+                df = result.features
+                if get_strength_table() is not None:
+                    df = get_strength_table().add_features(df)
         
         # Make prediction
         try:
-            if pipe is not None:
-                prob = pipe.predict_proba(df)[0]
+            if result.errors:
+                toast(f"⚠️ {result.errors[0]['error'].capitalize()}!", "warning")
+            elif first_innings:
+                first_artifact = get_first_innings_artifact()
+                model = first_artifact.model
+                with profiling.section("predict"):
+                    start = time.perf_counter()
+                    projection = model.project(df)
+                    latency_ms = (time.perf_counter() - start) * 1000
+                    low, high = model.interval(projection)
+                metrics.PREDICTIONS.inc()
+                metrics.PREDICTIONS_BY_VERSION.labels(first_artifact.version).inc()
+                metrics.PREDICT_LATENCY.observe(latency_ms / 1000)
+                get_prediction_logger().log(
+                    df.iloc[0].to_dict(),
+                    {"win": float(projection.win[0]), "loss": float(1 - projection.win[0]),
+                     "projected_total": float(projection.total[0]),
+                     "low": float(low[0]), "high": float(high[0])},
+                    first_artifact.version,
+                    latency_ms,
+                )
+                st.session_state.projection = {
+                    "total": int(round(projection.total[0])),
+                    "low": int(round(low[0])),
+                    "high": int(round(high[0])),
+                }
+                st.session_state.win = round(projection.win[0] * 100, 2)
+                st.session_state.loss = round(100 - st.session_state.win, 2)
+                st.session_state.win_interval = None
+                st.session_state.contributions = None
+                st.session_state.similar = None
+                st.session_state.batting_team = bat
+                st.session_state.bowling_team = bowl
+                st.session_state.prediction_made = True
+                toast("✅ Prediction successful!", "success")
+            elif pipe is not None:
+                with profiling.section("predict"):
+                    scored = get_registry(model_artifact).score(df, st.session_state.route_key)
+                explanation = scored.explanation
+                prob = explanation.proba[0]
+                metrics.PREDICTIONS.inc()
+                metrics.PREDICTIONS_BY_VERSION.labels(scored.version).inc()
+                metrics.PREDICT_LATENCY.observe(scored.latency_ms / 1000)
+                get_prediction_logger().log(
+                    df.iloc[0].to_dict(),
+                    {"win": float(prob[1]), "loss": float(prob[0])},
+                    scored.version,
+                    scored.latency_ms,
+                    shadow={version: {"win": float(scored.win[0, i]),
+                                      "delta": float(scored.win[0, i] - prob[1])}
+                            for i, version in enumerate(scored.versions[1:], start=1)},
+                )
                 st.session_state.win = round(prob[1] * 100, 2)
+                st.session_state.win_interval = None
+                st.session_state.projection = None
+                if get_ensemble() is not None:
+                    # Around the served probability, rounded outwards so it still contains it
+                    low, high = get_ensemble().interval(df, center=[prob[1]])
+                    st.session_state.win_interval = (float(np.floor(low[0] * 1000) / 10),
+                                                     float(np.ceil(high[0] * 1000) / 10))
                 st.session_state.loss = round(prob[0] * 100, 2)
                 st.session_state.batting_team = bat
                 st.session_state.bowling_team = bowl
+                st.session_state.contributions = {
+                    label: float(explanation.contributions.iloc[0][column])
+                    for column, label in contribution_labels.items()
+                }
+                st.session_state.similar = None
+                if get_situation_index() is not None:
+                    state = df.iloc[0]
+                    with profiling.section("situations"):
+                        similar = get_situation_index().nearest(
+                            state['runs_left'], state['balls_left'], state['wickets'],
+                            state['total_runs_x'])
+                    st.session_state.similar = (similar, get_situation_index().table(similar))
                 st.session_state.prediction_made = True
                 toast("✅ Prediction successful!", "success")
             else:
                 toast("❌ Model not loaded!", "error")
         except Exception as e:
+            metrics.ERRORS.labels(type(e).__name__).inc()
             toast(f"❌ Prediction error: {str(e)}", "error")
         
-        st.rerun()
+        rerun()
     
     # DISPLAY RESULTS
     elif st.session_state.prediction_made:
         # Recalculate for display (needed for correct values)
         total_balls_played = calculate_total_balls(st.session_state.overs, st.session_state.balls)
-        runs_left = st.session_state.target - st.session_state.score
-        balls_left = 120 - total_balls_played
-        wickets_left = 10 - st.session_state.wickets
-        crr = (st.session_state.score * 6) / total_balls_played if total_balls_played > 0 else 0
-        rrr = (runs_left * 6) / balls_left if balls_left > 0 else 0
+        runs_left, balls_left, crr, rrr = schema.derive_rates(
+            st.session_state.score, st.session_state.target, total_balls_played,
+            st.session_state.max_overs * 6
+        )
+        runs_left, balls_left = int(runs_left), int(balls_left)
+        projection = st.session_state.projection
+        
+        # First innings: projected total with the range it lands in 80% of the time
+        if projection is not None:
+            st.markdown("### 📈 Projected Total")
+            st.markdown(assets.html("projection_display", total=projection["total"],
+                                    team=st.session_state.batting_team,
+                                    low=projection["low"], high=projection["high"]),
+                        unsafe_allow_html=True)
+            st.markdown("---")
         
         # Win Probability Display
         st.markdown("### 🎯 Win Probability")
         
-        # Large win percentage display
-        st.markdown(f"""
-        <div style='text-align:center; margin: 2rem 0;'>
-            <div style='font-size: 4rem; font-weight: 800; 
-                 background: linear-gradient(135deg, {T['primary']} 0%, {T['secondary']} 100%);
-                 -webkit-background-clip: text; -webkit-text-fill-color: transparent;'>
-                {st.session_state.win}%
-            </div>
-            <div style='opacity: 0.7; margin-top: 0.5rem;'>{st.session_state.batting_team} Win Chance</div>
-        </div>
-        """, unsafe_allow_html=True)
+        # Large win percentage display, with the ensemble's interval when available
+        interval_html = ""
+        if st.session_state.win_interval is not None:
+            low, high = st.session_state.win_interval
+            interval_html = assets.html("win_interval", level=DEFAULT_LEVEL, low=low, high=high)
+        st.markdown(assets.html("win_display", win=st.session_state.win,
+                                team=st.session_state.batting_team, interval=interval_html),
+                    unsafe_allow_html=True)
         
         # Progress bar visualization
         st.progress(st.session_state.win / 100)
@@ -755,34 +661,45 @@ with right_col:
         stat_col1, stat_col2 = st.columns(2)
         
         with stat_col1:
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-label">Required Run Rate</div>
-                <div class="metric-value">{rrr:.2f}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-label">Runs Needed</div>
-                <div class="metric-value">{runs_left}</div>
-            </div>
-            """, unsafe_allow_html=True)
+            if projection is not None:
+                st.markdown(assets.html("metric_card", label="Projected Runs to Come",
+                                        value=projection["total"] - st.session_state.score),
+                            unsafe_allow_html=True)
+                
+                st.markdown(assets.html("metric_card", label="Target if Reached",
+                                        value=projection["total"] + 1),
+                            unsafe_allow_html=True)
+            else:
+                st.markdown(assets.html("metric_card", label="Required Run Rate", value=f"{rrr:.2f}"),
+                            unsafe_allow_html=True)
+                
+                st.markdown(assets.html("metric_card", label="Runs Needed", value=runs_left),
+                            unsafe_allow_html=True)
         
         with stat_col2:
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-label">Current Run Rate</div>
-                <div class="metric-value">{crr:.2f}</div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(assets.html("metric_card", label="Current Run Rate", value=f"{crr:.2f}"),
+                        unsafe_allow_html=True)
             
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-label">Balls Remaining</div>
-                <div class="metric-value">{balls_left}</div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(assets.html("metric_card", label="Balls Remaining", value=balls_left),
+                        unsafe_allow_html=True)
+        
+        # Per-feature contributions to the win logit (+ favours batting team)
+        if st.session_state.contributions:
+            st.markdown("#### 🔍 What Drives the Prediction")
+            st.bar_chart(
+                pd.Series(st.session_state.contributions, name="Contribution (log-odds)"),
+                horizontal=True,
+                color=T['primary']
+            )
+        
+        # Closest historical chases and how often the batting side won them
+        if st.session_state.similar is not None:
+            similar, table = st.session_state.similar
+            st.markdown("#### 📚 Similar Historical Situations")
+            st.metric("Historical win rate", f"{similar.win_rate:.0%}",
+                      help=f"Batting side won {similar.wins} of the {len(table)} most similar "
+                           f"past chases (runs needed, balls left, wickets in hand, target)")
+            st.dataframe(table, hide_index=True, use_container_width=True)
         
         # Win prediction insight
         if st.session_state.win > 70:
@@ -796,21 +713,34 @@ with right_col:
     
     else:
         # Initial state - show placeholder
-        st.markdown("""
-        <div style='text-align:center; padding: 4rem 2rem; opacity: 0.6;'>
-            <div style='font-size: 4rem; margin-bottom: 1rem;'>🏏</div>
-            <div style='font-size: 1.2rem;'>Configure match details and click<br/><strong>Predict</strong> to see results</div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(assets.html("placeholder"), unsafe_allow_html=True)
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+
+# ---------------------------------------------------------
+# MAIN LAYOUT
+# ---------------------------------------------------------
+# Both panels are one fragment: widget changes rerun the inputs and the
+# results derived from them (required rate, balls remaining, match ended)
+# instead of the whole script (CSS, sidebar and header stay put).
+@st.fragment
+def render_panels():
+    # Counted here rather than at the top of the script: a full run renders
+    # the panels once and a stepper click reruns only this fragment
+    metrics.RERUNS.inc()
+    left_col, right_col = st.columns([1, 1], gap="large")
+    with left_col:
+        render_inputs()
+    with right_col:
+        render_results()
+
+render_panels()
+
 # ---------------------------------------------------------
 # FOOTER
 # ---------------------------------------------------------
 st.markdown("<br>", unsafe_allow_html=True)
-st.markdown("""
-<div style='text-align:center; opacity:0.5; font-size:0.9rem;'>
-    Powered by Machine Learning 🤖 | Logistic Regression Model
-</div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(assets.html("footer"), unsafe_allow_html=True)
+
+rerun_profile.stop()
@@ -0,0 +1,292 @@
+"""
+Model artifact integrity: manifests, atomic writes and startup verification.
+
+Every saved model (pipe.pkl) gets a manifest next to it
+(pipe.pkl.manifest.json) recording:
+
+* the SHA-256 of the pickle bytes,
+* a hash of the training data it was fitted on,
+* the Python/NumPy/pandas/scikit-learn versions that wrote it,
+* a small golden set of feature rows with the win probabilities the model
+  gave them when it was saved.
+
+Model and manifest are written to a temp file and renamed into place, so a
+crash mid-write never leaves a truncated pipe.pkl. Before replacing a model
+that verifies, the old one is kept as pipe.pkl.backup, the last good
+artifact.
+
+load_verified() reads the pickle once, checks its hash and re-scores the
+golden rows in one batched predict_proba call (a few ms). If pipe.pkl fails
+any check it falls back to the backup.
+
+    python artifact.py verify [pipe.pkl ...]
+    python artifact.py manifest pipe.pkl     # write a manifest for an existing model
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+import platform
+import tempfile
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from schema import CITIES, TEAMS, build_features, model_features
+from scoring import LinearScorer
+
+MANIFEST_SUFFIX = ".manifest.json"
+DEFAULT_MODEL_PATH = "pipe.pkl"
+DEFAULT_BACKUP_PATH = "pipe.pkl.backup"
+GOLDEN_ROWS = 32
+GOLDEN_TOLERANCE = 1e-9
+
+# verify_seconds: hash + golden check, excluding unpickling (and the imports it triggers)
+LoadedArtifact = namedtuple("LoadedArtifact",
+                            ["model", "path", "version", "manifest", "verify_seconds", "problems"])
+
+
+class ArtifactError(Exception):
+    """A model artifact is missing, corrupt or does not reproduce its golden predictions"""
+
+
+def manifest_path(model_path):
+    return model_path + MANIFEST_SUFFIX
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_files(paths):
+    """One digest over the contents of several files, in order"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def library_versions():
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def _file_mode(path):
+    """Permissions for a rewrite of path: the existing file's, else what
+    open() would create under the current umask"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def atomic_write(path, data):
+    """Write bytes to path via a temp file in the same directory + rename,
+    keeping the permissions a plain write would leave (mkstemp's are 0600)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            os.fchmod(f.fileno(), _file_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def golden_states(n=GOLDEN_ROWS, seed=2024, features=None, categories=None):
+    """Fixed, deterministic set of valid model feature rows.
+
+    Columns a model needs beyond schema.FEATURES (e.g. the strength
+    features) get fixed random values; the check only needs fixed inputs.
+    categories ({column: names}) limits teams/cities to those a model's
+    encoder knows, for models that reject unseen names.
+    """
+    categories = categories or {}
+    known = set(categories.get("batting_team", TEAMS)) & set(categories.get("bowling_team", TEAMS))
+    teams = np.asarray([t for t in TEAMS if t in known], dtype=object)
+    city_names = set(categories.get("city", CITIES))
+    cities = [c for c in CITIES if c in city_names]
+    rng = np.random.default_rng(seed)
+    m = 4 * n
+    bat = rng.integers(len(teams), size=m)
+    bowl = (bat + rng.integers(1, len(teams), size=m)) % len(teams)
+    bowled = rng.integers(0, 114, size=m)
+    result = build_features({
+        "batting_team": teams[bat],
+        "bowling_team": teams[bowl],
+        "city": rng.choice(cities, size=m),
+        "score": rng.integers(0, 200, size=m),
+        "wickets": rng.integers(0, 10, size=m),
+        "target": rng.integers(100, 240, size=m),
+        "overs": bowled // 6,
+        "balls": bowled % 6,
+    })
+    golden = result.features[result.valid].head(n).reset_index(drop=True)
+    if 'current_score' in (features or []):
+        # First-innings models score the runs on the board instead of runs left
+        golden['current_score'] = golden['total_runs_x'] - golden['runs_left']
+    for column in features or []:
+        if column not in golden:
+            golden[column] = rng.random(len(golden))
+    return golden if features is None else golden[list(features)]
+
+
+def _known_categories(model):
+    """{column: names} the encoder of a pipeline (or an ensemble's first member, or a
+    first-innings model's win pipeline) knows"""
+    pipe = getattr(model, "win_pipe", getattr(model, "members", [model])[0])
+    return {column: cats for column, cats, _ in LinearScorer.from_pipeline(pipe).categorical}
+
+
+def build_manifest(model, model_bytes, training_data=None, training_data_sha256=None):
+    """Manifest dict for a pickled model (training_data: list of file paths)"""
+    features = model_features(model)
+    golden = golden_states(features=features, categories=_known_categories(model))
+    if training_data and training_data_sha256 is None:
+        training_data_sha256 = sha256_files(training_data)
+    sha = sha256_bytes(model_bytes)
+    return {
+        "sha256": sha,
+        "version": sha[:12],
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "features": features,
+        "training_data": [os.path.basename(p) for p in training_data or []],
+        "training_data_sha256": training_data_sha256,
+        "libraries": library_versions(),
+        "golden": {
+            "rows": json.loads(golden.to_json(orient="records")),
+            "win": model.predict_proba(golden)[:, 1].tolist(),
+        },
+    }
+
+
+def write_manifest(manifest, model_path):
+    atomic_write(manifest_path(model_path), json.dumps(manifest, indent=2).encode("utf-8"))
+
+
+def read_manifest(model_path):
+    with open(manifest_path(model_path), "rb") as f:
+        return json.load(f)
+
+
+def save_artifact(model, path=DEFAULT_MODEL_PATH, training_data=None, training_data_sha256=None,
+                  backup_path=DEFAULT_BACKUP_PATH):
+    """Atomically write model + manifest, keeping the current good model as the backup.
+    Saving the model already at path leaves the backup alone."""
+    model_bytes = pickle.dumps(model)
+    if backup_path and os.path.exists(path):
+        try:
+            current = verify_artifact(path)
+        except ArtifactError:
+            current = None
+        if current is not None and current.manifest["sha256"] != sha256_bytes(model_bytes):
+            with open(path, "rb") as f:
+                atomic_write(backup_path, f.read())
+            write_manifest(current.manifest, backup_path)
+
+    manifest = build_manifest(model, model_bytes, training_data, training_data_sha256)
+    atomic_write(path, model_bytes)
+    write_manifest(manifest, path)
+    return manifest
+
+
+def verify_artifact(path):
+    """Load a model and check it against its manifest; raises ArtifactError"""
+    try:
+        with open(path, "rb") as f:
+            model_bytes = f.read()
+        manifest = read_manifest(path)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"{path}: {e}") from e
+
+    start = time.perf_counter()
+    if sha256_bytes(model_bytes) != manifest.get("sha256"):
+        raise ArtifactError(f"{path}: content hash does not match its manifest")
+    hash_seconds = time.perf_counter() - start
+    try:
+        model = pickle.load(io.BytesIO(model_bytes))
+    except Exception as e:
+        raise ArtifactError(f"{path}: cannot unpickle ({type(e).__name__}: {e})") from e
+
+    start = time.perf_counter()
+    try:
+        golden = pd.DataFrame(manifest["golden"]["rows"], columns=manifest["features"])
+        win = model.predict_proba(golden)[:, 1]
+    except Exception as e:
+        raise ArtifactError(f"{path}: golden predictions failed ({type(e).__name__}: {e})") from e
+    worst = float(np.max(np.abs(win - np.asarray(manifest["golden"]["win"]))))
+    if not worst <= GOLDEN_TOLERANCE:
+        raise ArtifactError(f"{path}: golden predictions differ by {worst:.3g}")
+    return LoadedArtifact(model, path, manifest["version"], manifest,
+                          hash_seconds + time.perf_counter() - start, [])
+
+
+def load_verified(path=DEFAULT_MODEL_PATH, fallback=DEFAULT_BACKUP_PATH):
+    """First artifact that verifies, with the reasons earlier ones were rejected"""
+    problems = []
+    for candidate in (path, fallback):
+        if not candidate:
+            continue
+        try:
+            return verify_artifact(candidate)._replace(problems=problems)
+        except ArtifactError as e:
+            problems.append(str(e))
+    raise ArtifactError("; ".join(problems))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Model artifact manifests and verification")
+    sub = parser.add_subparsers(dest="command", required=True)
+    vp = sub.add_parser("verify", help="check models against their manifests")
+    vp.add_argument("paths", nargs="*", default=[DEFAULT_MODEL_PATH, DEFAULT_BACKUP_PATH])
+    mp = sub.add_parser("manifest", help="write a manifest for an existing model")
+    mp.add_argument("path")
+    mp.add_argument("--data", nargs="*", help="training data files to hash")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Model Artifact Check")
+    print("=" * 60)
+    if args.command == "manifest":
+        with open(args.path, "rb") as f:
+            model_bytes = f.read()
+        manifest = build_manifest(pickle.loads(model_bytes), model_bytes, args.data)
+        write_manifest(manifest, args.path)
+        print(f"   ✅ {manifest_path(args.path)} ({manifest['version']})")
+        return
+
+    failed = False
+    for path in args.paths:
+        try:
+            artifact = verify_artifact(path)
+        except ArtifactError as e:
+            failed = True
+            print(f"   ❌ {e}")
+            continue
+        print(f"   ✅ {path} ({artifact.version}): {len(artifact.manifest['golden']['win'])} "
+              f"golden predictions reproduced in {artifact.verify_seconds * 1000:.1f} ms")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,526 @@
+"""
+Static theme stylesheets and memoized HTML fragments for the Streamlit app.
+
+The stylesheet for a theme is rendered and minified once, then written to
+static/theme-<name>.css. Streamlit serves that file (enableStaticServing in
+.streamlit/config.toml), so a rerun sends a one-line <link> instead of
+the whole <style> block. The URL carries the content hash (?v=...), so it
+is safe to cache indefinitely (Streamlit itself only sends ETag and
+Last-Modified; a reverse proxy can add Cache-Control) and a changed theme
+gets a new URL. Fonts come from static/fonts/, copied from the fonts Streamlit
+already ships, so nothing is fetched from Google and the app works
+offline. If static serving is off, the same minified CSS is inlined.
+
+HTML fragments are small templates rendered through html(name, **values),
+memoized on their inputs; theme colours live in the stylesheet classes,
+not in the fragments.
+
+    python assets.py        # pre-build static/ (the app also builds it on first run)
+"""
+import functools
+import glob
+import hashlib
+import os
+import re
+import shutil
+
+from artifact import atomic_write
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL = "app/static"
+
+THEMES = {
+    'dark': {
+        'bg_gradient': 'linear-gradient(135deg, #0f172a 0%, #1e293b 50%, #0f172a 100%)',
+        'text': 'white',
+        'card': 'rgba(255,255,255,0.05)',
+        'border': 'rgba(255,255,255,0.2)',
+        'primary': '#3b82f6',
+        'secondary': '#a855f7',
+        'success': '#10b981',
+        'danger': '#ef4444',
+        'warning': '#f59e0b'
+    },
+    'light': {
+        'bg_gradient': 'linear-gradient(135deg, #f8fafc 0%, #e2e8f0 50%, #f8fafc 100%)',
+        'text': '#1e293b',
+        'card': 'rgba(255,255,255,0.95)',
+        'border': 'rgba(0,0,0,0.1)',
+        'primary': '#3b82f6',
+        'secondary': '#a855f7',
+        'success': '#10b981',
+        'danger': '#ef4444',
+        'warning': '#f59e0b'
+    }
+}
+
+# Bundled font file -> glob patterns of the same font in Streamlit's own
+# static media (names differ between Streamlit releases)
+FONTS = {
+    "sans.woff2": ["SourceSansVF-Upright*.woff2", "SourceSans3VF-Upright*.woff2",
+                   "SourceSansPro-Regular*.woff2"],
+    "icons.woff2": ["MaterialSymbols-Rounded*.woff2"],
+}
+
+CSS = """
+    @font-face {{
+        font-family: 'IPL Sans';
+        src: url('fonts/sans.woff2') format('woff2');
+        font-weight: 200 900;
+        font-display: swap;
+    }}
+
+    @font-face {{
+        font-family: 'IPL Icons';
+        src: url('fonts/icons.woff2') format('woff2');
+        font-display: block;
+    }}
+
+    * {{
+        font-family: 'IPL Sans', system-ui, -apple-system, 'Segoe UI', sans-serif;
+    }}
+
+    .material-icons {{
+        font-family: 'IPL Icons';
+        font-weight: normal;
+        font-style: normal;
+        font-size: 24px;
+        line-height: 1;
+        letter-spacing: normal;
+        text-transform: none;
+        display: inline-block;
+        white-space: nowrap;
+        direction: ltr;
+        font-feature-settings: 'liga';
+        -webkit-font-smoothing: antialiased;
+    }}
+
+    .stApp {{
+        background: {bg_gradient};
+        color: {text};
+    }}
+
+    /* Hide Streamlit Branding */
+    #MainMenu, footer {{visibility: hidden;}}
+
+    /* Hide default padding */
+    .block-container {{
+        padding-top: 2rem;
+        padding-bottom: 2rem;
+    }}
+
+    /* MAIN TITLE */
+    .title {{
+        text-align: center;
+        font-size: 3rem;
+        font-weight: 800;
+        background: linear-gradient(135deg, {primary} 0%, {secondary} 100%);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        margin-bottom: 1rem;
+        animation: slideDown 0.6s ease-out;
+    }}
+
+    /* Team VS Header */
+    .vs-header {{
+        text-align: center;
+        font-size: 1.5rem;
+        font-weight: 700;
+        margin: 1.5rem 0;
+        padding: 1rem;
+        background: {card};
+        border-radius: 16px;
+        border: 1px solid {border};
+        backdrop-filter: blur(10px);
+    }}
+
+    .vs-text {{
+        color: {secondary};
+        font-size: 1.2rem;
+        margin: 0 1rem;
+    }}
+
+    /* CARDS */
+    .card {{
+        background: {card};
+        padding: 2rem;
+        border-radius: 20px;
+        border: 1px solid {border};
+        backdrop-filter: blur(20px);
+        box-shadow: 0 8px 32px rgba(0,0,0,0.1);
+        transition: transform 0.3s ease, box-shadow 0.3s ease;
+    }}
+
+    .card:hover {{
+        transform: translateY(-4px);
+        box-shadow: 0 12px 48px rgba(0,0,0,0.15);
+    }}
+
+    /* Metric Cards */
+    .metric-card {{
+        background: {card};
+        padding: 1rem;
+        border-radius: 12px;
+        border: 1px solid {border};
+        text-align: center;
+        margin: 0.5rem 0;
+    }}
+
+    .metric-label {{
+        font-size: 0.85rem;
+        opacity: 0.7;
+        margin-bottom: 0.5rem;
+    }}
+
+    .metric-value {{
+        font-size: 1.8rem;
+        font-weight: 700;
+        color: {primary};
+    }}
+
+    /* INPUT LABELS */
+    .input-label {{
+        font-size: 0.9rem;
+        font-weight: 600;
+        color: {text};
+        opacity: 0.8;
+        margin-bottom: 0.5rem;
+        text-align: center;
+    }}
+
+    .stat-label {{
+        text-align: center;
+        font-size: 0.875rem;
+        color: #9CA3AF;
+        margin-bottom: 0.5rem;
+    }}
+
+    .stepper-label {{
+        font-size: 0.875rem;
+        font-weight: 500;
+        color: #9CA3AF;
+        margin-bottom: 0.5rem;
+    }}
+
+    .team-icon {{
+        text-align: center;
+        font-size: 3rem;
+    }}
+
+    /* Overs / balls value boxes */
+    .value-box {{
+        text-align: center;
+        background: {card};
+        padding: 1rem;
+        border-radius: 8px;
+        border: 1px solid {border};
+        margin-bottom: 0.5rem;
+        font-size: 1.8rem;
+        font-weight: 700;
+        color: {text};
+    }}
+
+    .overs-box {{
+        text-align: center;
+        background: {card};
+        padding: 0.75rem;
+        border-radius: 12px;
+        border: 1px solid {border};
+        font-size: 2rem;
+        font-weight: 700;
+        color: #3b82f6;
+    }}
+
+    .section-heading {{
+        display: flex;
+        align-items: center;
+        gap: 0.5rem;
+        margin-bottom: 1rem;
+    }}
+    .section-heading .material-icons {{ color: #9CA3AF; }}
+    .section-heading h3 {{ margin: 0; font-size: 1.25rem; font-weight: 700; }}
+
+    /* Win percentage */
+    .win-display {{ text-align: center; margin: 2rem 0; }}
+    .win-percentage {{
+        font-size: 4rem;
+        font-weight: 800;
+        background: linear-gradient(135deg, {primary} 0%, {secondary} 100%);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+    }}
+    .win-caption {{ opacity: 0.7; margin-top: 0.5rem; }}
+    .win-interval {{ opacity: 0.6; font-size: 0.9rem; }}
+
+    .placeholder {{ text-align: center; padding: 4rem 2rem; opacity: 0.6; }}
+    .placeholder-icon {{ font-size: 4rem; margin-bottom: 1rem; }}
+    .placeholder-text {{ font-size: 1.2rem; }}
+
+    .app-footer {{ text-align: center; opacity: 0.5; font-size: 0.9rem; }}
+
+    /* TOAST NOTIFICATIONS */
+    .toast {{
+        position: fixed;
+        top: 80px;
+        right: 20px;
+        padding: 16px 24px;
+        border-radius: 12px;
+        font-weight: 600;
+        color: white;
+        z-index: 9999;
+        animation: slideIn 0.3s ease-out, fadeOut 0.5s ease-out 2.5s forwards;
+        box-shadow: 0 8px 24px rgba(0,0,0,0.2);
+    }}
+    .toast-error {{ background: {danger}; }}
+    .toast-warning {{ background: {warning}; }}
+    .toast-success {{ background: {success}; }}
+
+    @keyframes slideIn {{
+        from {{ transform: translateX(400px); opacity: 0; }}
+        to {{ transform: translateX(0); opacity: 1; }}
+    }}
+
+    @keyframes fadeOut {{
+        to {{ opacity: 0; transform: translateX(100px); }}
+    }}
+
+    @keyframes slideDown {{
+        from {{ transform: translateY(-50px); opacity: 0; }}
+        to {{ transform: translateY(0); opacity: 1; }}
+    }}
+
+    /* WIN PROBABILITY RING */
+    .ring {{
+        width: 280px;
+        height: 280px;
+        margin: 2rem auto;
+        position: relative;
+    }}
+    .ring-center {{
+        position: absolute;
+        top: 50%;
+        left: 50%;
+        transform: translate(-50%, -50%);
+        text-align: center;
+    }}
+
+    .ring-percentage {{
+        font-size: 3.5rem;
+        font-weight: 800;
+        background: linear-gradient(135deg, {primary} 0%, {secondary} 100%);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+    }}
+
+    .ring-label {{
+        opacity: 0.7;
+        font-size: 0.9rem;
+        margin-top: 0.5rem;
+    }}
+
+    /* Match Ended Card */
+    .match-ended {{
+        background: linear-gradient(135deg, {danger} 0%, {warning} 100%);
+        color: white;
+        padding: 2rem;
+        border-radius: 16px;
+        text-align: center;
+        font-size: 1.5rem;
+        font-weight: 700;
+        animation: pulse 2s infinite;
+        margin: 2rem 0;
+    }}
+
+    @keyframes pulse {{
+        0%, 100% {{ transform: scale(1); }}
+        50% {{ transform: scale(1.02); }}
+    }}
+
+    /* Probability Bars */
+    .prob-bar {{
+        height: 40px;
+        border-radius: 20px;
+        overflow: hidden;
+        background: {card};
+        border: 1px solid {border};
+        margin: 0.5rem 0;
+        position: relative;
+    }}
+
+    .prob-fill {{
+        height: 100%;
+        transition: width 1s ease-out;
+        display: flex;
+        align-items: center;
+        justify-content: flex-end;
+        padding-right: 1rem;
+        font-weight: 700;
+        color: white;
+    }}
+
+    /* Theme Toggle */
+    .theme-toggle {{
+        position: fixed;
+        top: 20px;
+        left: 20px;
+        background: {card};
+        border: 1px solid {border};
+        padding: 8px 12px;
+        border-radius: 12px;
+        cursor: pointer;
+        backdrop-filter: blur(10px);
+        z-index: 999;
+        font-size: 1.2rem;
+    }}
+
+    /* Stepper Controls */
+    .stepper {{
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        gap: 1rem;
+        margin: 1rem 0;
+    }}
+
+    .stepper-btn {{
+        background: {primary};
+        color: white;
+        border: none;
+        width: 40px;
+        height: 40px;
+        border-radius: 50%;
+        font-size: 1.5rem;
+        font-weight: 700;
+        cursor: pointer;
+        transition: all 0.2s ease;
+    }}
+
+    .stepper-btn:hover {{
+        transform: scale(1.1);
+        box-shadow: 0 4px 12px rgba(59, 130, 246, 0.4);
+    }}
+
+    .stepper-value {{
+        font-size: 2rem;
+        font-weight: 700;
+        min-width: 100px;
+        text-align: center;
+    }}
+"""
+
+# Markup sent through st.markdown; values are formatted in, colours come from the stylesheet
+TEMPLATES = {
+    "title": "<div class='title'>{text}</div>",
+    "vs_header": "<div class='vs-header'><span>{bat_icon} {bat}</span>"
+                 "<span class='vs-text'>VS</span><span>{bowl_icon} {bowl}</span></div>",
+    "toast": "<div class='toast toast-{type}'>{message}</div>",
+    "team_icon": "<div class='team-icon'>{icon}</div>",
+    "stat_label": "<div class='stat-label'>{label}</div>",
+    "overs_box": "<div class='overs-box'>{value}</div>",
+    "section_heading": "<div class='section-heading'><span class='material-icons'>{icon}</span>"
+                       "<h3>{text}</h3></div>",
+    "stepper_label": "<div class='stepper-label'>{label}</div>",
+    "value_box": "<div class='value-box'>{value}</div>",
+    "match_ended": "<div class='match-ended'>🏁 Match Ended!</div>",
+    "loading": "<h2 style='text-align:center;'>{text}</h2>",
+    "win_display": "<div class='win-display'><div class='win-percentage'>{win}%</div>"
+                   "<div class='win-caption'>{team} Win Chance</div>{interval}</div>",
+    "win_interval": "<div class='win-interval'>{level:.0%} interval: {low}% – {high}%</div>",
+    "projection_display": "<div class='win-display'><div class='win-percentage'>{total}</div>"
+                          "<div class='win-caption'>{team} Projected Total</div>"
+                          "<div class='win-interval'>80% range: {low} – {high}</div></div>",
+    "metric_card": "<div class='metric-card'><div class='metric-label'>{label}</div>"
+                   "<div class='metric-value'>{value}</div></div>",
+    "placeholder": "<div class='placeholder'><div class='placeholder-icon'>🏏</div>"
+                   "<div class='placeholder-text'>Configure match details and click<br/>"
+                   "<strong>Predict</strong> to see results</div></div>",
+    "footer": "<div class='app-footer'>Powered by Machine Learning 🤖 | Logistic Regression Model</div>",
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def html(name, **values):
+    """Render a fragment template; repeated inputs return the cached string"""
+    return TEMPLATES[name].format(**values)
+
+
+def minify_css(css):
+    """Drop comments and the whitespace around CSS punctuation"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};:,>])\s*", r"\1", css).replace(";}", "}").strip()
+
+
+@functools.lru_cache(maxsize=None)
+def compile_css(theme_name):
+    """Minified stylesheet for one theme"""
+    return minify_css(CSS.format(**THEMES[theme_name]))
+
+
+def _streamlit_media():
+    import streamlit
+    return os.path.join(os.path.dirname(streamlit.__file__), "static", "static", "media")
+
+
+def bundle_fonts(static_dir=STATIC_DIR):
+    """Copy the fonts the stylesheet uses into static/fonts/; returns the missing ones"""
+    fonts_dir = os.path.join(static_dir, "fonts")
+    os.makedirs(fonts_dir, exist_ok=True)
+    missing = []
+    for name, patterns in FONTS.items():
+        target = os.path.join(fonts_dir, name)
+        if os.path.exists(target):
+            continue
+        found = [path for pattern in patterns
+                 for path in sorted(glob.glob(os.path.join(_streamlit_media(), pattern)))]
+        if not found:
+            missing.append(name)  # the font stack falls back to system fonts
+            continue
+        tmp = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(found[0], tmp)
+        os.replace(tmp, target)
+    return missing
+
+
+def build(theme_name, static_dir=STATIC_DIR):
+    """Write static/theme-<name>.css if its content changed; returns its versioned URL"""
+    css = compile_css(theme_name).encode()
+    version = hashlib.sha256(css).hexdigest()[:12]
+    path = os.path.join(static_dir, f"theme-{theme_name}.css")
+    os.makedirs(static_dir, exist_ok=True)
+    try:
+        with open(path, "rb") as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = None
+    if current != css:
+        atomic_write(path, css)
+    bundle_fonts(static_dir)
+    return f"{STATIC_URL}/theme-{theme_name}.css?v={version}"
+
+
+@functools.lru_cache(maxsize=None)
+def stylesheet(theme_name, static_serving=True):
+    """Markup for a theme: a cacheable <link> when Streamlit serves static/, else inline CSS"""
+    if static_serving:
+        return f"<link rel='stylesheet' href='{build(theme_name)}'>"
+    return f"<style>{compile_css(theme_name)}</style>"
+
+
+def main():
+    print("=" * 60)
+    print("Building Static Assets")
+    print("=" * 60)
+    for name in THEMES:
+        url = build(name)
+        print(f"   ✅ {url} ({len(compile_css(name)):,} bytes)")
+    missing = bundle_fonts()
+    if missing:
+        print(f"   ⚠️ Fonts not found in the Streamlit install: {', '.join(missing)} "
+              "(system fonts will be used)")
+    else:
+        print(f"   ✅ Fonts in {os.path.join(STATIC_DIR, 'fonts')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Season-by-season historical backtest of the win-probability model.
+
+Replays every second innings in matches.csv/deliveries.csv ball by ball
+through the current model and reports, per season (the `Season` column):
+log-loss, Brier score, a calibration table and "probability at over N"
+statistics.
+
+Work is sharded per season across a process pool. A deliveries CSV is
+converted once, in the parent, to a temporary columnar store
+(delivery_store.py), so each worker seeks to its season's deliveries
+instead of scanning the whole file. Each worker builds features with the shared vectorized
+pipeline (features.py) and scores all of them in one LinearScorer call,
+so the whole history takes seconds rather than a per-match
+match_progression loop.
+
+Usage:
+    python backtest.py [--model pipe.pkl] [--workers 4] [--output backtest.json]
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features import (DELIVERY_COLUMNS, TARGET_COLUMNS, prepare_matches, second_innings_states,
+                      training_frame)
+from aggregates import DEFAULT_STRENGTH_PATH, STRENGTH_FEATURES, StrengthTable
+from delivery_store import DeliveryStore, convert, is_store
+from scoring import LinearScorer
+
+CHECKPOINT_OVERS = (6, 10, 15)
+CALIBRATION_BINS = 10
+EPS = 1e-15
+
+_scorer = None
+_strength = None
+
+
+def _init_worker(model_path, strength_path=DEFAULT_STRENGTH_PATH):
+    global _scorer, _strength
+    with open(model_path, "rb") as f:
+        _scorer = LinearScorer.from_pipeline(pickle.load(f))
+    if set(STRENGTH_FEATURES) & set(_scorer.columns):
+        _strength = StrengthTable.load(strength_path)
+
+
+def read_deliveries(store_path, match_ids):
+    """Deliveries for the given matches only, sliced from a converted store"""
+    wanted = set(DELIVERY_COLUMNS + TARGET_COLUMNS)
+    store = DeliveryStore(store_path)
+    return store.read(match_ids, [c for c in store.columns if c in wanted])
+
+
+def log_loss(y, p):
+    p = np.clip(p, EPS, 1 - EPS)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def calibration(y, p, bins=CALIBRATION_BINS):
+    """Per probability bin: rows, mean predicted and observed win rate"""
+    idx = np.minimum((p * bins).astype(int), bins - 1)
+    count = np.bincount(idx, minlength=bins)
+    pred = np.bincount(idx, weights=p, minlength=bins)
+    wins = np.bincount(idx, weights=y, minlength=bins)
+    table = []
+    for b in range(bins):
+        if count[b]:
+            table.append({
+                "bin": f"{b / bins:.1f}-{(b + 1) / bins:.1f}",
+                "rows": int(count[b]),
+                "mean_predicted": round(pred[b] / count[b], 4),
+                "win_rate": round(wins[b] / count[b], 4),
+            })
+    ece = float(np.sum(np.abs(pred - wins)) / max(len(p), 1))
+    return table, ece
+
+
+def probability_at_overs(states, p, overs=CHECKPOINT_OVERS):
+    """Last-ball state of each checkpoint over, per match"""
+    frame = pd.DataFrame({"match_id": states['match_id'].to_numpy(), "over": states['over'].to_numpy(),
+                          "result": states['result'].to_numpy(), "p": p})
+    stats = {}
+    for n in overs:
+        at_n = frame[frame['over'] == n].groupby('match_id').tail(1)
+        if at_n.empty:
+            continue
+        y, pn = at_n['result'].to_numpy(), at_n['p'].to_numpy()
+        stats[str(n)] = {
+            "matches": int(len(at_n)),
+            "mean_probability": round(float(pn.mean()), 4),
+            "accuracy": round(float(((pn > 0.5) == y).mean()), 4),
+            "log_loss": round(log_loss(y, pn), 4),
+        }
+    return stats
+
+
+def backtest_season(season, season_matches, store_path):
+    """Worker: replay one season and return its metrics"""
+    start = time.perf_counter()
+    delivery = read_deliveries(store_path, season_matches['id'])
+    match_df = prepare_matches(season_matches, delivery)
+    states = second_innings_states(match_df, delivery)
+    states = states.loc[training_frame(states).index]
+    if states.empty:
+        return {"season": season, "rows": 0}
+
+    if _strength is not None:
+        states[STRENGTH_FEATURES] = _strength.as_of_match(states)
+    p = _scorer.predict_proba(states)[:, 1]
+    y = states['result'].to_numpy()
+    table, ece = calibration(y, p)
+    return {
+        "season": season,
+        "matches": int(states['match_id'].nunique()),
+        "rows": int(len(states)),
+        "log_loss": round(log_loss(y, p), 4),
+        "brier": round(float(np.mean((p - y) ** 2)), 4),
+        "ece": round(ece, 4),
+        "calibration": table,
+        "probability_at_over": probability_at_overs(states, p),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def run(matches_path="matches.csv", deliveries_path="deliveries.csv",
+        model_path="pipe.pkl", workers=None, strength_path=DEFAULT_STRENGTH_PATH):
+    match = pd.read_csv(matches_path)
+    seasons = sorted(match['Season'].dropna().unique())
+    tmp = None
+    if not is_store(deliveries_path):
+        # One pass over the CSV here rather than one per season worker
+        tmp = tempfile.mkdtemp(prefix="backtest.")
+        store_path = os.path.join(tmp, "deliveries")
+        convert(deliveries_path, store_path)
+    else:
+        store_path = deliveries_path
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path, strength_path)) as pool:
+            futures = [pool.submit(backtest_season, season, match[match['Season'] == season],
+                                   store_path)
+                       for season in seasons]
+            return [f.result() for f in futures]
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Season-wide backtest of the win predictor")
+    parser.add_argument("--matches", default="matches.csv")
+    parser.add_argument("--deliveries", default="deliveries.csv",
+                        help="deliveries CSV or a store from delivery_store.py")
+    parser.add_argument("--model", default="pipe.pkl")
+    parser.add_argument("--strength", default=DEFAULT_STRENGTH_PATH,
+                        help="strength table, for models trained with strength features")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="write full per-season results as JSON")
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("IPL Win Predictor - Season Backtest")
+    print("=" * 70)
+    start = time.perf_counter()
+    results = run(args.matches, args.deliveries, args.model, args.workers, args.strength)
+    elapsed = time.perf_counter() - start
+
+    header = f"\n{'Season':<10}{'Matches':>8}{'Rows':>9}{'LogLoss':>9}{'Brier':>8}{'ECE':>7}"
+    header += "".join(f"{'Acc@' + str(n):>8}" for n in CHECKPOINT_OVERS)
+    print(header)
+    for r in results:
+        if not r["rows"]:
+            print(f"{r['season']:<10}{'-':>8}")
+            continue
+        line = (f"{r['season']:<10}{r['matches']:>8}{r['rows']:>9,}{r['log_loss']:>9.4f}"
+                f"{r['brier']:>8.4f}{r['ece']:>7.3f}")
+        for n in CHECKPOINT_OVERS:
+            acc = r["probability_at_over"].get(str(n), {}).get("accuracy")
+            line += f"{acc:>8.3f}" if acc is not None else f"{'-':>8}"
+        print(line)
+
+    total_rows = sum(r["rows"] for r in results)
+    print(f"\n✅ Replayed {total_rows:,} ball states in {elapsed:.2f}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"   Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Measure the cost of Streamlit reruns for app_streamlit.py.
+
+Drives the app headlessly with Streamlit's testing API and reports, per
+interaction, the server CPU time spent and the bytes of ForwardMsg deltas
+the run produced (what goes over the websocket for that rerun).
+
+AppTest on its own always reruns the whole script, so widget clicks
+inside the panels fragment are replayed as fragment reruns here: the
+run request carries the fragment's id, as the browser's does on a live
+server, and only the fragment executes. That is what a stepper click
+costs; a full-app rerun is measured next to it, and again with the
+prediction results on screen. Last, it checks that a stepper click with
+results shown updates the balls remaining in the same fragment rerun.
+
+Usage:
+    python bench_app.py [repeats]
+"""
+import contextlib
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+APP_PATH = "app_streamlit.py"
+
+# Every ForwardMsg produced by the most recent AppTest run
+_captured = []
+_original_forward_msgs = LocalScriptRunner.forward_msgs
+_RerunData = local_script_runner.RerunData
+
+
+def _capturing_forward_msgs(self):
+    msgs = _original_forward_msgs(self)
+    _captured[:] = list(msgs)
+    return msgs
+
+
+LocalScriptRunner.forward_msgs = _capturing_forward_msgs
+
+
+def payload_bytes():
+    """Return (total bytes, fragment ids) for the last run"""
+    total = sum(msg.ByteSize() for msg in _captured)
+    fragments = {msg.delta.fragment_id for msg in _captured
+                 if msg.HasField("delta") and msg.delta.fragment_id}
+    return total, fragments
+
+
+@contextlib.contextmanager
+def fragment_rerun():
+    """Run requests made inside rerun only the fragment of the last run"""
+    _, fragments = payload_bytes()
+    fragment_id, = fragments   # the panels are the app's only fragment
+    local_script_runner.RerunData = lambda **kw: _RerunData(fragment_id_queue=[fragment_id], **kw)
+    try:
+        yield
+    finally:
+        local_script_runner.RerunData = _RerunData
+
+
+def timed(action, fragment=False):
+    """Run an AppTest interaction, returning (cpu seconds, total bytes)"""
+    with fragment_rerun() if fragment else contextlib.nullcontext():
+        start = time.process_time()
+        action()
+        cpu = time.process_time() - start
+    return cpu, payload_bytes()[0]
+
+
+def report(at, interactions, repeats):
+    for label, (action, fragment) in interactions.items():
+        samples = [timed(lambda: action().run(), fragment) for _ in range(repeats)]
+        cpu = sorted(sample[0] for sample in samples)
+        sent = sorted(sample[1] for sample in samples)
+        print(f"   {label:<18} median {cpu[len(cpu) // 2] * 1000:7.2f} ms"
+              f"   max {cpu[-1] * 1000:7.2f} ms   {sent[len(sent) // 2]:>8,} bytes")
+
+
+def balls_remaining(at):
+    for md in at.markdown:
+        if "Balls Remaining" in md.value:
+            return md.value.split("metric-value'>")[1].split("<")[0]
+
+
+def main(repeats=20):
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.run()
+    print("=" * 70)
+    print("Streamlit Rerun Benchmark")
+    print("=" * 70)
+
+    interactions = {
+        "overs stepper": (lambda: at.button(key="overs_inc").click(), True),
+        "balls stepper": (lambda: at.button(key="balls_dec").click(), True),
+        "team select": (lambda: at.selectbox(key="select_bowl").select("Delhi Capitals"), True),
+        "full rerun": (lambda: at, False),
+    }
+    print(f"\nServer CPU and payload per interaction ({repeats} repeats; widgets rerun the fragment):")
+    report(at, interactions, repeats)
+
+    # Predict (the app sleeps through its loading animation), then the same with results shown
+    at.session_state.overs, at.session_state.balls = 10, 0
+    at.selectbox(key="select_bowl").select("Delhi Capitals").run()
+    at.button(key="predict").click().run()
+    if not at.session_state.prediction_made:
+        print("\n❌ Prediction failed; is pipe.pkl present?")
+        sys.exit(1)
+    before = balls_remaining(at)
+    timed(lambda: at.button(key="overs_inc").click().run(), fragment=True)
+    after = balls_remaining(at)
+
+    print(f"\nWith prediction results on screen ({repeats} repeats):")
+    report(at, {
+        "balls stepper": (lambda: at.button(key="balls_inc" if at.session_state.balls < 5
+                                            else "balls_dec").click(), True),
+        "full rerun": (lambda: at, False),
+    }, repeats)
+
+    ok = (before, after) == ("60", "54")
+    print(f"\n{'✅' if ok else '❌'} Stepper click updates balls remaining in the fragment: "
+          f"{before} -> {after}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
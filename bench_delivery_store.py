@@ -0,0 +1,107 @@
+"""
+Load-time, size and random-access benchmark: deliveries.csv vs the columnar store.
+
+Converts the CSV (delivery_store.py) if the store is missing or was built
+from a different file, checks the store reads back exactly what
+pd.read_csv gives, then reports:
+
+* file size on disk,
+* full load time,
+* one season's deliveries (the backtest's per-worker read),
+* per-match random access latency on an open store (p50/p99 over random
+  match ids; for the CSV a lookup is a full scan, so only a few are timed).
+
+Usage:
+    python bench_delivery_store.py [--deliveries deliveries.csv] [--store deliveries.store]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifact import sha256_files
+from delivery_store import DeliveryStore, convert, is_store, read_deliveries
+from features import DELIVERY_COLUMNS, TARGET_COLUMNS
+
+RANDOM_MATCHES = 1000
+CSV_LOOKUPS = 3
+
+
+def best_seconds(fn, repeats=3):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def latencies_ms(fn, ids):
+    times = []
+    for match_id in ids:
+        start = time.perf_counter()
+        fn(match_id)
+        times.append(time.perf_counter() - start)
+    return np.percentile(times, [50, 99]) * 1000
+
+
+def store_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the columnar delivery store")
+    parser.add_argument("--deliveries", default="deliveries.csv")
+    parser.add_argument("--store", default="deliveries.store")
+    parser.add_argument("--matches", default="matches.csv",
+                        help="for the one-season read (a block of match ids if missing)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Delivery Store Benchmark")
+    print("=" * 60)
+    if not is_store(args.store) or \
+            DeliveryStore(args.store).meta["source_sha256"] != sha256_files([args.deliveries]):
+        print(f"   Converting {args.deliveries} -> {args.store}/")
+        convert(args.deliveries, args.store)
+    store = DeliveryStore(args.store)
+
+    csv = pd.read_csv(args.deliveries)
+    expected = csv.iloc[np.argsort(csv['match_id'].to_numpy(), kind='stable')].reset_index(drop=True)
+    pd.testing.assert_frame_equal(store.read(), expected)
+    print("   ✅ Store reads back identical to the CSV")
+
+    if os.path.exists(args.matches):
+        match = pd.read_csv(args.matches)
+        season = match['Season'].value_counts().idxmax()
+        season_ids = match.loc[match['Season'] == season, 'id'].to_numpy()
+    else:
+        season, season_ids = "first 60 matches", store.match_ids[:60]
+
+    # The columns the backtest reads
+    columns = DELIVERY_COLUMNS + TARGET_COLUMNS
+    rng = np.random.default_rng(0)
+    ids = rng.choice(store.match_ids, size=RANDOM_MATCHES)
+    csv_p50, _ = latencies_ms(lambda m: read_deliveries(args.deliveries, [m], columns),
+                              ids[:CSV_LOOKUPS])
+    store_p50, store_p99 = latencies_ms(store.match, ids)
+
+    csv_size, size = os.path.getsize(args.deliveries), store_bytes(args.store)
+    print(f"\n   {'':<24}{'CSV':>12}{'Store':>12}")
+    print(f"   {'Size (MiB)':<24}{csv_size / 2**20:>12.2f}{size / 2**20:>12.2f}")
+    print(f"   {'Full load (ms)':<24}"
+          f"{best_seconds(lambda: pd.read_csv(args.deliveries)) * 1000:>12.1f}"
+          f"{best_seconds(lambda: DeliveryStore(args.store).read()) * 1000:>12.1f}")
+    print(f"   {'Season ' + str(season) + ' (ms)':<24}"
+          f"{best_seconds(lambda: read_deliveries(args.deliveries, season_ids, columns)) * 1e3:>12.1f}"
+          f"{best_seconds(lambda: read_deliveries(args.store, season_ids, columns)) * 1000:>12.1f}")
+    print(f"   {'One match p50 (ms)':<24}{csv_p50:>12.2f}{store_p50:>12.3f}")
+    print(f"   {'One match p99 (ms)':<24}{'-':>12}{store_p99:>12.3f}")
+    print(f"\n   Store: {len(store):,} rows, {len(store.match_ids):,} matches, "
+          f"{size / csv_size:.0%} of the CSV size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Regression benchmark for the per-match running counters in features.py.
+
+Builds a synthetic ball-by-ball table (default 20M deliveries, ~5% wides
+and no-balls) and times the old groupby-based stage (score and wicket
+cumsums + over/ball arithmetic for balls_left) against the current stage
+(grouped_cumsum for score, wickets and legal balls). Fails if the new
+stage is slower than the old one or the running score disagrees.
+
+Usage:
+    python bench_features.py [deliveries]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import grouped_cumsum, legal_deliveries
+
+BALLS_PER_MATCH = 125
+
+
+def synthetic_deliveries(n, seed=0):
+    rng = np.random.default_rng(seed)
+    extras = rng.random(n)
+    return pd.DataFrame({
+        "match_id": np.arange(n) // BALLS_PER_MATCH,
+        "over": (np.arange(n) % BALLS_PER_MATCH) // 6 + 1,
+        "ball": (np.arange(n) % BALLS_PER_MATCH) % 6 + 1,
+        "total_runs": rng.choice([0, 1, 2, 4, 6], size=n).astype(np.int16),
+        "wide_runs": (extras < 0.035).astype(np.int16),
+        "noball_runs": ((extras >= 0.035) & (extras < 0.05)).astype(np.int16),
+        "player_dismissed": np.where(rng.random(n) < 0.05, "x", None),
+    })
+
+
+def old_stage(df):
+    by_match = df.groupby("match_id")
+    score = by_match["total_runs"].cumsum()
+    balls_left = 126 - (df["over"] * 6 + df["ball"])
+    wickets = 10 - df["player_dismissed"].notna().astype(int).groupby(df["match_id"]).cumsum()
+    return score.to_numpy(), balls_left.to_numpy(), wickets.to_numpy()
+
+
+def new_stage(df):
+    match_ids = df["match_id"].to_numpy()
+    score = grouped_cumsum(df["total_runs"].to_numpy(), match_ids)
+    balls_left = 120 - grouped_cumsum(legal_deliveries(df), match_ids)
+    dismissed = df["player_dismissed"].notna().to_numpy(dtype=np.int16)
+    wickets = 10 - grouped_cumsum(dismissed, match_ids)
+    return score, balls_left, wickets
+
+
+def best_of(fn, df, repeats=3):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn(df)
+        times.append(time.perf_counter() - start)
+    return min(times), out
+
+
+def main(n=20_000_000):
+    print("=" * 60)
+    print("Feature Stage Benchmark")
+    print("=" * 60)
+    df = synthetic_deliveries(n)
+    print(f"   Deliveries: {n:,} ({df['match_id'].iloc[-1] + 1:,} innings)")
+
+    old_time, (old_score, _, old_wickets) = best_of(old_stage, df)
+    new_time, (new_score, _, new_wickets) = best_of(new_stage, df)
+
+    print(f"   groupby stage (old):       {old_time:.3f}s")
+    print(f"   legal-ball stage (new):    {new_time:.3f}s  ({old_time / new_time:.1f}x)")
+
+    ok = (np.array_equal(old_score, new_score) and np.array_equal(old_wickets, new_wickets)
+          and new_time <= old_time)
+    print("   ✅ No regression" if ok else "   ❌ Regression or mismatch")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000_000)
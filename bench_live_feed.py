@@ -0,0 +1,151 @@
+"""
+Event-to-client fan-out benchmark for the live feed (live_feed.py).
+
+Runs the whole path in one process: a stand-in TCP feed replays
+synthetic chases for M matches (default 1,000) interleaved ball by ball
+at a fixed event rate, the ingest reads the socket, the tracker updates
+and re-scores the match store, and the hub fans every update out to S
+subscribers (default 10,000, spread evenly over the matches). Most
+subscribers are in-process queues whose consumers record the latency
+from the feed event arriving to the update being taken off their
+queue; a few hundred are real HTTP server-sent-event connections. The
+feed also carries malformed events (a start without a match_id, balls
+with non-numeric runs), which the ingest must drop and carry on.
+
+Fails if the p99 latency is over 100 ms or the ingest task died.
+
+Usage:
+    python bench_live_feed.py [--matches 1000] [--subscribers 10000] [--rate 5000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from aggregates import DEFAULT_STRENGTH_PATH
+from live_feed import Hub, LiveTracker, load_scorer, read_socket, replay_server, serve_events, track
+from metrics import LIVE_FANOUT_SECONDS
+from schema import CITIES, TEAMS
+
+BUDGET_P99_MS = 100
+MALFORMED = [
+    {"type": "start", "batting_team": TEAMS[0], "bowling_team": TEAMS[1], "city": CITIES[0],
+     "target": 180},
+    {"type": "ball", "match_id": 0, "runs": "four", "wicket": 0, "legal": 1},
+    {"type": "ball", "match_id": 0, "runs": None},
+    {"type": "ball", "match_id": [0], "runs": 1},
+]
+
+
+def synthetic_events(matches, balls, seed=0):
+    """Start events, then `balls` deliveries per match interleaved round-robin"""
+    rng = np.random.default_rng(seed)
+    bat = rng.integers(len(TEAMS), size=matches)
+    bowl = (bat + rng.integers(1, len(TEAMS), size=matches)) % len(TEAMS)
+    city = rng.integers(len(CITIES), size=matches)
+    target = rng.integers(150, 210, size=matches)
+    events = [{"type": "start", "match_id": m, "batting_team": TEAMS[bat[m]],
+               "bowling_team": TEAMS[bowl[m]], "city": CITIES[city[m]],
+               "target": int(target[m]), "total_balls": 120}
+              for m in range(matches)]
+    runs = rng.choice([0, 0, 1, 1, 2, 4, 6], size=(balls, matches))
+    wicket = rng.random((balls, matches)) < 0.03
+    legal = rng.random((balls, matches)) > 0.05
+    for b in range(balls):
+        events.append(MALFORMED[b % len(MALFORMED)])
+        for m in range(matches):
+            events.append({"type": "ball", "match_id": m, "runs": int(runs[b, m]),
+                           "wicket": int(wicket[b, m]), "legal": int(legal[b, m])})
+    return events
+
+
+async def consume(queue, latencies):
+    while True:
+        received, _ = await queue.get()
+        latencies.append(time.perf_counter() - received)
+
+
+async def sse_client(host, port, match_id, counts):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /events?match={match_id} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    while line := await reader.readline():
+        if line.startswith(b"data:"):
+            counts[match_id] = counts.get(match_id, 0) + 1
+
+
+async def run(args):
+    _, scorer = load_scorer(args.model, args.strength)
+    hub, queue = Hub(), asyncio.Queue()
+    host = "127.0.0.1"
+    events = synthetic_events(args.matches, args.balls)
+
+    latencies, sse_counts, tasks = [], {}, []
+    in_process = args.subscribers - args.sse_clients
+    for i in range(in_process):
+        tasks.append(asyncio.create_task(consume(hub.subscribe(i % args.matches), latencies)))
+    events_server = await serve_events(hub, host, 0)
+    sse_port = events_server.sockets[0].getsockname()[1]
+    for i in range(args.sse_clients):
+        tasks.append(asyncio.create_task(sse_client(host, sse_port, i % args.matches, sse_counts)))
+    while hub.subscribers < args.subscribers:
+        await asyncio.sleep(0.05)
+
+    feed = await replay_server(events, host, 0, args.rate)
+    feed_port = feed.sockets[0].getsockname()[1]
+    start = time.perf_counter()
+    tracker = asyncio.create_task(track(queue, LiveTracker(scorer, args.matches), hub))
+    tasks.append(tracker)
+    tasks.append(asyncio.create_task(read_socket(host, feed_port, queue, retry=3600)))
+
+    # Wait for the replay to finish and the subscribers to go quiet
+    seen = -1
+    while seen != len(latencies):
+        seen = len(latencies)
+        await asyncio.sleep(0.5)
+    elapsed = time.perf_counter() - start - 0.5
+    ingest_alive = not tracker.done()
+    for task in tasks:
+        task.cancel()
+    feed.close()
+    events_server.close()
+    return latencies, sse_counts, elapsed, len(events), ingest_alive
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live feed fan-out benchmark")
+    parser.add_argument("--model", default="pipe.pkl")
+    parser.add_argument("--strength", default=DEFAULT_STRENGTH_PATH)
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--sse-clients", type=int, default=200, help="of the subscribers, real HTTP")
+    parser.add_argument("--balls", type=int, default=20, help="deliveries per match")
+    parser.add_argument("--rate", type=float, default=5000, help="feed events per second")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Live Feed Fan-out Benchmark")
+    print("=" * 60)
+    latencies, sse_counts, elapsed, n_events, ingest_alive = asyncio.run(run(args))
+    ms = np.array(latencies) * 1000
+    p50, p99, worst = np.percentile(ms, [50, 99, 100])
+    fanout = LIVE_FANOUT_SECONDS
+    print(f"   Matches x subscribers:  {args.matches:,} x {args.subscribers:,} "
+          f"({args.sse_clients} over HTTP/SSE)")
+    print(f"   Feed events:            {n_events:,} at {args.rate:,.0f}/s")
+    print(f"   Deliveries:             {len(ms):,} in-process, "
+          f"{sum(sse_counts.values()):,} SSE ({len(ms) / elapsed:,.0f}/s)")
+    print(f"   Event -> subscriber:    p50 {p50:.1f} ms  p99 {p99:.1f} ms  max {worst:.1f} ms")
+    if fanout.count:
+        print(f"   Event -> SSE write:     mean {fanout.sum / fanout.count * 1000:.1f} ms")
+    ok = p99 <= BUDGET_P99_MS
+    print(f"   ✅ p99 within {BUDGET_P99_MS} ms" if ok else f"   ❌ p99 over {BUDGET_P99_MS} ms")
+    print(f"   {'✅' if ingest_alive else '❌'} ingest survived {args.balls} malformed events")
+    if not ok or not ingest_alive:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
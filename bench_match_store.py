@@ -0,0 +1,134 @@
+"""
+Update-and-rescore benchmark for the struct-of-arrays match store (match_store.py).
+
+Loads N random live chases (default 100k) into a MatchStateStore, then
+times one vectorized apply_ball() over every match and one score() of
+every match. Checks the scores against pipe.predict_proba on the same
+states (with strength.npz features if the model uses them) and reports
+memory per match next to the per-session dict the app keeps. Fails if
+update + rescore of all matches takes over 50 ms or a score differs.
+
+Usage:
+    python bench_match_store.py [--model pipe.pkl] [--strength strength.npz] [--matches 100000]
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from aggregates import StrengthTable
+from match_store import FIELDS, LIVE, MatchStateStore, StateScorer
+from schema import CITIES, TEAMS, model_features
+from scoring import LinearScorer
+
+TOLERANCE = 1e-9
+BUDGET_MS = 50
+REPEATS = 5
+
+
+def random_states(n, seed=0):
+    """n random valid raw chase states (build_features columns)"""
+    rng = np.random.default_rng(seed)
+    bat = rng.integers(len(TEAMS), size=n)
+    bowl = (bat + rng.integers(1, len(TEAMS), size=n)) % len(TEAMS)
+    target = rng.integers(120, 230, size=n)
+    bowled = rng.integers(0, 100, size=n)
+    return {
+        "batting_team": np.asarray(TEAMS, dtype=object)[bat],
+        "bowling_team": np.asarray(TEAMS, dtype=object)[bowl],
+        "city": np.asarray(CITIES, dtype=object)[rng.integers(len(CITIES), size=n)],
+        "score": (target * bowled / 130).astype(int),
+        "wickets": rng.integers(0, 8, size=n),
+        "target": target,
+        "overs": bowled // 6,
+        "balls": bowled % 6,
+    }
+
+
+def session_bytes():
+    """Rough size of one session's match keys as the app stores them"""
+    state = {"score": 120, "wickets": 3, "target": 180, "overs": 14, "balls": 2,
+             "batting_team": "Mumbai Indians", "bowling_team": "Chennai Super Kings",
+             "win": 0.4123, "loss": 0.5877}
+    return sys.getsizeof(state) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in state.items())
+
+
+def best_ms(fn):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the match-state store")
+    parser.add_argument("--model", default="pipe.pkl")
+    parser.add_argument("--strength", default="strength.npz")
+    parser.add_argument("--matches", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Match-State Store Benchmark")
+    print("=" * 60)
+    with open(args.model, "rb") as f:
+        pipe = pickle.load(f)
+    strength = StrengthTable.load(args.strength) if os.path.exists(args.strength) else None
+    scorer = StateScorer.from_pipeline(pipe, strength)
+
+    n = args.matches
+    store = MatchStateStore()
+    start = time.perf_counter()
+    ids = store.add(random_states(n))
+    add_ms = (time.perf_counter() - start) * 1000
+
+    rng = np.random.default_rng(1)
+    runs = rng.choice([0, 1, 2, 4, 6], size=n)
+    wicket = rng.random(n) < 0.05
+    legal = rng.random(n) > 0.05
+
+    # Time on copies so every repeat sees the same live matches
+    def update():
+        trial = MatchStateStore(0)
+        for name in FIELDS:
+            setattr(trial, name, getattr(store, name).copy())
+        trial.size = store.size
+        start = time.perf_counter()
+        trial.apply_ball(ids, runs, wicket, legal)
+        return time.perf_counter() - start
+
+    update_ms = min(update() for _ in range(REPEATS)) * 1000
+    finished = store.apply_ball(ids, runs, wicket, legal)
+    score_ms = best_ms(lambda: scorer.score(store))
+
+    live = ids[store.status[ids] == LIVE]
+    features = store.features(live)
+    if strength is not None:
+        features = strength.add_features(features)
+    # Cross-check on the rows the pipeline accepts (older encoders reject names they never saw)
+    known = np.ones(len(live), dtype=bool)
+    for column, cats, _ in LinearScorer.from_pipeline(pipe).categorical:
+        known &= features[column].isin(cats).to_numpy()
+    expected = pipe.predict_proba(features.loc[known, model_features(pipe)])[:, 1]
+    diff = float(np.max(np.abs(scorer.score(store, live[known]) - expected)))
+
+    print(f"   Matches:             {n:,} ({len(finished):,} finished on the ball)")
+    print(f"   add():               {add_ms:8.1f} ms")
+    print(f"   apply_ball(all):     {update_ms:8.2f} ms ({update_ms / n * 1e6:.0f} ns/match)")
+    print(f"   score(all):          {score_ms:8.2f} ms ({score_ms / n * 1e6:.0f} ns/match)")
+    print(f"   Memory:              {store.nbytes / store.capacity:.0f} bytes/match "
+          f"(session dict ~{session_bytes()} bytes)")
+    print(f"   Max |store - pipe|:  {diff:.2e}")
+    ok = diff <= TOLERANCE and update_ms + score_ms <= BUDGET_MS
+    print(f"   ✅ Update + rescore within {BUDGET_MS} ms, scores match" if ok
+          else f"   ❌ Over {BUDGET_MS} ms or scores differ (tolerance {TOLERANCE})")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
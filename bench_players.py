@@ -0,0 +1,65 @@
+"""
+Batch lookup benchmark for the player-stat store (players.py).
+
+Scores N synthetic ball states (default 1M) against a store of 1,000
+players. The timed path resolves striker/non-striker names to ids, builds
+the crease features and the remaining-bowlers features (6 bowlers per
+row). Fails if the cost is over 1µs per row.
+
+Usage:
+    python bench_players.py [rows]
+"""
+import sys
+import time
+
+import numpy as np
+
+from players import PHASES, STATS, WINDOWS, PlayerStore
+
+BUDGET_NS = 1000
+N_PLAYERS = 1000
+BOWLERS = 6
+
+
+def synthetic_store(seed=0):
+    rng = np.random.default_rng(seed)
+    rates = rng.random((N_PLAYERS + 1, len(WINDOWS), len(PHASES), len(STATS))).astype(np.float32)
+    return PlayerStore([f"Player {i}" for i in range(N_PLAYERS)], rates, rates[-1, 0])
+
+
+def main(n=1_000_000):
+    print("=" * 60)
+    print("Player Store Lookup Benchmark")
+    print("=" * 60)
+    rng = np.random.default_rng(1)
+    store = synthetic_store()
+    names = np.array(store.names + ["Unknown Player"], dtype=object)
+    striker = names[rng.integers(len(names), size=n)]
+    non_striker = names[rng.integers(len(names), size=n)]
+    phase = rng.integers(len(PHASES), size=n)
+    bowlers = rng.integers(store.unknown_id + 1, size=(n, BOWLERS))
+    bowled = rng.integers(0, 25, size=(n, BOWLERS))
+
+    start = time.perf_counter()
+    striker_ids = store.player_ids(striker)
+    non_striker_ids = store.player_ids(non_striker)
+    name_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.crease_features(striker_ids, non_striker_ids, phase)
+    store.remaining_bowling_features(bowlers, bowled, phase)
+    lookup_time = time.perf_counter() - start
+
+    per_row = (name_time + lookup_time) / n * 1e9
+    print(f"   Rows:                  {n:,}")
+    print(f"   name -> id:            {name_time / n * 1e9:6.0f} ns/row")
+    print(f"   crease + bowling:      {lookup_time / n * 1e9:6.0f} ns/row")
+    print(f"   Total:                 {per_row:6.0f} ns/row (budget {BUDGET_NS} ns)")
+    ok = per_row <= BUDGET_NS
+    print("   ✅ Within budget" if ok else "   ❌ Over budget")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,245 @@
+"""
+Benchmark for the shared prediction cache (prediction_cache.py).
+
+Starts the stand-in network cache server, then R replica processes
+(default 4) spread over H simulated hosts (default 2) that each serve N single-row requests (default 5,000) through
+ModelRegistry.score(), drawn Zipf-style from a pool of live states so a
+few states are very popular, as in a real match. Every replica first
+serves its requests uncached, then through a TieredCache of its host's
+mmap file and the network server shared by all hosts. Then T threads
+(default 4) share one registry and network client, as app sessions in
+one replica do, each checking every answer against its own state. Last,
+the server is stopped and a replica serves again with only the network
+tier, to check it falls back to scoring itself without stalling.
+
+Fails if any cached answer differs from the uncached one (in a replica
+or on a thread), the combined
+hit rate is under 50%, cached scoring is slower than uncached at p50, or
+the fallback run errors more than once per retry window.
+
+Usage:
+    python bench_prediction_cache.py [--model pipe.pkl] [--strength strength.npz]
+                                     [--replicas 4] [--hosts 2] [--threads 4]
+                                     [--requests 5000]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from aggregates import DEFAULT_STRENGTH_PATH, StrengthTable
+from artifact import DEFAULT_MODEL_PATH
+from prediction_cache import RETRY_SECONDS, MmapCache, RespCache, StandInServer, TieredCache
+from registry import ModelRegistry
+from schema import CITIES, TEAMS, build_features
+
+POOL = 2_000
+ZIPF = 1.3
+MIN_HIT_RATE = 0.5
+
+
+def state_pool(n, strength_path, seed=0):
+    """Up to n distinct valid chase states as build_features() output,
+    with strength features when the snapshot exists"""
+    rng = np.random.default_rng(seed)
+    bat = rng.integers(len(TEAMS), size=n)
+    bowl = (bat + rng.integers(1, len(TEAMS), size=n)) % len(TEAMS)
+    target = rng.integers(120, 230, size=n)
+    balls = rng.integers(1, 115, size=n)
+    states = pd.DataFrame({
+        "batting_team": np.array(TEAMS)[bat],
+        "bowling_team": np.array(TEAMS)[bowl],
+        "city": np.array(CITIES)[rng.integers(len(CITIES), size=n)],
+        "score": (target * balls / 120 * rng.uniform(0.6, 1.1, size=n)).astype(int),
+        "wickets": rng.integers(0, 9, size=n),
+        "target": target,
+        "overs": balls // 6,
+        "balls": balls % 6,
+    })
+    result = build_features(states)
+    features = result.features[result.valid].drop_duplicates().reset_index(drop=True)
+    if os.path.exists(strength_path):
+        features = StrengthTable.load(strength_path).add_features(features)
+    return features
+
+
+def requests(pool_size, n, seed):
+    rng = np.random.default_rng(seed)
+    return np.minimum(rng.zipf(ZIPF, size=n) - 1, pool_size - 1)
+
+
+def serve(registry, pool, order):
+    """Score one row per request; (latencies, served win, served contributions)"""
+    times = np.empty(len(order))
+    win = np.empty(len(order))
+    contributions = []
+    for i, row in enumerate(order):
+        start = time.perf_counter()
+        scored = registry.score(pool.iloc[[row]])
+        times[i] = time.perf_counter() - start
+        win[i] = scored.win[0, 0]
+        contributions.append(scored.explanation.contributions.to_numpy()[0])
+    return times, win, np.array(contributions)
+
+
+def replica(model_path, strength_path, cache_path, url, n, seed, out):
+    registry = ModelRegistry()
+    registry.promote(registry.register_file(model_path))
+    pool = state_pool(POOL, strength_path)
+    order = requests(len(pool), n, seed)
+    plain = serve(registry, pool, order)
+    registry.cache = TieredCache(MmapCache(cache_path), RespCache(url))
+    cached = serve(registry, pool, order)
+    out.put({
+        "plain": plain[0], "cached": cached[0],
+        "mismatches": int((~np.isclose(plain[1], cached[1], rtol=0, atol=1e-12)).sum()
+                          + (~np.isclose(plain[2], cached[2], rtol=0, atol=1e-12)).any(axis=1).sum()),
+        "lookups": registry.cache.lookups,
+        "mmap": metrics.CACHE_HITS.labels("mmap").value,
+        "resp": metrics.CACHE_HITS.labels("resp").value,
+        "errors": metrics.CACHE_BACKEND_ERRORS.labels("resp").value,
+    })
+
+
+def threaded(model_path, strength_path, url, threads, n):
+    """Threads sharing one registry and network client; (answers checked, wrong answers)"""
+    registry = ModelRegistry()
+    registry.promote(registry.register_file(model_path))
+    registry.cache = TieredCache(None, RespCache(url))
+    pool = state_pool(POOL, strength_path)
+    expected = registry._stack((registry.champion,)).explain(pool)[0][:, 0]
+    checked, wrong = [0] * threads, [0] * threads
+
+    def run(thread):
+        # Each thread reads and writes its own states, so any crossed
+        # reply shows up as another state's probability
+        order = requests(len(pool), n, seed=100 + thread)
+        order = order[order % threads == thread]
+        for _ in range(2):
+            _, win, _ = serve(registry, pool, order)
+            checked[thread] += len(order)
+            wrong[thread] += int((~np.isclose(win, expected[order], rtol=0, atol=1e-12)).sum())
+
+    workers = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(checked), sum(wrong)
+
+
+def start_server():
+    """Stand-in server on an ephemeral port in a background thread"""
+    loop = asyncio.new_event_loop()
+    server = StandInServer()
+    ready = threading.Event()
+    handle = {}
+
+    def run():
+        asyncio.set_event_loop(loop)
+        handle["server"] = loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+    port = handle["server"].sockets[0].getsockname()[1]
+
+    def stop():
+        async def close():
+            handle["server"].close()
+            await handle["server"].wait_closed()
+        asyncio.run_coroutine_threadsafe(close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return server, f"redis://127.0.0.1:{port}", stop
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared prediction cache benchmark")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--strength", default=DEFAULT_STRENGTH_PATH)
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--hosts", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=5_000)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Prediction Cache Benchmark")
+    print("=" * 60)
+    server, url, stop = start_server()
+    cache_dir = tempfile.mkdtemp()
+    ctx = multiprocessing.get_context("fork")
+    out = ctx.Queue()
+    procs = []
+    for seed in range(args.replicas):
+        host_cache = os.path.join(cache_dir, f"host{seed % args.hosts}")
+        procs.append(ctx.Process(target=replica, args=(args.model, args.strength, host_cache, url,
+                                                       args.requests, seed, out)))
+    for p in procs:
+        p.start()
+    results = [out.get(timeout=600) for _ in procs]
+    for p in procs:
+        p.join()
+
+    plain = np.concatenate([r["plain"] for r in results]) * 1000
+    cached = np.concatenate([r["cached"] for r in results]) * 1000
+    lookups = sum(r["lookups"] for r in results)
+    mmap_hits, resp_hits = sum(r["mmap"] for r in results), sum(r["resp"] for r in results)
+    mismatches = sum(r["mismatches"] for r in results)
+    hit_rate = (mmap_hits + resp_hits) / lookups
+    print(f"   Replicas:      {args.replicas} on {args.hosts} hosts, {args.requests:,} requests each")
+    print(f"   Workload:      {POOL:,} states, Zipf {ZIPF}")
+    print(f"   Hit rate:      {hit_rate:.1%} (mmap {mmap_hits / lookups:.1%}, "
+          f"network {resp_hits / lookups:.1%})")
+    print(f"   Server:        {len(server.data):,} keys, {server.commands:,} commands")
+    for label, times in (("Uncached", plain), ("Cached", cached)):
+        p50, p99 = np.percentile(times, [50, 99])
+        print(f"   {label + ':':<14} p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+    print(f"   Cross-check:   {mismatches} cached answers differ from scoring")
+
+    checked, crossed = threaded(args.model, args.strength, url, args.threads, args.requests)
+    print(f"   Threads:       {args.threads} sharing one client, {crossed} of {checked:,} answers wrong")
+
+    # Backend gone: every lookup misses, scoring carries on
+    stop()
+    registry = ModelRegistry()
+    registry.promote(registry.register_file(args.model))
+    registry.cache = TieredCache(None, RespCache(url))
+    pool = state_pool(POOL, args.strength)
+    order = requests(len(pool), 500, seed=99)
+    start = time.perf_counter()
+    times, win, _ = serve(registry, pool, order)
+    elapsed = time.perf_counter() - start
+    expected = registry._stack((registry.champion,)).explain(pool.iloc[order])[0][:, 0]
+    errors = metrics.CACHE_BACKEND_ERRORS.labels("resp").value
+    fallback_ok = np.allclose(win, expected, rtol=0, atol=1e-12) and errors <= 1 + elapsed / RETRY_SECONDS
+    print(f"   Fallback:      {len(order)} requests in {elapsed * 1000:.0f} ms, "
+          f"{errors} backend errors, p99 {np.percentile(times * 1000, 99):.3f} ms")
+
+    checks = [
+        (mismatches == 0, "cached answers identical to scoring"),
+        (crossed == 0, "threads sharing a client get their own answers"),
+        (hit_rate >= MIN_HIT_RATE, f"hit rate at least {MIN_HIT_RATE:.0%}"),
+        (np.median(cached) <= np.median(plain), "cached p50 no slower than uncached"),
+        (fallback_ok, "falls back to scoring when the backend is down"),
+    ]
+    for ok, label in checks:
+        print(f"   {'✅' if ok else '❌'} {label}")
+    if not all(ok for ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
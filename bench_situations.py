@@ -0,0 +1,89 @@
+"""
+Latency benchmark for the historical situation index (situations.py).
+
+Queries N chase states (default 10,000) drawn from the indexed states
+themselves, jittered so they are not exact hits, times each nearest()
+call and cross-checks a sample of answers against a brute-force scan of
+every state (closest state per match, k nearest matches).
+
+Fails if the p99 query latency is over 1 ms or any cross-check differs.
+
+Usage:
+    python bench_situations.py [--index situations.npz] [--queries 10000] [-k 10]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from situations import DEFAULT_K, DEFAULT_SITUATIONS_PATH, WEIGHTS, SituationIndex
+
+BUDGET_P99_MS = 1.0
+CHECKED = 200
+
+
+def brute_force(index, point, k):
+    """Distances of the k nearest matches, each by its closest state"""
+    distances = np.sqrt((((index.states - point) * WEIGHTS) ** 2).sum(axis=1))
+    order = np.argsort(distances, kind="stable")
+    _, first = np.unique(index.match_id[order], return_index=True)
+    closest = order[np.sort(first)[:k]]
+    return distances[closest]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Situation index latency benchmark")
+    parser.add_argument("--index", default=DEFAULT_SITUATIONS_PATH)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Situation Index Benchmark")
+    print("=" * 60)
+    start = time.perf_counter()
+    index = SituationIndex.load(args.index)
+    print(f"   States:        {len(index):,} from {len(np.unique(index.match_id)):,} chases")
+    print(f"   Load + tree:   {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = np.random.default_rng(0)
+    points = index.states[rng.integers(len(index), size=args.queries)].astype(int)
+    points += rng.integers(-3, 4, size=points.shape) * [1, 1, 0, 1]
+    points = np.maximum(points, 1)
+
+    for point in points[:100]:
+        index.nearest(*point, k=args.k)
+    times = np.empty(len(points))
+    win_rates = np.empty(len(points))
+    for i, point in enumerate(points):
+        start = time.perf_counter()
+        similar = index.nearest(*point, k=args.k)
+        times[i] = time.perf_counter() - start
+        win_rates[i] = similar.win_rate
+    p50, p99, worst = np.percentile(times * 1000, [50, 99, 100])
+    print(f"   Queries:       {len(points):,}, k = {args.k}")
+    print(f"   Latency:       p50 {p50:.3f} ms  p99 {p99:.3f} ms  max {worst:.3f} ms")
+    print(f"   Mean win rate: {np.nanmean(win_rates):.3f}")
+
+    mismatches = 0
+    for point in points[:CHECKED]:
+        similar = index.nearest(*point, k=args.k)
+        expected = brute_force(index, point, args.k)
+        if len(expected) != len(similar.distances) or not np.allclose(similar.distances, expected):
+            mismatches += 1
+    print(f"   Cross-check:   {CHECKED - mismatches} of {CHECKED} match a brute-force scan")
+
+    ok = p99 <= BUDGET_P99_MS and mismatches == 0
+    if p99 <= BUDGET_P99_MS:
+        print(f"   ✅ p99 within {BUDGET_P99_MS} ms")
+    else:
+        print(f"   ❌ p99 over {BUDGET_P99_MS} ms")
+    if mismatches:
+        print(f"   ❌ {mismatches} queries differ from brute force")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
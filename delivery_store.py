@@ -0,0 +1,190 @@
+"""
+Columnar, memory-mapped storage for deliveries.csv with a match_id index.
+
+`convert` writes a directory (default deliveries.store/) with one .npy
+file per column, rows grouped by match_id in file order:
+
+* integer columns in the narrowest type that holds them (int8 for runs,
+  over, ball, ...; int32 for match_id),
+* text columns (teams, players, dismissal kind) dictionary-encoded as
+  int8/int16 codes, with the names in meta.json and -1 for missing
+  (columns with no values at all get no file),
+* _match_ids.npy / _offsets.npy: sorted match ids and where each match's
+  rows start, so one match is a contiguous slice.
+
+Columns are opened with np.load(mmap_mode='r'), so reading one match or
+one season touches only those rows' pages instead of parsing the whole
+CSV. Reads return the same columns and dtypes as pd.read_csv (integers
+widened to int64, text as objects with NaN for missing).
+
+    python delivery_store.py deliveries.csv [--output deliveries.store]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifact import sha256_files
+
+DEFAULT_STORE_PATH = "deliveries.store"
+META_FILE = "meta.json"
+
+
+def _narrow_int(values):
+    """Smallest signed integer dtype holding every value"""
+    lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+def convert(csv_path, output=DEFAULT_STORE_PATH):
+    """Write the columnar store for a deliveries CSV; returns its meta dict"""
+    df = pd.read_csv(csv_path)
+    df = df.iloc[np.argsort(df['match_id'].to_numpy(), kind='stable')]
+    match_ids, starts = np.unique(df['match_id'].to_numpy(), return_index=True)
+
+    meta = {"source": os.path.basename(csv_path), "source_sha256": sha256_files([csv_path]),
+            "rows": len(df), "matches": len(match_ids), "columns": {}}
+    parent = os.path.dirname(os.path.abspath(output))
+    tmp = tempfile.mkdtemp(dir=parent, prefix=os.path.basename(output) + ".", suffix=".tmp")
+    try:
+        np.save(os.path.join(tmp, "_match_ids.npy"), match_ids)
+        np.save(os.path.join(tmp, "_offsets.npy"), np.append(starts, len(df)).astype(np.int64))
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_integer_dtype(series):
+                values = series.to_numpy()
+                values = values.astype(_narrow_int(values))
+                meta["columns"][column] = {"kind": "int"}
+            elif series.isna().all():
+                meta["columns"][column] = {"kind": "empty"}
+                continue
+            elif pd.api.types.is_float_dtype(series):
+                values = series.to_numpy()
+                meta["columns"][column] = {"kind": "float"}
+            else:
+                codes, names = pd.factorize(series, sort=True)
+                values = codes.astype(_narrow_int(np.append(codes, len(names))))
+                meta["columns"][column] = {"kind": "text", "names": [str(n) for n in names]}
+            np.save(os.path.join(tmp, f"{column}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(tmp, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+        # Swap the finished directory in; readers never see a partial store
+        old = None
+        if os.path.exists(output):
+            old = tmp + ".old"
+            os.replace(output, old)
+        os.replace(tmp, output)
+        if old:
+            shutil.rmtree(old)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return meta
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+class DeliveryStore:
+    """Read side of a converted store: per-match slices over memory-mapped columns"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.columns = list(self.meta["columns"])
+        self.match_ids = np.load(os.path.join(path, "_match_ids.npy"))
+        self.offsets = np.load(os.path.join(path, "_offsets.npy"))
+        self._arrays = {}
+        self._names = {c: np.array(spec["names"] + [np.nan], dtype=object)
+                       for c, spec in self.meta["columns"].items() if spec["kind"] == "text"}
+
+    def __len__(self):
+        return int(self.meta["rows"])
+
+    def _column(self, column):
+        if column not in self._arrays:
+            self._arrays[column] = np.load(os.path.join(self.path, f"{column}.npy"), mmap_mode='r')
+        return self._arrays[column]
+
+    def rows(self, match_ids):
+        """Row positions of the given matches (unknown ids are skipped), in store order"""
+        ids = np.unique(np.asarray(match_ids))
+        pos = np.minimum(np.searchsorted(self.match_ids, ids), len(self.match_ids) - 1)
+        pos = pos[self.match_ids[pos] == ids]
+        starts, ends = self.offsets[pos], self.offsets[pos + 1]
+        lengths = ends - starts
+        # Concatenated aranges: each match's start repeated, plus 0..length-1
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def _frame(self, index, columns):
+        data = {}
+        n = len(range(len(self))[index]) if isinstance(index, slice) else len(index)
+        for column in columns or self.columns:
+            kind = self.meta["columns"][column]["kind"]
+            if kind == "empty":
+                data[column] = np.full(n, np.nan)
+                continue
+            values = self._column(column)[index]
+            if kind == "text":
+                data[column] = self._names[column][values]
+            elif kind == "int":
+                data[column] = values.astype(np.int64)
+            else:
+                data[column] = np.array(values)
+        return pd.DataFrame(data)
+
+    def match(self, match_id, columns=None):
+        """One match's deliveries: a contiguous slice of each column"""
+        pos = np.searchsorted(self.match_ids, match_id)
+        if pos == len(self.match_ids) or self.match_ids[pos] != match_id:
+            raise KeyError(f"No deliveries for match_id {match_id!r}")
+        return self._frame(slice(self.offsets[pos], self.offsets[pos + 1]), columns)
+
+    def read(self, match_ids=None, columns=None):
+        """Deliveries for the given matches (all if None), like pd.read_csv(usecols=columns)"""
+        if match_ids is None:
+            return self._frame(slice(None), columns)
+        return self._frame(self.rows(match_ids), columns)
+
+
+def read_deliveries(path, match_ids=None, columns=None):
+    """Deliveries from a converted store directory or a CSV file"""
+    if is_store(path):
+        store = DeliveryStore(path)
+        return store.read(match_ids, columns and [c for c in columns if c in store.columns])
+    df = pd.read_csv(path, usecols=columns and (lambda c: c in columns))
+    return df if match_ids is None else df[df['match_id'].isin(set(match_ids))].reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert deliveries.csv to the columnar store")
+    parser.add_argument("deliveries", nargs="?", default="deliveries.csv")
+    parser.add_argument("--output", default=DEFAULT_STORE_PATH)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Delivery Store Conversion")
+    print("=" * 60)
+    start = time.perf_counter()
+    meta = convert(args.deliveries, args.output)
+    size = sum(os.path.getsize(os.path.join(args.output, f)) for f in os.listdir(args.output))
+    print(f"   Rows:      {meta['rows']:,} in {meta['matches']:,} matches")
+    print(f"   Size:      {size / 2**20:.1f} MiB (CSV {os.path.getsize(args.deliveries) / 2**20:.1f} MiB)")
+    print(f"   Converted in {time.perf_counter() - start:.2f}s")
+    print(f"   ✅ Wrote {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
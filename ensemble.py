@@ -0,0 +1,110 @@
+"""
+Bootstrap ensemble for uncertainty bands around the win probability.
+
+retrain_model.py --bootstrap N refits the pipeline on N bootstrap
+resamples of the training matches. Matches, not deliveries, are resampled
+because the balls of one chase are strongly correlated. Each resample is
+a sample_weight (how often each match was drawn) rather than a copied
+frame. The members' weights are stacked (scoring.StackedScorer), so all of
+them score a batch in one gather + matrix multiply and an interval costs
+about the same as a single prediction.
+
+The served model is fitted on the whole training set, so its prediction
+need not sit inside the members' raw percentile range. interval() takes
+the served probability as `center` and places the members' spread (in
+log-odds, around their median) on it, so the band shown always contains
+the number shown.
+
+Saved as pipe_ensemble.pkl with a manifest (artifact.py), like pipe.pkl.
+"""
+import numpy as np
+from scipy.special import expit
+from sklearn.base import clone
+
+from scoring import LinearScorer, StackedScorer, center_categories
+
+DEFAULT_ENSEMBLE_PATH = "pipe_ensemble.pkl"
+DEFAULT_LEVEL = 0.9
+EPS = 1e-15
+
+
+class BootstrapEnsemble:
+    """Bootstrap-resampled pipelines scored together"""
+
+    def __init__(self, members):
+        self.members = list(members)
+        self.feature_names_in_ = self.members[0].feature_names_in_
+        self._build()
+
+    def _build(self):
+        self.stack = StackedScorer([LinearScorer.from_pipeline(m) for m in self.members])
+
+    def __getstate__(self):
+        return {"members": self.members, "feature_names_in_": self.feature_names_in_}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build()
+
+    def member_proba(self, features):
+        """(n, n_members) win probabilities"""
+        return self.stack.predict_proba(features)
+
+    def predict_proba(self, features):
+        """Mean of the members, as columns [loss, win]"""
+        p = self.member_proba(features).mean(axis=1)
+        return np.column_stack([1 - p, p])
+
+    def interval(self, features, level=DEFAULT_LEVEL, center=None):
+        """(low, high) win probability bounds covering `level` of the members;
+        around center (the served win probabilities) when given"""
+        p = self.member_proba(features)
+        tail = (1 - level) / 2 * 100
+        if center is None:
+            low, high = np.percentile(p, [tail, 100 - tail], axis=1)
+            return low, high
+        logit = _logit(p)
+        spread = logit - np.median(logit, axis=1, keepdims=True)
+        below, above = np.percentile(spread, [tail, 100 - tail], axis=1)
+        center = np.asarray(center, dtype=float)
+        # below <= 0 <= above, so only float error at the extremes needs the clamp
+        return (np.minimum(expit(_logit(center) + below), center),
+                np.maximum(expit(_logit(center) + above), center))
+
+
+def fit_bootstrap(pipe, X, y, groups, n_models, seed=0):
+    """Fit n_models clones of pipe, each on matches drawn with replacement"""
+    rng = np.random.default_rng(seed)
+    codes, n_groups = _group_codes(groups)
+    template = _with_fixed_categories(pipe, X)
+    members = []
+    for _ in range(n_models):
+        drawn = np.bincount(rng.integers(n_groups, size=n_groups), minlength=n_groups)
+        weight = drawn[codes].astype(float)
+        keep = weight > 0
+        member = clone(template)
+        member.fit(X[keep], y[keep], **{f"{pipe.steps[-1][0]}__sample_weight": weight[keep]})
+        members.append(center_categories(member, X[keep]))
+    return BootstrapEnsemble(members)
+
+
+def _with_fixed_categories(pipe, X):
+    """Clone of pipe whose one-hot encoders know every category in X, so a
+    resample that misses a venue still yields a member that can score it
+    (encoders given an explicit category list already do)"""
+    template = clone(pipe)
+    ct = template.steps[0][1]
+    for _, encoder, columns in ct.transformers:
+        if getattr(encoder, "categories", None) == "auto":
+            encoder.set_params(categories=[sorted(X[c].unique()) for c in columns])
+    return template
+
+
+def _logit(p):
+    p = np.clip(p, EPS, 1 - EPS)
+    return np.log(p / (1 - p))
+
+
+def _group_codes(groups):
+    _, codes = np.unique(np.asarray(groups), return_inverse=True)
+    return codes, int(codes.max()) + 1 if len(codes) else 0
@@ -0,0 +1,211 @@
+"""
+Export the win-probability model for consumers that cannot load a
+scikit-learn pickle (mobile/web/edge).
+
+Two targets, both built from the weights LinearScorer extracts:
+
+* a standalone Python module with the weights embedded as literals; it
+  needs only NumPy and scores JSON-style rows (dict of columns or a list
+  of dicts, as in verify_model.py's mobile/web scenario);
+* an ONNX graph (LabelEncoder lookups for teams/city, a MatMul for the
+  numeric features, Sigmoid) runnable by onnxruntime or any ONNX runtime
+  with the ai.onnx.ml domain. Needs `pip install onnx`.
+
+Teams/cities the model never saw get the same fallback weight as in
+LinearScorer, in both the NumPy module and the ONNX graph (the
+LabelEncoder default).
+
+Usage:
+    python export_model.py [--model pipe.pkl] [--numpy export/ipl_scorer.py] [--onnx export/pipe.onnx]
+"""
+import argparse
+import os
+import pickle
+
+import numpy as np
+
+from prediction_log import model_fingerprint
+from schema import model_features
+from scoring import LinearScorer
+
+ONNX_OPSET = 17
+ONNX_ML_OPSET = 4
+
+_MODULE_TEMPLATE = '''"""
+Standalone IPL win-probability scorer (generated by export_model.py).
+
+Source model: {model} ({version}). Requires only NumPy; re-run the export
+after retraining instead of editing this file.
+
+    import ipl_scorer
+    ipl_scorer.predict_proba([{{"batting_team": ..., "runs_left": 45, ...}}])
+"""
+import numpy as np
+
+MODEL_VERSION = {version!r}
+FEATURES = {features!r}
+INTERCEPT = {intercept!r}
+# Logit weight per category; the category dropped by the encoder is 0.0
+CATEGORICAL = {{
+{categorical}
+}}
+# Weight for categories the model never saw
+FALLBACK = {fallback!r}
+NUMERIC = {{
+{numeric}
+}}
+
+
+def _columns(rows):
+    if isinstance(rows, dict):
+        return rows
+    rows = list(rows)
+    return {{name: [row[name] for row in rows] for name in FEATURES}}
+
+
+def decision_function(rows):
+    """Win log-odds for a dict of columns or a list of per-state dicts"""
+    columns = _columns(rows)
+    n = len(columns[FEATURES[0]])
+    logit = np.full(n, INTERCEPT)
+    for name, weights in CATEGORICAL.items():
+        fallback = FALLBACK[name]
+        logit += np.fromiter((weights.get(v, fallback) for v in columns[name]), dtype=float, count=n)
+    for name, weight in NUMERIC.items():
+        logit += np.asarray(columns[name], dtype=float) * weight
+    return logit
+
+
+def predict_proba(rows):
+    """Same output as pipe.predict_proba: columns [loss, win]"""
+    p = 1.0 / (1.0 + np.exp(-decision_function(rows)))
+    return np.column_stack([1 - p, p])
+'''
+
+
+def load_scorer(model_path):
+    with open(model_path, "rb") as f:
+        pipe = pickle.load(f)
+    return pipe, LinearScorer.from_pipeline(pipe)
+
+
+def numpy_module_source(scorer, features, model_path, version):
+    """Source of the standalone NumPy scorer module"""
+    categorical = []
+    for column, cats, coef in scorer.categorical:
+        entries = "".join(f"        {cat!r}: {float(w)!r},\n" for cat, w in zip(cats, coef))
+        categorical.append(f"    {column!r}: {{\n{entries}    }},")
+    numeric = [f"    {column!r}: {float(w)!r}," for column, w in scorer.numeric]
+    return _MODULE_TEMPLATE.format(
+        model=os.path.basename(model_path), version=version, features=list(features),
+        intercept=scorer.intercept, categorical="\n".join(categorical), numeric="\n".join(numeric),
+        fallback={column: float(w) for (column, _, _), w in zip(scorer.categorical, scorer.fallback)},
+    )
+
+
+def export_numpy(scorer, features, path, model_path="pipe.pkl", version=""):
+    source = numpy_module_source(scorer, features, model_path, version)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    return path
+
+
+def onnx_model(scorer, version=""):
+    """ONNX ModelProto computing [loss, win] probabilities in float64.
+
+    Inputs are one [N, 1] tensor per model feature (strings for the
+    categorical ones, doubles for the rest); output "probabilities" [N, 2].
+    """
+    try:
+        from onnx import TensorProto, helper, numpy_helper
+    except ImportError:
+        raise ImportError("ONNX export needs the onnx package: pip install onnx") from None
+
+    inputs, nodes, terms = [], [], []
+    for (column, cats, coef), fallback in zip(scorer.categorical, scorer.fallback):
+        inputs.append(helper.make_tensor_value_info(column, TensorProto.STRING, [None, 1]))
+        nodes.append(helper.make_node(
+            "LabelEncoder", [column], [f"{column}_logit"], domain="ai.onnx.ml",
+            keys_strings=[str(c) for c in cats],
+            values_tensor=numpy_helper.from_array(np.asarray(coef, dtype=np.float64), "values"),
+            default_tensor=numpy_helper.from_array(np.array([float(fallback)]), "default"),
+        ))
+        terms.append(f"{column}_logit")
+
+    numeric_columns = [c for c, _ in scorer.numeric]
+    for column in numeric_columns:
+        inputs.append(helper.make_tensor_value_info(column, TensorProto.DOUBLE, [None, 1]))
+    initializers = [
+        numpy_helper.from_array(scorer._num_coef.reshape(-1, 1), "numeric_coef"),
+        numpy_helper.from_array(np.array([scorer.intercept]), "intercept"),
+        numpy_helper.from_array(np.array([1.0]), "one"),
+    ]
+    nodes += [
+        helper.make_node("Concat", numeric_columns, ["numeric"], axis=1),
+        helper.make_node("MatMul", ["numeric", "numeric_coef"], ["numeric_logit"]),
+        helper.make_node("Sum", terms + ["numeric_logit", "intercept"], ["logit"]),
+        helper.make_node("Sigmoid", ["logit"], ["win"]),
+        helper.make_node("Sub", ["one", "win"], ["loss"]),
+        helper.make_node("Concat", ["loss", "win"], ["probabilities"], axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes, "ipl_win_probability", inputs,
+        [helper.make_tensor_value_info("probabilities", TensorProto.DOUBLE, [None, 2])],
+        initializer=initializers,
+    )
+    model = helper.make_model(graph, producer_name="export_model.py", producer_version=version,
+                              opset_imports=[helper.make_opsetid("", ONNX_OPSET),
+                                             helper.make_opsetid("ai.onnx.ml", ONNX_ML_OPSET)])
+    model.ir_version = 8
+    return model
+
+
+def export_onnx(scorer, path, version=""):
+    import onnx
+
+    model = onnx_model(scorer, version)
+    onnx.checker.check_model(model)
+    onnx.save(model, path)
+    return path
+
+
+def onnx_feeds(features, scorer):
+    """Feature frame -> onnxruntime input dict for the exported graph"""
+    feeds = {c: features[c].to_numpy(dtype=object).astype(str).reshape(-1, 1)
+             for c, _, _ in scorer.categorical}
+    feeds.update({c: features[c].to_numpy(dtype=np.float64).reshape(-1, 1)
+                  for c, _ in scorer.numeric})
+    return feeds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export pipe.pkl for NumPy-only and ONNX scoring")
+    parser.add_argument("--model", default="pipe.pkl")
+    parser.add_argument("--numpy", default="export/ipl_scorer.py", help="standalone module path")
+    parser.add_argument("--onnx", default="export/pipe.onnx", help="ONNX graph path ('' to skip)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("IPL Win Predictor - Model Export")
+    print("=" * 60)
+    pipe, scorer = load_scorer(args.model)
+    version = model_fingerprint(args.model)
+    print(f"   Model:   {args.model} ({version}, {len(model_features(pipe))} features)")
+
+    for path in (args.numpy, args.onnx):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    export_numpy(scorer, model_features(pipe), args.numpy, args.model, version)
+    print(f"   ✅ NumPy module: {args.numpy} ({os.path.getsize(args.numpy):,} bytes)")
+    if args.onnx:
+        try:
+            export_onnx(scorer, args.onnx, version)
+            print(f"   ✅ ONNX graph:   {args.onnx} ({os.path.getsize(args.onnx):,} bytes)")
+        except ImportError as e:
+            print(f"   ⚠️  ONNX skipped: {e}")
+    print("\n   Check both against pipe.predict_proba with: python verify_export.py")
+
+
+if __name__ == "__main__":
+    main()
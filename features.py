@@ -0,0 +1,215 @@
+"""
+Ball-by-ball feature construction shared by training and backtesting.
+
+Turns matches.csv + deliveries.csv frames into one row per second-innings
+delivery with the model features (schema.FEATURES) and the match result,
+and likewise one row per first-innings delivery with the first-innings
+features (schema.FIRST_INNINGS_FEATURES), the final total and the result.
+Every step is a column operation or a per-match running sum; there are
+no per-row Python loops, so the full history builds in well under a second.
+
+Balls are counted the way cricket counts them: wides and no-balls add runs
+but not a legal delivery, so balls_left comes from a per-match cumsum of
+legal deliveries rather than the over/ball numbers (which run past 6 in
+overs with extras).
+
+Rain-shortened (D/L) matches are modelled rather than dropped: each match
+carries the balls allotted to the chase (total_balls) and the revised
+target. Cricsheet-style deliveries with target_runs/target_overs columns
+give both exactly; for the classic deliveries.csv they are estimated for
+dl_applied matches from the overs actually reached, with the target scaled
+in proportion to the balls available (a simple stand-in for the DLS
+resource table). The overs reached only show the allotment for an innings
+that ran out of overs: a dl_applied match where either innings stopped
+short because it was all out or the chase was won is dropped, since its
+allotment cannot be recovered.
+"""
+import numpy as np
+import pandas as pd
+
+from schema import (FEATURES, MAX_OVERS, MAX_WICKETS, TEAMS, TOTAL_BALLS, canonicalize_cities,
+                    canonicalize_teams, derive_rates, run_rate)
+
+DELIVERY_COLUMNS = ['match_id', 'inning', 'batting_team', 'bowling_team', 'over', 'ball',
+                    'wide_runs', 'noball_runs', 'total_runs', 'player_dismissed']
+# Present in Cricsheet-derived datasets only
+TARGET_COLUMNS = ['target_runs', 'target_overs']
+
+
+def first_innings_totals(delivery):
+    """match_id -> total runs scored in the first innings"""
+    first = delivery[delivery['inning'] == 1]
+    return first.groupby('match_id')['total_runs'].sum().rename('total_runs').reset_index()
+
+
+def grouped_cumsum(values, groups):
+    """Running sum of values restarting at each new group.
+
+    Rows of a group must be contiguous (deliveries are stored match by
+    match). One global cumsum minus each group's starting offset, which
+    is several times faster than pandas groupby().cumsum().
+    """
+    values = np.asarray(values)
+    groups = np.asarray(groups)
+    if len(values) == 0:
+        return values.copy()
+    total = np.cumsum(values)
+    starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    lengths = np.diff(np.append(starts, len(values)))
+    return total - np.repeat(total[starts] - values[starts], lengths)
+
+
+def legal_deliveries(delivery):
+    """1 for deliveries that count towards the over, 0 for wides and no-balls"""
+    if 'extras_type' in delivery:
+        return (~delivery['extras_type'].isin(['wides', 'noballs'])).to_numpy(dtype=np.int16)
+    return ((delivery['wide_runs'].to_numpy() == 0)
+            & (delivery['noball_runs'].to_numpy() == 0)).astype(np.int16)
+
+
+def overs_to_balls(overs):
+    """Cricket overs notation (15.3 = 15 overs 3 balls) -> balls"""
+    overs = np.asarray(overs, dtype=float)
+    whole = np.floor(overs)
+    return whole * 6 + np.round((overs - whole) * 10)
+
+
+def chase_conditions(match, delivery):
+    """Per match: total_runs (runs to tie the chase) and total_balls allotted to it.
+
+    dl_applied matches whose allotment cannot be estimated (see the module
+    docstring) are left out.
+    """
+    cond = first_innings_totals(delivery).set_index('match_id').astype(float)
+    cond['total_balls'] = float(TOTAL_BALLS)
+
+    if all(c in delivery for c in TARGET_COLUMNS):
+        chase = delivery[delivery['inning'] == 2].groupby('match_id')[TARGET_COLUMNS].first().dropna()
+        chase = chase[chase.index.isin(cond.index)]
+        cond.loc[chase.index, 'total_runs'] = chase['target_runs'] - 1
+        cond.loc[chase.index, 'total_balls'] = np.minimum(overs_to_balls(chase['target_overs']),
+                                                          TOTAL_BALLS)
+        return cond.reset_index()
+
+    dl_ids = match.loc[match['dl_applied'] == 1, 'id']
+    dl_ids = cond.index[cond.index.isin(dl_ids)]
+    if len(dl_ids):
+        innings = delivery[delivery['match_id'].isin(dl_ids)].groupby(['match_id', 'inning'])
+        overs_reached = innings['over'].max().unstack().reindex(index=dl_ids, columns=[1, 2])
+        all_out = innings['player_dismissed'].count().unstack() \
+            .reindex(index=dl_ids, columns=[1, 2]).fillna(0) >= MAX_WICKETS
+        chasing = innings['batting_team'].first().unstack().reindex(index=dl_ids, columns=[2])[2]
+        winner = match.drop_duplicates('id').set_index('id')['winner'].reindex(dl_ids)
+        chase_won = pd.Series(canonicalize_teams(winner) == canonicalize_teams(chasing),
+                              index=dl_ids)
+        # Ended before its last over by a win or by running out of wickets:
+        # the overs reached are not the allotment
+        short = overs_reached.fillna(MAX_OVERS) < MAX_OVERS
+        unknown = (short[1] & all_out[1]) | (short[2] & (all_out[2] | chase_won))
+        cond = cond.drop(index=dl_ids[unknown.to_numpy()])
+        dl_ids = dl_ids[~unknown.to_numpy()]
+        overs_reached = overs_reached.loc[dl_ids]
+
+        first_balls = np.minimum(overs_reached[1].fillna(MAX_OVERS) * 6, TOTAL_BALLS)
+        chase_balls = np.minimum(overs_reached[2].fillna(MAX_OVERS) * 6, TOTAL_BALLS)
+        cond.loc[dl_ids, 'total_balls'] = chase_balls
+        cond.loc[dl_ids, 'total_runs'] = np.round(cond.loc[dl_ids, 'total_runs']
+                                                  * chase_balls / first_balls)
+    return cond.reset_index()
+
+
+def normalize_matches(match):
+    """Matches between active franchises, with canonical team and city names"""
+    match_df = match.copy()
+    match_df['team1'] = canonicalize_teams(match_df['team1'])
+    match_df['team2'] = canonicalize_teams(match_df['team2'])
+    match_df['winner'] = canonicalize_teams(match_df['winner'])
+    match_df['city'] = canonicalize_cities(match_df['city'])
+    return match_df[match_df['team1'].isin(TEAMS) & match_df['team2'].isin(TEAMS)]
+
+
+def prepare_matches(match, delivery):
+    """Matches between active franchises, with canonical names and chase conditions"""
+    return normalize_matches(match).merge(chase_conditions(match, delivery),
+                                          left_on='id', right_on='match_id')
+
+
+def second_innings_states(match_df, delivery):
+    """One row per second-innings delivery with model features and result"""
+    delivery_df = match_df.merge(delivery, on='match_id')
+    delivery_df = delivery_df[delivery_df['inning'] == 2].copy()
+
+    delivery_df['batting_team'] = canonicalize_teams(delivery_df['batting_team'])
+    delivery_df['bowling_team'] = canonicalize_teams(delivery_df['bowling_team'])
+    delivery_df = delivery_df[delivery_df['batting_team'].isin(TEAMS) &
+                              delivery_df['bowling_team'].isin(TEAMS)].copy()
+
+    match_ids = delivery_df['match_id'].to_numpy()
+    if not _is_contiguous(match_ids):
+        delivery_df = delivery_df.sort_values('match_id', kind='stable')
+        match_ids = delivery_df['match_id'].to_numpy()
+
+    delivery_df['current_score'] = grouped_cumsum(delivery_df['total_runs_y'].to_numpy(), match_ids)
+    delivery_df['runs_left'] = delivery_df['total_runs_x'] - delivery_df['current_score']
+    legal_balls = grouped_cumsum(legal_deliveries(delivery_df), match_ids)
+    delivery_df['balls_bowled'] = legal_balls
+    delivery_df['balls_left'] = delivery_df['total_balls'] - legal_balls
+
+    dismissed = delivery_df['player_dismissed'].notna().to_numpy(dtype=np.int16)
+    delivery_df['wickets'] = 10 - grouped_cumsum(dismissed, match_ids)
+
+    # Same derivation the app uses at inference
+    _, _, delivery_df['crr'], delivery_df['rrr'] = derive_rates(
+        delivery_df['current_score'], delivery_df['total_runs_x'],
+        delivery_df['balls_bowled'], delivery_df['total_balls']
+    )
+    delivery_df['result'] = (delivery_df['batting_team'] == delivery_df['winner']).astype(int)
+    return delivery_df
+
+
+def first_innings_states(match_df, delivery):
+    """One row per first-innings delivery with first-innings model features,
+    the innings' final total and the result for the side batting first.
+
+    Rain-affected (dl_applied) matches are left out: how many balls the
+    first innings was allotted is not recorded, so balls_left is unknown.
+    """
+    match_df = match_df[match_df['dl_applied'] == 0]
+    delivery_df = match_df.merge(delivery, on='match_id')
+    delivery_df = delivery_df[delivery_df['inning'] == 1].copy()
+
+    delivery_df['batting_team'] = canonicalize_teams(delivery_df['batting_team'])
+    delivery_df['bowling_team'] = canonicalize_teams(delivery_df['bowling_team'])
+    delivery_df = delivery_df[delivery_df['batting_team'].isin(TEAMS) &
+                              delivery_df['bowling_team'].isin(TEAMS)].copy()
+
+    match_ids = delivery_df['match_id'].to_numpy()
+    if not _is_contiguous(match_ids):
+        delivery_df = delivery_df.sort_values('match_id', kind='stable')
+        match_ids = delivery_df['match_id'].to_numpy()
+
+    delivery_df['current_score'] = grouped_cumsum(delivery_df['total_runs_y'].to_numpy(), match_ids)
+    legal_balls = grouped_cumsum(legal_deliveries(delivery_df), match_ids)
+    delivery_df['balls_left'] = TOTAL_BALLS - legal_balls
+    dismissed = delivery_df['player_dismissed'].notna().to_numpy(dtype=np.int16)
+    delivery_df['wickets'] = 10 - grouped_cumsum(dismissed, match_ids)
+    delivery_df['crr'] = run_rate(delivery_df['current_score'], legal_balls)
+
+    delivery_df['final_total'] = delivery_df.groupby('match_id')['total_runs_y'].transform('sum')
+    delivery_df['result'] = (delivery_df['batting_team'] == delivery_df['winner']).astype(int)
+    return delivery_df
+
+
+def _is_contiguous(groups):
+    starts = np.count_nonzero(groups[1:] != groups[:-1]) + (len(groups) > 0)
+    return starts == len(np.unique(groups))
+
+
+def training_frame(delivery_df, features=FEATURES):
+    """Model features + result, without rows the model cannot score.
+
+    balls_left is exact now, so the only rows dropped are the states after
+    the final legal ball of the allotment, where the result is decided.
+    """
+    final_df = delivery_df[list(features) + ['result']].dropna()
+    return final_df[final_df['balls_left'] > 0]
@@ -0,0 +1,163 @@
+"""
+First-innings engine: projected final total, with a distribution, and the
+win probability of the side batting first, from a mid-innings state.
+
+Two linear models on schema.FIRST_INNINGS_FEATURES, both fitted by
+retrain_model.py with the same one-hot pipeline as the chase model:
+
+* a logistic regression for P(side batting first wins),
+* a ridge regression for the run rate over the rest of the innings, so
+  the expected total is current_score + rate x overs left and shrinks to
+  the score itself as the innings ends.
+
+The distribution around the expected total is empirical: quantiles
+(LEVELS) of the training residuals, final total minus expected total,
+per whole overs left, so it is wide at the start and narrow at the end.
+
+Both models are stacked into one scoring.StackedScorer, so a batch of
+states costs one gather per team/city column and one matrix multiply for
+the win logit and the rate together. score_innings() scores a batch that
+mixes first- and second-innings states in one call, each innings in one
+vectorized pass.
+
+Saved as pipe_first_innings.pkl with a manifest (artifact.py), like pipe.pkl.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from schema import (FIRST_INNINGS_FEATURES, TOTAL_BALLS, build_features,
+                    build_first_innings_features, model_features)
+from scoring import LinearScorer, StackedScorer, center_categories
+
+DEFAULT_FIRST_INNINGS_PATH = "pipe_first_innings.pkl"
+LEVELS = (0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95)
+
+# quantiles: (n, len(LEVELS)) projected totals at each level
+Projection = namedtuple("Projection", ["win", "total", "quantiles"])
+# Per input row; projected/quantiles are NaN for second-innings rows
+InningsScores = namedtuple("InningsScores", ["win", "projected", "quantiles", "valid", "errors"])
+
+
+def _overs_left(balls_left):
+    return np.clip(np.ceil(np.asarray(balls_left, dtype=float) / 6), 0, TOTAL_BALLS // 6).astype(int)
+
+
+class FirstInningsModel:
+    """Win and run-rate pipelines plus residual quantiles per overs left"""
+
+    def __init__(self, win_pipe, rate_pipe, residuals):
+        self.win_pipe = win_pipe
+        self.rate_pipe = rate_pipe
+        self.residuals = residuals  # (TOTAL_BALLS // 6 + 1, len(LEVELS))
+        self.feature_names_in_ = win_pipe.feature_names_in_
+        self._build()
+
+    def _build(self):
+        self.stack = StackedScorer([LinearScorer.from_pipeline(self.win_pipe),
+                                    LinearScorer.from_pipeline(self.rate_pipe)])
+
+    def __getstate__(self):
+        return {"win_pipe": self.win_pipe, "rate_pipe": self.rate_pipe,
+                "residuals": self.residuals, "feature_names_in_": self.feature_names_in_}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build()
+
+    @classmethod
+    def fit(cls, win_pipe, rate_pipe, X, result, final_total):
+        """Fit both (unfitted) pipelines and the residual table on first-innings states"""
+        X = X[FIRST_INNINGS_FEATURES]
+        balls_left = X['balls_left'].to_numpy(dtype=float)
+        rate = (np.asarray(final_total, dtype=float) - X['current_score'].to_numpy()) * 6 / balls_left
+        win_pipe = center_categories(win_pipe.fit(X, result), X)
+        # Weighted by balls left: a rate over the last ball or two is mostly noise
+        rate_pipe = center_categories(
+            rate_pipe.fit(X, rate, **{f"{rate_pipe.steps[-1][0]}__sample_weight": balls_left}), X)
+        model = cls(win_pipe, rate_pipe, np.zeros((TOTAL_BALLS // 6 + 1, len(LEVELS))))
+        model.residuals = residual_quantiles(np.asarray(final_total) - model.expected_total(X),
+                                             balls_left)
+        return model
+
+    def _scores(self, features):
+        logit = self.stack.decision_function(features)
+        current = np.asarray(features['current_score'], dtype=float)
+        balls_left = np.asarray(features['balls_left'], dtype=float)
+        total = current + np.maximum(logit[:, 1], 0) * balls_left / 6
+        return 1.0 / (1.0 + np.exp(-logit[:, 0])), total, current, balls_left
+
+    def expected_total(self, features):
+        return self._scores(features)[1]
+
+    def predict_proba(self, features):
+        """P(side batting first wins) as columns [loss, win], like pipe.predict_proba"""
+        p = self._scores(features)[0]
+        return np.column_stack([1 - p, p])
+
+    def project(self, features):
+        """Win probability, expected total and total at each of LEVELS, in one pass"""
+        win, total, current, balls_left = self._scores(features)
+        quantiles = total[:, None] + self.residuals[_overs_left(balls_left)]
+        # Runs already on the board cannot be lost
+        quantiles = np.maximum(quantiles, current[:, None])
+        return Projection(win, total, quantiles)
+
+    def interval(self, projection, level=0.8):
+        """(low, high) totals from a projection, for a level LEVELS brackets"""
+        tail = (1 - level) / 2
+        low, high = LEVELS.index(round(tail, 10)), LEVELS.index(round(1 - tail, 10))
+        return projection.quantiles[:, low], projection.quantiles[:, high]
+
+
+def residual_quantiles(residuals, balls_left):
+    """(TOTAL_BALLS // 6 + 1, len(LEVELS)) residual quantiles per whole overs left"""
+    overs_left = _overs_left(balls_left)
+    table = np.zeros((TOTAL_BALLS // 6 + 1, len(LEVELS)))
+    for overs in np.unique(overs_left):
+        table[overs] = np.quantile(residuals[overs_left == overs], LEVELS)
+    return table
+
+
+def score_innings(states, chase, first_innings, strength=None):
+    """Score a batch that mixes both innings in one call.
+
+    states: build_features() columns plus `innings` (1 or 2); first-innings
+    rows need no target. chase scores second-innings features (pipe.pkl,
+    a LinearScorer or an ensemble), with strength features appended when
+    a StrengthTable is given. win is the batting side's win probability for
+    either innings. Rows that fail validation are NaN, with their errors
+    reported against their row in states.
+    """
+    df = pd.DataFrame(states).reset_index(drop=True)
+    n = len(df)
+    first = df['innings'].to_numpy() == 1
+    win = np.full(n, np.nan)
+    projected = np.full(n, np.nan)
+    quantiles = np.full((n, len(LEVELS)), np.nan)
+    valid = np.zeros(n, dtype=bool)
+    errors = []
+
+    def validate(rows, build):
+        if not len(rows):
+            # A batch of one innings only need not carry the other's columns
+            return rows, None
+        result = build(df.iloc[rows].reset_index(drop=True))
+        errors.extend(dict(e, row=int(rows[e["row"]])) for e in result.errors)
+        valid[rows[result.valid]] = True
+        return rows[result.valid], result.features[result.valid]
+
+    rows, features = validate(np.flatnonzero(first), build_first_innings_features)
+    if len(rows):
+        projection = first_innings.project(features)
+        win[rows], projected[rows], quantiles[rows] = projection
+
+    rows, features = validate(np.flatnonzero(~first), build_features)
+    if len(rows):
+        if strength is not None:
+            features = strength.add_features(features)
+        win[rows] = chase.predict_proba(features[model_features(chase)])[:, 1]
+
+    errors.sort(key=lambda e: e["row"])
+    return InningsScores(win, projected, quantiles, valid, errors)
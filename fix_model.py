@@ -119,24 +119,21 @@ print("\n" + "="*60)
 print("Saving fixed pipeline to pipe.pkl...")
 print("="*60)
 
-# Backup the old file first
-import shutil
-import os
-if os.path.exists('pipe.pkl'):
-    shutil.copy('pipe.pkl', 'pipe.pkl.backup')
-    print("✅ Created backup: pipe.pkl.backup")
-
-with open('pipe.pkl', 'wb') as f:
-    pickle.dump(new_pipe, f)
+# Same weights, so the training data is unchanged
+from artifact import read_manifest, save_artifact, verify_artifact
+try:
+    data_sha256 = read_manifest('pipe.pkl').get('training_data_sha256')
+except (OSError, ValueError):
+    data_sha256 = None
 
-print("✅ Saved new pipeline to pipe.pkl")
+manifest = save_artifact(new_pipe, 'pipe.pkl', training_data_sha256=data_sha256)
+print(f"✅ Saved new pipeline to pipe.pkl ({manifest['version']})")
+print("✅ Previous verified model (if any) kept as pipe.pkl.backup")
 
 # Verify the saved file
 print("\nVerifying saved file...")
-with open('pipe.pkl', 'rb') as f:
-    verified_pipe = pickle.load(f)
-
-prob_verify = verified_pipe.predict_proba(test_df)
+verified = verify_artifact('pipe.pkl')
+prob_verify = verified.model.predict_proba(test_df)
 print(f"✅ Verification successful!")
 print(f"Probabilities: {prob_verify}")
 
@@ -0,0 +1,421 @@
+"""
+Live ball-by-ball ingest with win probabilities pushed to clients (asyncio).
+
+A feed is newline-delimited JSON events, read from a TCP socket or by
+tailing a file:
+
+    {"type": "start", "match_id": 7, "batting_team": ..., "bowling_team": ...,
+     "city": ..., "target": 181, "total_balls": 120}
+    {"type": "ball", "match_id": 7, "runs": 4, "wicket": 0, "legal": 1}
+
+The tracker drains whatever events are queued, applies them to a
+MatchStateStore in vectorized rounds (match_store.py), re-scores only the
+touched matches in one StateScorer call and publishes one update per
+match. Each update is encoded once as a server-sent event and handed to
+every subscriber's queue; slow subscribers drop their oldest update
+rather than holding up the rest. Clients subscribe over HTTP:
+
+    GET /events             every match
+    GET /events?match=7     one match
+
+`replay` is a local stand-in feed: the second innings of every match in
+deliveries.csv (or a delivery store), interleaved ball by ball as if the
+matches were live at the same time.
+
+    python live_feed.py replay [--port 9200 | --output feed.jsonl] [--rate 200]
+    python live_feed.py serve [--feed 127.0.0.1:9200 | --tail feed.jsonl] [--port 9110] [--freeze-gc]
+    curl -N localhost:9110/events?match=7
+
+Fan-out benchmark: python bench_live_feed.py
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import time
+from collections import defaultdict
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from artifact import load_verified
+from aggregates import DEFAULT_STRENGTH_PATH, StrengthTable
+from delivery_store import read_deliveries
+from features import legal_deliveries, prepare_matches
+from match_store import LIVE, WON, MatchStateStore, StateScorer
+from metrics import LIVE_EVENTS, LIVE_FANOUT_SECONDS, LIVE_SUBSCRIBERS
+from schema import TOTAL_BALLS, build_features
+
+SUBSCRIBER_BUFFER = 64
+MAX_BATCH = 10_000
+STATUS = {LIVE: "live", WON: "won"}
+MAX_BALL_RUNS = np.iinfo(np.int16).max
+
+
+def _is_count(value, high):
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool) and 0 <= value <= high
+
+
+def well_formed(event):
+    """Whether the tracker can apply an event; anything else is dropped.
+
+    Start events need a match_id (their other fields are validated with
+    build_features in LiveTracker.apply); ball events need whole-number
+    runs, a 0/1 wicket and a 0/1 legal flag.
+    """
+    if not isinstance(event, dict):
+        return False
+    match_id = event.get("match_id")
+    if not isinstance(match_id, (int, str)) or isinstance(match_id, bool):
+        return False
+    if event.get("type") == "ball":
+        return (_is_count(event.get("runs", 0), MAX_BALL_RUNS)
+                and _is_count(event.get("wicket", 0), 1) and _is_count(event.get("legal", 1), 1))
+    return event.get("type") == "start"
+
+
+# ---------------------------------------------------------
+# STATE
+# ---------------------------------------------------------
+class LiveTracker:
+    """Match states keyed by feed match_id, updated and re-scored in batches"""
+
+    def __init__(self, scorer, capacity=1024):
+        self.scorer = scorer
+        self.store = MatchStateStore(capacity)
+        self.slots = {}  # match_id -> store slot
+
+    def apply(self, events):
+        """Apply feed events in order; returns {match_id: update dict} for touched matches.
+        Malformed events are dropped, not fatal."""
+        events = [e for e in events if well_formed(e)]
+        starts = [e for e in events if e.get("type") == "start"]
+        if starts:
+            frame = pd.DataFrame(starts).drop_duplicates("match_id", keep="last")
+            states = frame.reindex(columns=["batting_team", "bowling_team", "city", "target"])
+            states["total_balls"] = (frame["total_balls"].fillna(TOTAL_BALLS)
+                                     if "total_balls" in frame else TOTAL_BALLS)
+            states[["score", "wickets", "overs", "balls"]] = 0
+            valid = build_features(states).valid
+            frame = frame[valid]
+            ids = self.store.add(states[valid])
+            for match_id, slot in zip(frame["match_id"], ids):
+                old = self.slots.pop(match_id, None)
+                if old is not None:
+                    self.store.release([old])
+                self.slots[match_id] = slot
+
+        balls = [e for e in events if e.get("type") == "ball" and e.get("match_id") in self.slots]
+        touched = set(frame["match_id"]) if starts else set()
+        if balls:
+            slots = np.fromiter((self.slots[e["match_id"]] for e in balls), dtype=np.intp,
+                                count=len(balls))
+            runs = np.fromiter((e.get("runs", 0) for e in balls), dtype=np.int16, count=len(balls))
+            wicket = np.fromiter((e.get("wicket", 0) for e in balls), dtype=np.int8, count=len(balls))
+            legal = np.fromiter((e.get("legal", 1) for e in balls), dtype=np.int16, count=len(balls))
+            # apply_ball wants unique slots: the k-th ball of each match goes in round k
+            order = np.argsort(slots, kind="stable")
+            sorted_slots = slots[order]
+            first = np.concatenate(([True], sorted_slots[1:] != sorted_slots[:-1]))
+            group_start = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+            rank = np.empty(len(order), dtype=np.intp)
+            rank[order] = np.arange(len(order)) - group_start
+            for r in range(int(rank.max()) + 1):
+                i = np.flatnonzero(rank == r)
+                self.store.apply_ball(slots[i], runs[i], wicket[i], legal[i])
+            touched.update(e["match_id"] for e in balls)
+
+        if not touched:
+            return {}
+        match_ids = list(touched)
+        slots = np.array([self.slots[m] for m in match_ids], dtype=np.intp)
+        win = self.scorer.score(self.store, slots)
+        store = self.store
+        updates = {}
+        for match_id, slot, p in zip(match_ids, slots, win):
+            bowled = int(store.bowled[slot])
+            status = STATUS.get(int(store.status[slot]), "lost")
+            updates[match_id] = {
+                "match_id": match_id, "win": round(float(p), 4),
+                "score": int(store.score[slot]), "wickets": int(store.wickets[slot]),
+                "overs": f"{bowled // 6}.{bowled % 6}", "target": int(store.target[slot]),
+                "status": status,
+            }
+            if status != "live":
+                store.release([slot])
+                del self.slots[match_id]
+        return updates
+
+
+# ---------------------------------------------------------
+# FAN-OUT
+# ---------------------------------------------------------
+class Hub:
+    """Subscribers per match (None = all matches); one encoded frame per update"""
+
+    def __init__(self, buffer=SUBSCRIBER_BUFFER):
+        self.buffer = buffer
+        self.latest = {}  # match_id -> last frame, sent to new subscribers
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, match_id=None):
+        queue = asyncio.Queue(self.buffer)
+        self._subscribers[match_id].add(queue)
+        LIVE_SUBSCRIBERS.set(self.subscribers)
+        for key, frame in self.latest.items():
+            if match_id is None or key == match_id:
+                queue.put_nowait((time.perf_counter(), frame))
+        return queue
+
+    def unsubscribe(self, queue, match_id=None):
+        self._subscribers[match_id].discard(queue)
+        LIVE_SUBSCRIBERS.set(self.subscribers)
+
+    @property
+    def subscribers(self):
+        return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, match_id, update, received):
+        """Queue an update for its match's and the all-match subscribers"""
+        frame = f"event: win\ndata: {json.dumps(update)}\n\n".encode()
+        if update["status"] == "live":
+            self.latest[match_id] = frame
+        else:
+            self.latest.pop(match_id, None)
+        item = (received, frame)
+        for subscribers in (self._subscribers.get(match_id, ()), self._subscribers.get(None, ())):
+            for queue in subscribers:
+                if queue.full():
+                    queue.get_nowait()  # drop the oldest; the newest probability matters
+                queue.put_nowait(item)
+
+
+async def track(queue, tracker, hub):
+    """Drain queued (received, event) pairs, apply them as a batch and publish"""
+    while True:
+        batch = [await queue.get()]
+        while not queue.empty() and len(batch) < MAX_BATCH:
+            batch.append(queue.get_nowait())
+        LIVE_EVENTS.inc(len(batch))
+        batch = [(t, event) for t, event in batch if well_formed(event)]
+        received = {}
+        for t, event in batch:
+            received.setdefault(event["match_id"], t)
+        for match_id, update in tracker.apply([e for _, e in batch]).items():
+            hub.publish(match_id, update, received[match_id])
+
+
+# ---------------------------------------------------------
+# FEEDS
+# ---------------------------------------------------------
+def _parse(line, queue):
+    line = line.strip()
+    if line:
+        try:
+            queue.put_nowait((time.perf_counter(), json.loads(line)))
+        except json.JSONDecodeError:
+            pass
+
+
+async def read_socket(host, port, queue, retry=1.0):
+    """Events from a TCP feed; reconnects if the feed goes away"""
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        except OSError:
+            await asyncio.sleep(retry)
+            continue
+        while line := await reader.readline():
+            _parse(line, queue)
+        writer.close()
+        await asyncio.sleep(retry)
+
+
+async def tail_file(path, queue, poll=0.05):
+    """Events appended to a file (from its start), like tail -f"""
+    while not os.path.exists(path):
+        await asyncio.sleep(poll)
+    with open(path, "rb") as f:
+        partial = b""
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                await asyncio.sleep(poll)
+                continue
+            partial += chunk
+            if partial.endswith(b"\n"):
+                _parse(partial, queue)
+                partial = b""
+
+
+# ---------------------------------------------------------
+# SERVER-SENT EVENTS
+# ---------------------------------------------------------
+async def _stream(hub, reader, writer):
+    try:
+        request = (await reader.readline()).decode("latin-1").split()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        url = urlsplit(request[1]) if len(request) > 1 else None
+        if url is None or url.path != "/events":
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+            return
+        match = parse_qs(url.query).get("match", [None])[0]
+        match_id = int(match) if match and match.isdigit() else match
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n"
+                     b"Access-Control-Allow-Origin: *\r\n\r\n")
+        queue = hub.subscribe(match_id)
+        try:
+            while True:
+                received, frame = await queue.get()
+                writer.write(frame)
+                await writer.drain()
+                LIVE_FANOUT_SECONDS.observe(time.perf_counter() - received)
+        finally:
+            hub.unsubscribe(queue, match_id)
+    except (ConnectionError, IndexError):
+        pass
+    except asyncio.CancelledError:
+        pass  # server shutting down: end the stream quietly
+    finally:
+        writer.close()
+
+
+async def serve_events(hub, host="127.0.0.1", port=9110):
+    return await asyncio.start_server(lambda r, w: _stream(hub, r, w), host, port, backlog=4096)
+
+
+# ---------------------------------------------------------
+# REPLAY (stand-in feed)
+# ---------------------------------------------------------
+def replay_events(match, delivery):
+    """Start events for every chase, then their balls interleaved round-robin"""
+    match_df = prepare_matches(match, delivery)
+    balls = delivery[(delivery['inning'] == 2) & delivery['match_id'].isin(match_df['id'])]
+    balls = balls.assign(seq=balls.groupby('match_id').cumcount(),
+                         legal=legal_deliveries(balls),
+                         wicket=balls['player_dismissed'].notna().astype(int))
+    first = balls.groupby('match_id')[['batting_team', 'bowling_team']].first()
+    match_df = match_df.set_index('id').loc[first.index]
+    for match_id, row in match_df.iterrows():
+        yield {"type": "start", "match_id": int(match_id),
+               "batting_team": first.loc[match_id, 'batting_team'],
+               "bowling_team": first.loc[match_id, 'bowling_team'],
+               "city": row['city'], "target": int(row['total_runs']) + 1,
+               "total_balls": int(row['total_balls'])}
+    balls = balls.sort_values(['seq', 'match_id'], kind='stable')
+    for m, runs, wicket, legal in zip(balls['match_id'], balls['total_runs'], balls['wicket'],
+                                      balls['legal']):
+        yield {"type": "ball", "match_id": int(m), "runs": int(runs), "wicket": int(wicket),
+               "legal": int(legal)}
+
+
+async def replay(events, rate, write):
+    """Send events at `rate` per second (0 = as fast as possible)"""
+    start = time.perf_counter()
+    for i, event in enumerate(events):
+        await write((json.dumps(event) + "\n").encode())
+        if rate:
+            delay = start + (i + 1) / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+
+async def replay_server(events, host, port, rate):
+    """Replay to every client that connects to the stand-in feed"""
+    events = list(events)
+
+    async def handle(reader, writer):
+        async def write(data):
+            writer.write(data)
+            await writer.drain()
+        try:
+            await replay(events, rate, write)
+        except ConnectionError:
+            pass
+        writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def load_scorer(model_path, strength_path=DEFAULT_STRENGTH_PATH):
+    artifact = load_verified(model_path)
+    strength = StrengthTable.load(strength_path) if os.path.exists(strength_path) else None
+    return artifact, StateScorer.from_pipeline(artifact.model, strength)
+
+
+async def _serve(args):
+    artifact, scorer = load_scorer(args.model, args.strength)
+    if args.freeze_gc:
+        # Keep the model and everything loaded so far out of full GC passes
+        gc.freeze()
+    hub, queue = Hub(), asyncio.Queue()
+    server = await serve_events(hub, args.host, args.port)
+    if args.tail:
+        feed = tail_file(args.tail, queue)
+        source = args.tail
+    else:
+        host, port = args.feed.rsplit(":", 1)
+        feed = read_socket(host, int(port), queue)
+        source = args.feed
+    print(f"   Model {artifact.version}; feed {source}")
+    print(f"   ✅ Streaming at http://{args.host}:{args.port}/events")
+    async with server:
+        await asyncio.gather(feed, track(queue, LiveTracker(scorer), hub))
+
+
+async def _replay(args):
+    events = replay_events(pd.read_csv(args.matches), read_deliveries(args.deliveries))
+    if args.output:
+        with open(args.output, "ab") as f:
+            async def write(data):
+                f.write(data)
+                f.flush()
+            await replay(events, args.rate, write)
+        print(f"   ✅ Replayed to {args.output}")
+        return
+    server = await replay_server(events, args.host, args.port, args.rate)
+    print(f"   ✅ Feed at {args.host}:{args.port} ({args.rate or 'max'} events/s)")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live ball-by-ball ingest with SSE push")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sp = sub.add_parser("serve", help="ingest a feed and stream win probabilities")
+    sp.add_argument("--feed", default="127.0.0.1:9200", help="host:port of a TCP feed")
+    sp.add_argument("--tail", help="tail a feed file instead of a socket")
+    sp.add_argument("--host", default="127.0.0.1")
+    sp.add_argument("--port", type=int, default=9110)
+    sp.add_argument("--model", default="pipe.pkl")
+    sp.add_argument("--strength", default=DEFAULT_STRENGTH_PATH)
+    sp.add_argument("--freeze-gc", action="store_true",
+                    help="exclude objects allocated at start-up from garbage collection")
+    rp = sub.add_parser("replay", help="stand-in feed replaying deliveries.csv")
+    rp.add_argument("--matches", default="matches.csv")
+    rp.add_argument("--deliveries", default="deliveries.csv")
+    rp.add_argument("--host", default="127.0.0.1")
+    rp.add_argument("--port", type=int, default=9200)
+    rp.add_argument("--output", help="append events to a file instead of serving them")
+    rp.add_argument("--rate", type=float, default=200, help="events per second (0 = max)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print(f"IPL Live Feed - {args.command}")
+    print("=" * 60)
+    try:
+        asyncio.run(_serve(args) if args.command == "serve" else _replay(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
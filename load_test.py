@@ -0,0 +1,178 @@
+"""
+Headless load test for app_streamlit.py.
+
+Simulates N concurrent user sessions running the predict flow (team
+selection, stepper clicks, Predict) through Streamlit's testing API.
+Sessions are spread over worker processes, and each worker runs its
+sessions at the same time, one thread per session, as the Streamlit
+server runs each session's script on its own thread. All N sessions are
+therefore in flight together, not just one per worker.
+
+Reports throughput, rerun latency percentiles per action and memory per
+session (the growth in the workers' current resident memory from opening
+the sessions, divided by the sessions) as JSON, so capacity can be
+tracked across releases.
+
+Usage:
+    python load_test.py --sessions 40 --workers 4 --output load_test.json
+"""
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+
+APP_PATH = "app_streamlit.py"
+
+# The predict flow every simulated user runs, in order
+FLOW = [
+    ("select_teams", lambda at: _select_teams(at, "Mumbai Indians", "Chennai Super Kings").run()),
+    ("overs_stepper", lambda at: at.button(key="overs_inc").click().run()),
+    ("balls_stepper", lambda at: at.button(key="balls_inc").click().run()),
+    ("predict", lambda at: _predict_button(at).click().run()),
+]
+
+
+def _select_teams(at, bat, bowl):
+    at.selectbox(key="select_bat").select(bat)
+    at.selectbox(key="select_bowl").select(bowl)
+    return at
+
+
+def _predict_button(at):
+    for button in at.button:
+        if "Predict" in button.label:
+            return button
+    raise LookupError("Predict button not rendered")
+
+
+def _rss_kb():
+    """Current resident memory of this process (the peak where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_worker(n_sessions, timeout):
+    """Open n_sessions sessions, run the flow on all of them at once, return raw samples"""
+    from streamlit.testing.v1 import AppTest
+
+    # Warm up imports and caches so they are not charged to the sessions
+    AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+
+    gc.collect()
+    rss_before = _rss_kb()
+    sessions = []
+    for _ in range(n_sessions):
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        at.run()
+        sessions.append(at)
+    gc.collect()
+    rss_after = _rss_kb()
+
+    latencies = {name: [] for name, _ in FLOW}
+    errors = []
+    ready = threading.Barrier(n_sessions)
+
+    def user(at):
+        ready.wait()
+        for name, action in FLOW:
+            start = time.perf_counter()
+            try:
+                action(at)
+                if at.exception:
+                    errors.append(name)
+            except Exception:
+                errors.append(name)
+            latencies[name].append(time.perf_counter() - start)
+        # Sessions share the process: check each ended with its own prediction
+        if not at.session_state["prediction_made"]:
+            errors.append("no_prediction")
+
+    threads = [threading.Thread(target=user, args=(at,)) for at in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "latencies": latencies,
+        "errors": len(errors),
+        "session_kb": (rss_after - rss_before) / max(n_sessions, 1),
+    }
+
+
+def percentiles(samples):
+    """Latency summary in milliseconds"""
+    arr = np.asarray(samples) * 1000
+    if arr.size == 0:
+        return {}
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 2),
+        "p90": round(float(np.percentile(arr, 90)), 2),
+        "p99": round(float(np.percentile(arr, 99)), 2),
+        "max": round(float(arr.max()), 2),
+    }
+
+
+def run(sessions, workers, timeout=30):
+    """Run the load test and return the report dict"""
+    workers = max(1, min(workers, sessions))
+    shares = [sessions // workers + (1 if i < sessions % workers else 0) for i in range(workers)]
+
+    start = time.perf_counter()
+    with mp.get_context("spawn").Pool(workers) as pool:
+        results = pool.starmap(run_worker, [(share, timeout) for share in shares])
+    elapsed = time.perf_counter() - start
+
+    by_action = {name: [] for name, _ in FLOW}
+    for result in results:
+        for name, samples in result["latencies"].items():
+            by_action[name].extend(samples)
+    all_samples = [s for samples in by_action.values() for s in samples]
+
+    return {
+        "app": APP_PATH,
+        "python": platform.python_version(),
+        "sessions": sessions,
+        "concurrent_sessions": sessions,
+        "workers": workers,
+        "interactions": len(all_samples),
+        "errors": sum(r["errors"] for r in results),
+        "duration_s": round(elapsed, 3),
+        "throughput_reruns_per_s": round(len(all_samples) / elapsed, 2),
+        "latency_ms": percentiles(all_samples),
+        "latency_ms_by_action": {name: percentiles(s) for name, s in by_action.items()},
+        "memory_per_session_kb": round(float(np.mean([r["session_kb"] for r in results])), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent sessions to simulate")
+    parser.add_argument("--workers", type=int, default=mp.cpu_count(), help="worker processes")
+    parser.add_argument("--timeout", type=float, default=30, help="per-rerun timeout in seconds")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.sessions, args.workers, args.timeout)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Struct-of-arrays store for many live (or simulated) chases at once.
+
+Instead of one dict of session keys per match, every field is one NumPy
+array indexed by match slot: teams and city as int8 codes into
+schema.TEAMS / schema.CITIES, score, target and balls as int16, wickets
+and status as int8 (about 13 bytes per match). Balls are counted as
+legal balls bowled, so overs/balls and the rain-shortened innings
+length (total_balls) fall out of plain integer arithmetic.
+
+apply_ball() advances N matches by one delivery each in a single
+vectorized call and settles the ones that finish. StateScorer folds a
+fitted pipeline, and the strength table if the model uses it, into
+weight tables indexed by those codes (team and city coefficients plus
+their strength terms, and a team x team table for head-to-head), so
+scoring every match is a few gathers and a multiply-add over integer
+arrays, with no DataFrame or string lookups:
+
+    store = MatchStateStore()
+    ids = store.add(states)                 # same columns as build_features
+    store.apply_ball(ids, runs, wicket)     # one delivery per match
+    win = StateScorer.from_pipeline(pipe, strength).score(store)
+"""
+import numpy as np
+import pandas as pd
+
+from aggregates import STRENGTH_FEATURES
+from schema import CITIES, MAX_WICKETS, TEAMS, build_features
+from scoring import LinearScorer
+
+# Slot status
+FREE, LIVE, WON, LOST = 0, 1, 2, 3
+
+FIELDS = {
+    "batting": np.int8,
+    "bowling": np.int8,
+    "city": np.int8,
+    "score": np.int16,
+    "wickets": np.int8,      # fallen
+    "target": np.int16,
+    "bowled": np.int16,      # legal balls bowled
+    "total_balls": np.int16,
+    "status": np.int8,
+}
+
+_TEAM_CODES = {team: i for i, team in enumerate(TEAMS)}
+_CITY_CODES = {city: i for i, city in enumerate(CITIES)}
+# Numeric model features derived from the stored integers
+DERIVED = ['runs_left', 'balls_left', 'wickets', 'total_runs_x', 'crr', 'rrr', 'total_balls']
+
+
+class MatchStateStore:
+    """One array per match field; a match is a slot index"""
+
+    def __init__(self, capacity=1024):
+        self.size = 0  # slots handed out so far (free ones are reused)
+        for name, dtype in FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    @property
+    def capacity(self):
+        return len(self.status)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in FIELDS)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.status[:self.size] != FREE))
+
+    def _grow(self, capacity):
+        for name in FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _slots(self, n):
+        free = np.flatnonzero(self.status[:self.size] == FREE)[:n]
+        extra = n - len(free)
+        if self.size + extra > self.capacity:
+            self._grow(max(2 * self.capacity, self.size + extra))
+        new = np.arange(self.size, self.size + extra)
+        self.size += extra
+        return np.concatenate([free, new])
+
+    def add(self, states):
+        """Store raw match states (build_features columns); returns their slot ids.
+
+        Raises ValueError listing the problems if any state is invalid.
+        """
+        result = build_features(states)
+        if not result.valid.all():
+            problems = "; ".join(f"row {e['row']} {e['field']}: {e['error']}"
+                                 for e in result.errors[:5])
+            raise ValueError(f"{int((~result.valid).sum())} invalid match state(s): {problems}")
+        f = result.features
+        ids = self._slots(len(f))
+        self.batting[ids] = f['batting_team'].map(_TEAM_CODES).to_numpy()
+        self.bowling[ids] = f['bowling_team'].map(_TEAM_CODES).to_numpy()
+        self.city[ids] = f['city'].map(_CITY_CODES).to_numpy()
+        total = f['total_balls'].to_numpy()
+        self.target[ids] = f['total_runs_x'].to_numpy()
+        self.score[ids] = f['total_runs_x'].to_numpy() - f['runs_left'].to_numpy()
+        self.wickets[ids] = MAX_WICKETS - f['wickets'].to_numpy()
+        self.bowled[ids] = total - f['balls_left'].to_numpy()
+        self.total_balls[ids] = total
+        self.status[ids] = LIVE
+        return ids
+
+    def release(self, ids):
+        """Free slots for reuse"""
+        self.status[ids] = FREE
+
+    def apply_ball(self, ids, runs, wicket=False, legal=True):
+        """One delivery for each match in ids (unique slots); finished/free slots are skipped.
+
+        runs: total runs off the delivery (extras included); wicket: a
+        wicket fell; legal: counts towards the over (False for wides and
+        no-balls). Scalars broadcast. Returns the slots that finished.
+        """
+        ids = np.asarray(ids, dtype=np.intp)
+        live = self.status[ids] == LIVE
+        ids = ids[live]
+
+        def pick(values):
+            values = np.asarray(values)
+            return values[live] if values.ndim else values
+
+        self.score[ids] += pick(runs).astype(np.int16)
+        self.wickets[ids] += pick(wicket).astype(np.int8)
+        self.bowled[ids] += pick(legal).astype(np.int16)
+
+        won = self.score[ids] >= self.target[ids]
+        lost = ~won & ((self.wickets[ids] >= MAX_WICKETS) |
+                       (self.bowled[ids] >= self.total_balls[ids]))
+        self.status[ids[won]] = WON
+        self.status[ids[lost]] = LOST
+        return ids[won | lost]
+
+    def features(self, ids=None):
+        """Model feature frame (schema.FEATURES order) for slots, e.g. to cross-check a pipeline"""
+        ids = np.arange(self.size) if ids is None else np.asarray(ids, dtype=np.intp)
+        score, target, bowled, total = (getattr(self, name)[ids].astype(float)
+                                        for name in ("score", "target", "bowled", "total_balls"))
+        runs_left, balls_left = target - score, total - bowled
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crr = np.where(bowled > 0, score * 6 / bowled, 0.0)
+            rrr = np.where(balls_left > 0, runs_left * 6 / balls_left, 0.0)
+        return pd.DataFrame({
+            "batting_team": np.array(TEAMS, dtype=object)[self.batting[ids]],
+            "bowling_team": np.array(TEAMS, dtype=object)[self.bowling[ids]],
+            "city": np.array(CITIES, dtype=object)[self.city[ids]],
+            "runs_left": runs_left,
+            "balls_left": balls_left,
+            "wickets": MAX_WICKETS - self.wickets[ids].astype(float),
+            "total_runs_x": target,
+            "crr": crr,
+            "rrr": rrr,
+            "total_balls": total,
+        })
+
+
+def _index(store, ids):
+    return slice(0, store.size) if ids is None else np.asarray(ids, dtype=np.intp)
+
+
+class StateScorer:
+    """A linear model compiled against the store's integer codes"""
+
+    def __init__(self, bat, bowl, pair, city, numeric):
+        self.bat = bat          # (n_teams,) intercept + batting_team coef + form term
+        self.bowl = bowl        # (n_teams,) bowling_team coef + form term
+        self.pair = pair        # (n_teams, n_teams) head-to-head term
+        self.city = city        # (n_cities,) city coef + venue terms
+        self.numeric = numeric  # coefficient per DERIVED column
+
+    @classmethod
+    def from_pipeline(cls, pipe, strength=None):
+        """Compile a fitted pipeline (or LinearScorer); strength is required for strength models"""
+        scorer = pipe if isinstance(pipe, LinearScorer) else LinearScorer.from_pipeline(pipe)
+
+        weights = dict(scorer.numeric)
+        unsupported = set(weights) - set(DERIVED) - set(STRENGTH_FEATURES)
+        if unsupported:
+            raise ValueError(f"Model uses features the store does not keep: {sorted(unsupported)}")
+        uses_strength = any(weights.get(c, 0.0) != 0.0 for c in STRENGTH_FEATURES)
+        if uses_strength and strength is None:
+            raise ValueError("Model uses strength features; pass the StrengthTable")
+
+        # Names the model never saw get its fallback weight (scoring.LinearScorer)
+        bat = scorer.intercept + scorer.category_weights('batting_team', TEAMS)
+        bowl = scorer.category_weights('bowling_team', TEAMS)
+        city = scorer.category_weights('city', CITIES)
+        pair = np.zeros((len(TEAMS), len(TEAMS)))
+        if uses_strength:
+            teams = np.array(TEAMS, dtype=object)
+            cities = np.array(CITIES, dtype=object)
+            form = strength.lookup(teams, teams, np.full(len(teams), cities[0], dtype=object))
+            bat = bat + weights.get('batting_form', 0.0) * form['batting_form']
+            bowl = bowl + weights.get('bowling_form', 0.0) * form['bowling_form']
+            b, o = np.meshgrid(np.arange(len(TEAMS)), np.arange(len(TEAMS)), indexing='ij')
+            h2h = strength.lookup(teams[b.ravel()], teams[o.ravel()],
+                                  np.full(b.size, cities[0], dtype=object))['head_to_head']
+            pair = weights.get('head_to_head', 0.0) * h2h.reshape(b.shape)
+            venue = strength.lookup(np.full(len(cities), teams[0], dtype=object),
+                                    np.full(len(cities), teams[0], dtype=object), cities)
+            city = (city + weights.get('venue_chase_rate', 0.0) * venue['venue_chase_rate']
+                    + weights.get('venue_par', 0.0) * venue['venue_par'])
+        return cls(bat, bowl, pair, city, np.array([weights.get(c, 0.0) for c in DERIVED]))
+
+    def decision_function(self, store, ids=None):
+        ids = _index(store, ids)
+        bat, bowl = store.batting[ids], store.bowling[ids]
+        score = store.score[ids].astype(np.float64)
+        target = store.target[ids].astype(np.float64)
+        bowled = store.bowled[ids].astype(np.float64)
+        total = store.total_balls[ids].astype(np.float64)
+        runs_left, balls_left = target - score, total - bowled
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crr = np.where(bowled > 0, score * 6 / bowled, 0.0)
+            rrr = np.where(balls_left > 0, runs_left * 6 / balls_left, 0.0)
+        w = self.numeric
+        return (self.bat[bat] + self.bowl[bowl] + self.pair[bat, bowl] + self.city[store.city[ids]]
+                + w[0] * runs_left + w[1] * balls_left
+                + w[2] * (MAX_WICKETS - store.wickets[ids].astype(np.float64))
+                + w[3] * target + w[4] * crr + w[5] * rrr + w[6] * total)
+
+    def score(self, store, ids=None):
+        """Win probability of the chasing side per slot: 1/0 once decided, NaN for free slots"""
+        p = 1.0 / (1.0 + np.exp(-self.decision_function(store, ids)))
+        status = store.status[_index(store, ids)]
+        p[status == WON] = 1.0
+        p[status == LOST] = 0.0
+        p[status == FREE] = np.nan
+        return p
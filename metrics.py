@@ -0,0 +1,183 @@
+"""
+Low-overhead in-process metrics with a Prometheus text endpoint.
+
+Counters, gauges and fixed-bucket histograms are plain Python objects whose
+hot-path methods do a couple of attribute updates and no locking (updates
+rely on the GIL; a lost increment under a thread race is acceptable for
+monitoring). The registry renders everything in the Prometheus text
+exposition format, served by start_http_server() on a local port.
+
+Micro-benchmark: python bench_metrics.py
+"""
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, tuned for sub-millisecond to ~1s model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by one label"""
+    kind = "counter"
+
+    def __init__(self, name, doc, label=None):
+        self.name = name
+        self.doc = doc
+        self.label = label
+        self.value = 0
+        self._children = {}
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def labels(self, value):
+        """Child counter for one label value (cache it on hot paths)"""
+        child = self._children.get(value)
+        if child is None:
+            child = self._children[value] = Counter(self.name, self.doc)
+        return child
+
+    def samples(self):
+        if self.label is None:
+            yield self.name, (), self.value
+        for value, child in sorted(self._children.items()):
+            yield self.name, ((self.label, value),), child.value
+
+
+class Gauge:
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def __init__(self, name, doc):
+        self.name = name
+        self.doc = doc
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        yield self.name, (), self.value
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect and three updates"""
+    kind = "histogram"
+
+    def __init__(self, name, doc, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus the +Inf overflow slot
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{self.name}_bucket", (("le", repr(bound)),), cumulative
+        yield f"{self.name}_bucket", (("le", "+Inf"),), self.count
+        yield f"{self.name}_sum", (), self.sum
+        yield f"{self.name}_count", (), self.count
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, doc, label=None):
+        return self._register(Counter(name, doc, label))
+
+    def gauge(self, name, doc):
+        return self._register(Gauge(name, doc))
+
+    def histogram(self, name, doc, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, doc, buckets))
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def start_http_server(port, registry, addr="127.0.0.1"):
+    """Serve registry.render() at /metrics from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# ---------------------------------------------------------
+# APPLICATION METRICS
+# ---------------------------------------------------------
+REGISTRY = Registry()
+
+PREDICTIONS = REGISTRY.counter("ipl_predictions_total", "Predictions served")
+PREDICTIONS_BY_VERSION = REGISTRY.counter("ipl_predictions_by_version_total",
+                                          "Predictions served per model version", label="version")
+PREDICT_LATENCY = REGISTRY.histogram("ipl_predict_proba_seconds", "predict_proba latency")
+MODEL_LOAD_SECONDS = REGISTRY.gauge("ipl_model_load_seconds", "Duration of the last load_model() call")
+MODEL_VERIFY_SECONDS = REGISTRY.gauge("ipl_model_verify_seconds",
+                                      "Hash + golden-prediction check of the served model")
+MODEL_FALLBACK = REGISTRY.gauge("ipl_model_fallback", "1 if serving the backup model artifact")
+ERRORS = REGISTRY.counter("ipl_errors_total", "Errors by exception type", label="exception")
+RERUNS = REGISTRY.counter("ipl_reruns_total",
+                          "Streamlit reruns (full script or the panels fragment)")
+LIVE_EVENTS = REGISTRY.counter("ipl_live_events_total", "Feed events ingested by live_feed.py")
+LIVE_SUBSCRIBERS = REGISTRY.gauge("ipl_live_subscribers", "Connected live-update subscribers")
+LIVE_FANOUT_SECONDS = REGISTRY.histogram("ipl_live_fanout_seconds",
+                                         "Feed event received -> update written to a client")
+CACHE_HITS = REGISTRY.counter("ipl_cache_hits_total", "Prediction cache hits by tier", label="tier")
+CACHE_MISSES = REGISTRY.counter("ipl_cache_misses_total", "Prediction cache lookups missing in every tier")
+CACHE_HIT_RATIO = REGISTRY.gauge("ipl_cache_hit_ratio",
+                                 "Share of this process's prediction cache lookups that hit")
+CACHE_BACKEND_ERRORS = REGISTRY.counter("ipl_cache_backend_errors_total",
+                                        "Cache backend failures, served as misses", label="backend")
+CACHE_REMOTE_SECONDS = REGISTRY.histogram("ipl_cache_remote_seconds",
+                                          "Network cache round trip per bulk get/set")
@@ -0,0 +1,235 @@
+"""
+Player-level statistics from deliveries.csv in a compact array-backed store.
+
+Every batsman/bowler name gets an integer id. Per player, phase (powerplay
+overs 1-6, middle 7-15, death 16-20) and window (career, last
+RECENT_MATCHES matches the player appeared in), the store keeps:
+
+* batting: strike rate (runs per 100 balls) and dismissal rate (outs per ball),
+* bowling: economy (runs per over) and dismissal rate (wickets per ball).
+
+Rates are shrunk towards the league rate for the phase with a few prior
+balls, so rarely seen players look average rather than extreme. They live
+in one float32 array rates[player, window, phase, stat] whose last row is
+the league average, used for unknown players. A lookup is then a fancy
+index, with no per-row branching.
+
+"Recent" follows the match dates in matches.csv (ties by id), not the
+match ids, which are not chronological (IPL 2017 is ids 1-59). To avoid
+leakage when training on these, build the store only from matches before
+the period being predicted (match_ids).
+
+    python players.py deliveries.csv [--matches matches.csv] [--output players.npz]
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import match_dates
+from artifact import atomic_write
+from delivery_store import read_deliveries
+
+PHASES = ('powerplay', 'middle', 'death')
+PHASE_LAST_OVER = (6, 15, 20)
+WINDOWS = ('career', 'recent')
+STATS = ('strike_rate', 'batting_dismissal_rate', 'economy', 'bowling_dismissal_rate')
+RECENT_MATCHES = 10
+PRIOR_BALLS = 30
+BOWLER_QUOTA_BALLS = 24
+DEFAULT_PLAYERS_PATH = "players.npz"
+# Not credited to the bowler
+NON_BOWLER_DISMISSALS = ('run out', 'retired hurt', 'obstructing the field')
+
+
+def phase_of(over):
+    """deliveries.csv 'over' (1-based) -> phase index 0/1/2"""
+    return np.searchsorted(PHASE_LAST_OVER, np.asarray(over), side='left').clip(0, len(PHASES) - 1)
+
+
+def match_order(match):
+    """Match ids oldest first: matches.csv sorted by date, then id"""
+    dated = pd.DataFrame({"match_id": match['id'].to_numpy(), "date": match_dates(match).to_numpy()})
+    undated = dated['date'].isna()
+    if undated.any():
+        raise ValueError(f"{int(undated.sum())} matches have no readable date "
+                         f"(first: id {dated.loc[undated, 'match_id'].iloc[0]})")
+    return dated.sort_values(['date', 'match_id'], kind='stable')['match_id'].to_numpy()
+
+
+def _counts(delivery):
+    """Per (player, match, phase) batting and bowling counts"""
+    phase = phase_of(delivery['over'])
+    wide = delivery['wide_runs'].to_numpy() > 0
+    noball = delivery['noball_runs'].to_numpy() > 0
+    dismissed = delivery['player_dismissed'].notna().to_numpy()
+    if 'dismissal_kind' in delivery:
+        bowler_wicket = dismissed & ~delivery['dismissal_kind'].isin(NON_BOWLER_DISMISSALS).to_numpy()
+    else:
+        bowler_wicket = dismissed
+    conceded = delivery['total_runs'].to_numpy()
+    for column in ('bye_runs', 'legbye_runs', 'penalty_runs'):
+        if column in delivery:
+            conceded = conceded - delivery[column].to_numpy()
+
+    batting = pd.DataFrame({
+        "player": delivery['batsman'].to_numpy(), "match_id": delivery['match_id'].to_numpy(),
+        "phase": phase, "bat_balls": (~wide).astype(np.int32),
+        "bat_runs": delivery['batsman_runs'].to_numpy(dtype=np.int32), "bat_outs": 0,
+    })
+    outs = pd.DataFrame({
+        "player": delivery['player_dismissed'].to_numpy()[dismissed],
+        "match_id": delivery['match_id'].to_numpy()[dismissed], "phase": phase[dismissed],
+        "bat_balls": 0, "bat_runs": 0, "bat_outs": 1,
+    })
+    bowling = pd.DataFrame({
+        "player": delivery['bowler'].to_numpy(), "match_id": delivery['match_id'].to_numpy(),
+        "phase": phase, "bowl_balls": (~wide & ~noball).astype(np.int32),
+        "bowl_runs": conceded.astype(np.int32), "bowl_wickets": bowler_wicket.astype(np.int32),
+    })
+    keys = ["player", "match_id", "phase"]
+    counts = pd.concat([batting, outs, bowling], ignore_index=True).fillna(0)
+    return counts.groupby(keys, sort=False).sum().reset_index()
+
+
+class PlayerStore:
+    """Career/recent per-phase player rates in one array, indexed by integer player id"""
+
+    def __init__(self, names, rates, league):
+        self.names = list(names)
+        self.rates = rates        # (n_players + 1, len(WINDOWS), len(PHASES), len(STATS)) float32
+        self.league = league      # (len(PHASES), len(STATS)) float32
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self.unknown_id = len(self.names)
+
+    @classmethod
+    def build(cls, delivery, match, match_ids=None):
+        """delivery: deliveries.csv frame; match: matches.csv frame, for the match dates"""
+        if match_ids is not None:
+            delivery = delivery[delivery['match_id'].isin(match_ids)]
+        order = match_order(match)
+        unknown = ~delivery['match_id'].isin(order)
+        if unknown.any():
+            raise ValueError(f"{delivery.loc[unknown, 'match_id'].nunique()} matches in deliveries "
+                             "are not in matches")
+        counts = _counts(delivery)
+        names, player = np.unique(counts['player'].to_numpy(dtype=str), return_inverse=True)
+        counts['player'] = player
+
+        # Recent window: the player's last RECENT_MATCHES matches
+        counts['seq'] = pd.Series(np.arange(len(order)), index=order).reindex(
+            counts['match_id']).to_numpy()
+        played = counts[['player', 'match_id', 'seq']].drop_duplicates(['player', 'match_id'])
+        played = played.sort_values(['player', 'seq'], ascending=[True, False])
+        played['ago'] = played.groupby('player').cumcount()
+        counts = counts.merge(played[['player', 'match_id', 'ago']], on=['player', 'match_id'])
+
+        columns = ['bat_balls', 'bat_runs', 'bat_outs', 'bowl_balls', 'bowl_runs', 'bowl_wickets']
+        n, p = len(names), len(PHASES)
+        raw = np.zeros((n, len(WINDOWS), p, len(columns)))
+        for w, subset in enumerate((counts, counts[counts['ago'] < RECENT_MATCHES])):
+            np.add.at(raw, (subset['player'].to_numpy(), w, subset['phase'].to_numpy()),
+                      subset[columns].to_numpy(dtype=float))
+
+        totals = raw[:, 0].sum(axis=0)  # (phases, columns), career
+        with np.errstate(divide='ignore', invalid='ignore'):
+            league = np.stack([
+                100 * totals[:, 1] / totals[:, 0],
+                totals[:, 2] / totals[:, 0],
+                6 * totals[:, 4] / totals[:, 3],
+                totals[:, 5] / totals[:, 3],
+            ], axis=-1)
+        league = np.nan_to_num(league)
+
+        bat_balls = raw[..., 0] + PRIOR_BALLS
+        bowl_balls = raw[..., 3] + PRIOR_BALLS
+        rates = np.empty((n + 1, len(WINDOWS), p, len(STATS)), dtype=np.float32)
+        rates[:n, ..., 0] = 100 * (raw[..., 1] + PRIOR_BALLS * league[:, 0] / 100) / bat_balls
+        rates[:n, ..., 1] = (raw[..., 2] + PRIOR_BALLS * league[:, 1]) / bat_balls
+        rates[:n, ..., 2] = 6 * (raw[..., 4] + PRIOR_BALLS * league[:, 2] / 6) / bowl_balls
+        rates[:n, ..., 3] = (raw[..., 5] + PRIOR_BALLS * league[:, 3]) / bowl_balls
+        rates[n] = league
+        return cls(names, rates, league.astype(np.float32))
+
+    def player_ids(self, names):
+        """Integer ids for an array of names; unknown players -> unknown_id (league average)"""
+        ids, unknown = self._ids, self.unknown_id
+        return np.fromiter((ids.get(name, unknown) for name in names), dtype=np.intp,
+                           count=len(names))
+
+    def lookup(self, ids, phase, window=0):
+        """(n, len(STATS)) rates for integer ids at per-row phases"""
+        return self.rates[ids, window, phase]
+
+    def crease_features(self, striker_ids, non_striker_ids, phase, window=0):
+        """Batsmen at the crease: combined strike rate and dismissal rate"""
+        striker = self.rates[striker_ids, window, phase]
+        partner = self.rates[non_striker_ids, window, phase]
+        return {
+            "crease_strike_rate": (striker[:, 0] + partner[:, 0]) / 2,
+            "crease_dismissal_rate": (striker[:, 1] + partner[:, 1]) / 2,
+        }
+
+    def remaining_bowling_features(self, bowler_ids, balls_bowled, phase, window=0):
+        """Bowling attack still available, from each used bowler's remaining quota.
+
+        bowler_ids / balls_bowled: (n, k) bowlers used so far in the innings
+        and their legal balls, padded with unknown_id / BOWLER_QUOTA_BALLS.
+        Returns the quota-weighted economy and dismissal rate of the
+        remaining overs, and how many balls that quota covers.
+        """
+        left = np.clip(BOWLER_QUOTA_BALLS - np.asarray(balls_bowled, dtype=np.float32), 0, None)
+        total = left.sum(axis=1)
+        # Gather only the two bowling stats, via flat offsets into rates
+        _, w, p, s = self.rates.shape
+        flat = ((np.asarray(bowler_ids) * w + window) * p + np.asarray(phase)[:, None]) * s
+        table = self.rates.reshape(-1)
+        economy = (left * table[flat + 2]).sum(axis=1)
+        wickets = (left * table[flat + 3]).sum(axis=1)
+        league = self.league[phase]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                "remaining_quota_balls": total,
+                "remaining_economy": np.where(total > 0, economy / total, league[:, 2]),
+                "remaining_dismissal_rate": np.where(total > 0, wickets / total, league[:, 3]),
+            }
+
+    def save(self, path=DEFAULT_PLAYERS_PATH):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, names=np.array(self.names), rates=self.rates, league=self.league)
+        atomic_write(path, buffer.getvalue())
+
+    @classmethod
+    def load(cls, path=DEFAULT_PLAYERS_PATH):
+        with np.load(path) as z:
+            return cls(z['names'].tolist(), z['rates'], z['league'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the player-stat store from deliveries.csv")
+    parser.add_argument("deliveries", nargs="?", default="deliveries.csv",
+                        help="deliveries CSV or a store from delivery_store.py")
+    parser.add_argument("--matches", default="matches.csv")
+    parser.add_argument("--output", default=DEFAULT_PLAYERS_PATH)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Player Stat Store")
+    print("=" * 60)
+    start = time.perf_counter()
+    store = PlayerStore.build(read_deliveries(args.deliveries), pd.read_csv(args.matches))
+    store.save(args.output)
+    print(f"   Players:   {len(store.names):,}")
+    print(f"   Built in:  {time.perf_counter() - start:.2f}s")
+    print(f"   Table:     {store.rates.nbytes / 1024:.0f} KiB ({store.rates.dtype}, {store.rates.shape})")
+    for p, phase in enumerate(PHASES):
+        sr, out, econ, wkt = store.league[p]
+        print(f"   League {phase:<10} SR {sr:6.1f}  out/ball {out:.3f}  "
+              f"econ {econ:5.2f}  wkt/ball {wkt:.3f}")
+    print(f"   ✅ Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
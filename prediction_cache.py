@@ -0,0 +1,482 @@
+"""
+Shared prediction cache for app replicas.
+
+Keys are a hash of the model version(s) and the canonical feature row, so
+a popular live state is scored once and then read back by every replica
+instead of being recomputed on each. Both tiers are optional and both take
+bulk calls: get_many(keys) -> [bytes or None], set_many([(key, bytes)]).
+
+* MmapCache: an open-addressing hash table in a memory-mapped file, shared
+  by the replicas on one host (put it on /dev/shm). Slots are fixed-size
+  and carry a CRC32 of key and value; there are no locks, so a slot torn
+  by a concurrent writer fails its check and reads as a miss. A key lives
+  in one of PROBES slots after its hash; when they are all taken, one is
+  overwritten.
+* RespCache: a network tier speaking the Redis protocol, so it runs
+  against Redis/Valkey or the stand-in server here (serve). A bulk get is
+  one MGET and a bulk set is one pipelined write of SET ... PX commands,
+  one round trip each. If the server is down or slow, calls return
+  misses (sets are dropped) and it is retried after RETRY_SECONDS, so
+  replicas keep scoring on their own. Round trips on one client are
+  serialized, so app sessions on different threads can share it.
+
+TieredCache reads the local tier first, then the network for the rest,
+and copies network hits into the local tier. Hits per tier, misses,
+the hit ratio and backend errors go to metrics.REGISTRY.
+
+The app builds one from the environment (no variables, no cache):
+
+    IPL_CACHE_PATH=/dev/shm/ipl-cache IPL_CACHE_URL=redis://127.0.0.1:6390 \\
+        streamlit run app_streamlit.py
+    python prediction_cache.py serve --port 6390        # stand-in network backend
+    python prediction_cache.py stats /dev/shm/ipl-cache
+"""
+import argparse
+import asyncio
+import hashlib
+import mmap
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import metrics
+
+KEY_BYTES = 16
+SLOT_BYTES = 256
+VALUE_BYTES = SLOT_BYTES - 24
+DEFAULT_SLOTS = 1 << 16
+PROBES = 8
+MAGIC = b"IPLCACHE"
+HEADER = struct.Struct("<8sIIQ")  # magic, format, slot bytes, slots
+HEADER_BYTES = 64
+FORMAT = 1
+SLOT = np.dtype([("k0", "<u8"), ("k1", "<u8"), ("crc", "<u4"), ("length", "<u2"),
+                 ("pad", "<u2"), ("value", "u1", (VALUE_BYTES,))])
+KEY_PREFIX = b"ipl:pred:"
+DEFAULT_TTL_SECONDS = 3600
+TIMEOUT_SECONDS = 0.05
+RETRY_SECONDS = 5.0
+ROUND_DECIMALS = 9
+
+
+def state_keys(version, features, columns=None):
+    """16-byte key per row: BLAKE2b of the version string, the column names
+    and the row's values (text as given, numbers rounded to ROUND_DECIMALS)"""
+    columns = list(features.columns if columns is None else columns)
+    prefix = hashlib.blake2b(f"{version}\0{','.join(columns)}".encode(), digest_size=KEY_BYTES)
+    # One pass over the frame: per-column pandas indexing costs more than
+    # scoring a row of a linear model does
+    rows = features.to_numpy()
+    position = {c: i for i, c in enumerate(features.columns)}
+    rows = rows[:, [position[c] for c in columns]]
+    text = np.array([isinstance(v, str) for v in rows[0]]) if len(rows) else np.zeros(len(columns), bool)
+    names = rows[:, text].astype(str)
+    # + 0.0 folds -0.0 into 0.0 so equal values hash equally
+    values = np.round(rows[:, ~text].astype(float), ROUND_DECIMALS) + 0.0
+    keys = []
+    for row_names, row_values in zip(names, values):
+        h = prefix.copy()
+        h.update("\0".join(row_names).encode())
+        h.update(row_values.tobytes())
+        keys.append(h.digest())
+    return keys
+
+
+def _crc(key, value):
+    return zlib.crc32(value, zlib.crc32(key + len(value).to_bytes(2, "little")))
+
+
+# ---------------------------------------------------------
+# LOCAL TIER
+# ---------------------------------------------------------
+class MmapCache:
+    """Lock-free hash table in a memory-mapped file shared between processes"""
+
+    name = "mmap"
+
+    def __init__(self, path, slots=DEFAULT_SLOTS):
+        if not os.path.exists(path):
+            _create(path, slots)
+        with open(path, "r+b") as f:
+            self._mm = mmap.mmap(f.fileno(), 0)
+        magic, fmt, slot_bytes, n = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or fmt != FORMAT or slot_bytes != SLOT_BYTES:
+            self._mm.close()
+            raise ValueError(f"{path} is not a prediction cache file (format {FORMAT})")
+        self.path = path
+        self.slots = n
+        self._table = np.frombuffer(self._mm, dtype=SLOT, count=n, offset=HEADER_BYTES)
+        self._probe = np.arange(PROBES, dtype=np.uint64)
+
+    def _windows(self, k0):
+        return ((k0[:, None] % np.uint64(self.slots) + self._probe) % np.uint64(self.slots)).astype(np.intp)
+
+    @staticmethod
+    def _split(keys):
+        k = np.frombuffer(b"".join(keys), dtype="<u8").reshape(-1, 2)
+        return k[:, 0], k[:, 1]
+
+    def get_many(self, keys):
+        out = [None] * len(keys)
+        if not keys:
+            return out
+        k0, k1 = self._split(keys)
+        windows = self._windows(k0)
+        records = self._table[windows]  # a copy: checked below against concurrent writes
+        match = (records["k0"] == k0[:, None]) & (records["k1"] == k1[:, None])
+        for i in np.flatnonzero(match.any(axis=1)):
+            record = records[i, int(np.argmax(match[i]))]
+            length = int(record["length"])
+            if length > VALUE_BYTES:
+                continue
+            value = record["value"][:length].tobytes()
+            if int(record["crc"]) == _crc(keys[i], value):
+                out[i] = value
+        return out
+
+    def set_many(self, items):
+        items = [(k, v) for k, v in items if len(v) <= VALUE_BYTES]
+        if not items:
+            return
+        k0, k1 = self._split([k for k, _ in items])
+        windows = self._windows(k0)
+        record = np.zeros((), dtype=SLOT)
+        for i, (key, value) in enumerate(items):
+            window = windows[i]
+            current = self._table[window]
+            same = np.flatnonzero((current["k0"] == k0[i]) & (current["k1"] == k1[i]))
+            empty = np.flatnonzero((current["k0"] == 0) & (current["k1"] == 0))
+            if len(same):
+                slot = window[same[0]]
+            elif len(empty):
+                slot = window[empty[0]]
+            else:
+                slot = window[int(k1[i] % np.uint64(PROBES))]
+            record["k0"], record["k1"] = k0[i], k1[i]
+            record["crc"] = _crc(key, value)
+            record["length"] = len(value)
+            record["value"][:] = 0
+            record["value"][:len(value)] = np.frombuffer(value, dtype=np.uint8)
+            self._table[slot] = record
+
+    def stats(self):
+        used = int(np.count_nonzero((self._table["k0"] != 0) | (self._table["k1"] != 0)))
+        return {"path": self.path, "slots": self.slots, "used": used,
+                "bytes": HEADER_BYTES + self.slots * SLOT_BYTES}
+
+    def close(self):
+        self._table = None
+        self._mm.close()
+
+
+def _create(path, slots):
+    """Write an empty (sparse) table beside path and link it into place, so
+    replicas starting together all map the same file"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT, SLOT_BYTES, slots).ljust(HEADER_BYTES, b"\0"))
+        f.truncate(HEADER_BYTES + slots * SLOT_BYTES)
+    try:
+        os.link(tmp, path)
+    except FileExistsError:
+        pass  # another replica created it first
+    finally:
+        os.remove(tmp)
+
+
+# ---------------------------------------------------------
+# NETWORK TIER (Redis protocol)
+# ---------------------------------------------------------
+class CacheProtocolError(Exception):
+    """The network backend sent an error or an unexpected reply"""
+
+
+def _command(*parts):
+    out = [b"*%d\r\n" % len(parts)]
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = str(part).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(part), part))
+    return b"".join(out)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body
+    if kind == b"-":
+        raise CacheProtocolError(body.decode(errors="replace"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("connection closed")
+        return data[:-2]
+    if kind == b"*":
+        length = int(body)
+        return None if length < 0 else [_read_reply(reader) for _ in range(length)]
+    raise CacheProtocolError(f"unexpected reply {line[:20]!r}")
+
+
+class RespCache:
+    """Redis-protocol client with bulk MGET / pipelined SET and a retry backoff"""
+
+    name = "resp"
+
+    def __init__(self, url, ttl=DEFAULT_TTL_SECONDS, timeout=TIMEOUT_SECONDS,
+                 retry=RETRY_SECONDS):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname or "127.0.0.1", parts.port or 6379
+        self.ttl_ms = int(ttl * 1000)
+        self.timeout = timeout
+        self.retry = retry
+        self._sock = None
+        self._reader = None
+        self._down_until = 0.0
+        # One connection per client: a round trip holds it from send to the
+        # last reply, or concurrent sessions would read each other's replies
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock, self._reader = sock, sock.makefile("rb")
+
+    def _close(self):
+        for handle in (self._reader, self._sock):
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self._sock = self._reader = None
+
+    def _round_trip(self, payload, replies):
+        """Send pipelined commands and read their replies; None if the backend is unavailable"""
+        with self._lock:
+            return self._locked_round_trip(payload, replies)
+
+    def _locked_round_trip(self, payload, replies):
+        if time.monotonic() < self._down_until:
+            return None
+        start = time.perf_counter()
+        try:
+            if self._sock is None:
+                self._connect()
+            self._sock.sendall(payload)
+            result = [_read_reply(self._reader) for _ in range(replies)]
+        except (OSError, ValueError, CacheProtocolError) as e:
+            # Unreachable, timed out or confused: serve misses, try again later
+            metrics.CACHE_BACKEND_ERRORS.labels(self.name).inc()
+            metrics.ERRORS.labels(type(e).__name__).inc()
+            self._close()
+            self._down_until = time.monotonic() + self.retry
+            return None
+        metrics.CACHE_REMOTE_SECONDS.observe(time.perf_counter() - start)
+        return result
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        reply = self._round_trip(_command(b"MGET", *[KEY_PREFIX + k for k in keys]), 1)
+        if reply is None or not isinstance(reply[0], list) or len(reply[0]) != len(keys):
+            return [None] * len(keys)
+        return reply[0]
+
+    def set_many(self, items):
+        if not items:
+            return
+        payload = b"".join(_command(b"SET", KEY_PREFIX + k, v, b"PX", self.ttl_ms) for k, v in items)
+        self._round_trip(payload, len(items))
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class StandInServer:
+    """In-memory server for the subset of the Redis protocol RespCache uses
+    (PING, GET, SET [PX|EX], MGET, MSET, DEL, DBSIZE, FLUSHALL)"""
+
+    def __init__(self):
+        self.data = {}  # key -> (value, deadline or None)
+        self.commands = 0
+
+    def _get(self, key, now):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, deadline = entry
+        if deadline is not None and deadline <= now:
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args):
+        self.commands += 1
+        name, args = args[0].upper(), args[1:]
+        now = time.monotonic()
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name == b"GET" and len(args) == 1:
+            return _bulk(self._get(args[0], now))
+        if name == b"MGET" and args:
+            return b"*%d\r\n" % len(args) + b"".join(_bulk(self._get(k, now)) for k in args)
+        if name == b"SET" and len(args) in (2, 4):
+            deadline = None
+            if len(args) == 4:
+                unit = args[2].upper()
+                if unit not in (b"PX", b"EX"):
+                    return b"-ERR syntax error\r\n"
+                deadline = now + int(args[3]) / (1000 if unit == b"PX" else 1)
+            self.data[args[0]] = (args[1], deadline)
+            return b"+OK\r\n"
+        if name == b"MSET" and args and len(args) % 2 == 0:
+            for key, value in zip(args[::2], args[1::2]):
+                self.data[key] = (value, None)
+            return b"+OK\r\n"
+        if name == b"DEL" and args:
+            return b":%d\r\n" % sum(self.data.pop(k, None) is not None for k in args)
+        if name == b"DBSIZE":
+            return b":%d\r\n" % len(self.data)
+        if name == b"FLUSHALL":
+            self.data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command or wrong number of arguments\r\n"
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.startswith(b"*"):
+                    writer.write(b"-ERR expected an array of bulk strings\r\n")
+                    break
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self.execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=0):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def _bulk(value):
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+# ---------------------------------------------------------
+# TIERS
+# ---------------------------------------------------------
+class TieredCache:
+    """Local tier, then network tier; network hits are copied into the local tier"""
+
+    def __init__(self, local=None, remote=None):
+        self.local = local
+        self.remote = remote
+        self.lookups = 0
+        self.hits = 0
+        self._hits = {tier.name: metrics.CACHE_HITS.labels(tier.name)
+                      for tier in (local, remote) if tier is not None}
+
+    def get_many(self, keys):
+        values = self.local.get_many(keys) if self.local is not None else [None] * len(keys)
+        local_hits = len(keys) - values.count(None)
+        remote_hits = 0
+        if self.remote is not None and local_hits < len(keys):
+            missing = [i for i, v in enumerate(values) if v is None]
+            fetched = self.remote.get_many([keys[i] for i in missing])
+            found = [(keys[i], v) for i, v in zip(missing, fetched) if v is not None]
+            for i, v in zip(missing, fetched):
+                values[i] = v
+            remote_hits = len(found)
+            if found and self.local is not None:
+                self.local.set_many(found)
+        if self.local is not None:
+            self._hits[self.local.name].inc(local_hits)
+        if self.remote is not None:
+            self._hits[self.remote.name].inc(remote_hits)
+        metrics.CACHE_MISSES.inc(len(keys) - local_hits - remote_hits)
+        self.lookups += len(keys)
+        self.hits += local_hits + remote_hits
+        metrics.CACHE_HIT_RATIO.set(self.hits / self.lookups if self.lookups else 0.0)
+        return values
+
+    def set_many(self, items):
+        if self.local is not None:
+            self.local.set_many(items)
+        if self.remote is not None:
+            self.remote.set_many(items)
+
+    def close(self):
+        for tier in (self.local, self.remote):
+            if tier is not None:
+                tier.close()
+
+
+def from_env(environ=os.environ):
+    """TieredCache from IPL_CACHE_PATH (+ IPL_CACHE_SLOTS) and IPL_CACHE_URL
+    (+ IPL_CACHE_TTL seconds); None when neither is set"""
+    path, url = environ.get("IPL_CACHE_PATH"), environ.get("IPL_CACHE_URL")
+    if not path and not url:
+        return None
+    local = MmapCache(path, int(environ.get("IPL_CACHE_SLOTS", DEFAULT_SLOTS))) if path else None
+    remote = RespCache(url, float(environ.get("IPL_CACHE_TTL", DEFAULT_TTL_SECONDS))) if url else None
+    return TieredCache(local, remote)
+
+
+async def _serve(host, port):
+    server = await StandInServer().start(host, port)
+    print(f"   ✅ Serving the Redis-protocol subset on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared prediction cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sp = sub.add_parser("serve", help="stand-in network cache server")
+    sp.add_argument("--host", default="127.0.0.1")
+    sp.add_argument("--port", type=int, default=6390)
+    st = sub.add_parser("stats", help="occupancy of a local cache file")
+    st.add_argument("path")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Prediction Cache")
+    print("=" * 60)
+    if args.command == "serve":
+        asyncio.run(_serve(args.host, args.port))
+        return
+    if not os.path.exists(args.path):
+        print(f"   ❌ No cache file at {args.path}")
+        sys.exit(1)
+    stats = MmapCache(args.path).stats()
+    print(f"   File:   {stats['path']} ({stats['bytes'] / 2**20:.1f} MiB)")
+    print(f"   Slots:  {stats['used']:,} of {stats['slots']:,} used "
+          f"({stats['used'] / stats['slots']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Prediction request/response logging and replay.
+
+Every prediction served is appended to a JSON-lines log with its inputs,
+outputs, model version and latency. Writes go through a background thread
+that batches records and flushes them, so logging never blocks the request
+path. The log rotates by size, optionally gzip-compressing rotated files.
+
+The compare command summarizes a log per model version: requests served
+and latency percentiles, and for versions shadow-scored alongside
+(registry.py) their mean and max delta against the served prediction.
+
+The replay command re-scores a log against a candidate model in one batch
+and diffs the probabilities:
+
+    python prediction_log.py replay predictions.jsonl --model candidate.pkl
+"""
+import argparse
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import queue
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema import FEATURES, TOTAL_BALLS, model_features
+
+DEFAULT_LOG_PATH = os.environ.get("IPL_PREDICTION_LOG", "predictions.jsonl")
+
+
+def model_fingerprint(path="pipe.pkl"):
+    """Short content hash of a model file, used as its version"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class PredictionLogger:
+    """Append-only JSON-lines prediction log with a buffered background writer"""
+
+    def __init__(self, path=DEFAULT_LOG_PATH, batch_size=256, flush_interval=1.0,
+                 max_bytes=50 * 1024 * 1024, backup_count=5, compress=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=100_000)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, inputs, outputs, model_version, latency_ms, shadow=None):
+        """Queue one prediction record; never blocks the caller.
+
+        shadow: optional {version: {"win", "delta"}} for versions scored
+        alongside the served one (see registry.py).
+        """
+        record = {
+            "ts": time.time(),
+            "model_version": model_version,
+            "latency_ms": round(latency_ms, 3),
+            "inputs": inputs,
+            "outputs": outputs,
+        }
+        if shadow:
+            record["shadow"] = shadow
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Flush everything queued so far and stop the writer thread"""
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+
+    def _drain(self):
+        batch = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            stopping = self._stop.wait(self.flush_interval)
+            batch = self._drain()
+            while batch:
+                self._write(batch)
+                batch = self._drain()
+            if stopping:
+                return
+
+    def _write(self, batch):
+        lines = "".join(json.dumps(record, default=_to_builtin) + "\n" for record in batch)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        if self.max_bytes and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        suffix = ".gz" if self.compress else ""
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}{suffix}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}{suffix}")
+        if self.compress:
+            with open(self.path, "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, f"{self.path}.1")
+
+
+def _to_builtin(value):
+    """json.dumps fallback for NumPy scalars"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _read_records(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_log(path):
+    """Load a (possibly gzip-compressed) prediction log into a DataFrame"""
+    records = _read_records(path)
+    inputs = pd.DataFrame([r["inputs"] for r in records])
+    inputs = inputs.reindex(columns=FEATURES + [c for c in inputs if c not in FEATURES])
+    # Logs written before total_balls existed were all full 20-over chases
+    inputs["total_balls"] = inputs["total_balls"].fillna(TOTAL_BALLS)
+    inputs["logged_win"] = [r["outputs"]["win"] for r in records]
+    inputs["model_version"] = [r["model_version"] for r in records]
+    return inputs
+
+
+def replay(log_path, model_path):
+    """Re-score a log against a candidate model; returns the per-row diff frame.
+    Rows logged without the candidate's features (first-innings projections,
+    for a chase model) are skipped."""
+    df = read_log(log_path)
+    with open(model_path, "rb") as f:
+        candidate = pickle.load(f)
+    df = df.dropna(subset=model_features(candidate)).reset_index(drop=True)
+    df["candidate_win"] = candidate.predict_proba(df[model_features(candidate)])[:, 1]
+    df["delta"] = df["candidate_win"] - df["logged_win"]
+    return df
+
+
+def compare(log_path):
+    """Per-version served counts/latency and shadow deltas; returns (served, shadow) frames"""
+    records = _read_records(log_path)
+    served = pd.DataFrame({"version": [r["model_version"] for r in records],
+                           "latency_ms": [r["latency_ms"] for r in records]})
+    served = served.groupby("version")["latency_ms"].agg(
+        requests="count", p50_ms="median", p99_ms=lambda x: x.quantile(0.99))
+    shadow = pd.DataFrame([{"version": version, "served_by": r["model_version"],
+                            "delta": s["delta"]}
+                           for r in records for version, s in r.get("shadow", {}).items()],
+                          columns=["version", "served_by", "delta"])
+    shadow["abs_delta"] = shadow["delta"].abs()
+    shadow = shadow.groupby(["version", "served_by"]).agg(
+        requests=("delta", "count"), mean_delta=("delta", "mean"),
+        mean_abs_delta=("abs_delta", "mean"), max_abs_delta=("abs_delta", "max"))
+    return served, shadow
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediction log tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("replay", help="re-score a log against a candidate model")
+    rp.add_argument("log", help="prediction log (.jsonl or .jsonl.gz)")
+    rp.add_argument("--model", default="pipe.pkl", help="candidate model pickle")
+    rp.add_argument("--output", help="write per-row diffs to this CSV")
+    cp = sub.add_parser("compare", help="per-version latency and shadow deltas")
+    cp.add_argument("log", help="prediction log (.jsonl or .jsonl.gz)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        served, shadow = compare(args.log)
+        print("=" * 60)
+        print("Prediction Log - Model Comparison")
+        print("=" * 60)
+        print("\nServed:")
+        print(served.round(3).to_string())
+        print("\nShadow-scored (delta = shadow - served win probability):")
+        print(shadow.round(4).to_string() if len(shadow) else "   none")
+        return
+
+    start = time.perf_counter()
+    df = replay(args.log, args.model)
+    elapsed = time.perf_counter() - start
+    delta = df["delta"].abs()
+
+    print("=" * 60)
+    print("Prediction Log Replay")
+    print("=" * 60)
+    print(f"   Log:                {args.log} ({len(df):,} predictions)")
+    print(f"   Candidate model:    {args.model} ({model_fingerprint(args.model)})")
+    print(f"   Logged versions:    {', '.join(sorted(df['model_version'].unique()))}")
+    print(f"   Re-scored in:       {elapsed * 1000:.1f} ms")
+    if len(df):
+        print(f"   Mean |delta|:       {delta.mean() * 100:.3f} pts")
+        print(f"   Max |delta|:        {delta.max() * 100:.3f} pts")
+        print(f"   Rows > 1 pt apart:  {(delta > 0.01).sum():,}")
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"   ✅ Diffs written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Opt-in profiling of app reruns, model loading, scoring and retrain stages.
+
+Off unless IPL_PROFILE names an output directory (retrain_model.py also
+takes --profile DIR). When off, section() only checks a module global
+and hands back one shared no-op object, so instrumented code pays
+nothing measurable.
+
+When on, every section writes one file to the directory:
+
+* IPL_PROFILE_MODE=sample (default): a background thread samples the
+  section's thread stack every IPL_PROFILE_INTERVAL_MS (1 ms) and the
+  section is written as collapsed stacks (name-....folded), the input
+  format of flamegraph.pl, speedscope and inferno. Sections may nest;
+  each gets its own file.
+* IPL_PROFILE_MODE=cprofile: deterministic cProfile stats (.prof) for
+  snakeviz, gprof2dot or flameprof. cProfile cannot nest, so only the
+  outermost section on a thread is recorded.
+
+    IPL_PROFILE=profiles streamlit run app_streamlit.py
+    python retrain_model.py --profile profiles
+    python profiling.py summary profiles      # top frames across the files
+"""
+import argparse
+import cProfile
+import glob
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+MODES = ("sample", "cprofile")
+
+_directory = os.environ.get("IPL_PROFILE") or None
+_mode = os.environ.get("IPL_PROFILE_MODE", "sample")
+_interval = float(os.environ.get("IPL_PROFILE_INTERVAL_MS", "1")) / 1000
+_sequence = itertools.count()
+_sampler = None
+_cprofiling = threading.local()
+_open_sections = {}   # (thread id, name) -> its open Section
+_open_lock = threading.Lock()
+
+
+def enable(directory, mode="sample"):
+    """Turn profiling on for this process and the processes it starts"""
+    global _directory, _mode
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}; expected one of {MODES}")
+    os.makedirs(directory, exist_ok=True)
+    _directory, _mode = directory, mode
+    os.environ["IPL_PROFILE"] = directory
+    os.environ["IPL_PROFILE_MODE"] = mode
+
+
+class _NoSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def stop(self):
+        return None
+
+
+_NO_SECTION = _NoSection()
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold(frame):
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class _Sampler(threading.Thread):
+    """Samples the threads of open sections; idles when there are none"""
+
+    def __init__(self, interval):
+        super().__init__(name="ipl-profiler", daemon=True)
+        self.interval = interval
+        self.sections = set()
+        self.wake = threading.Event()
+
+    def run(self):
+        while True:
+            if not self.sections:
+                self.wake.wait()
+                self.wake.clear()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for section in list(self.sections):
+                frame = frames.get(section.thread_id)
+                if frame is None:
+                    section.stop()  # its thread is gone (e.g. a rerun raised out of the script)
+                else:
+                    section.stacks[_fold(frame)] += 1
+
+
+def _reset_after_fork():
+    global _sampler, _open_sections
+    _sampler = None
+    _open_sections = {}
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class Section:
+    """One profiled span of one thread, written to the profile directory on stop().
+
+    Starting a section ends any section of the same name still open on the
+    thread: a Streamlit rerun (RerunException) restarts the script on the
+    same thread without reaching the previous run's stop().
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.thread_id = threading.get_ident()
+        self.path = None
+        self._profile = None
+        self._lock = threading.Lock()
+        self._open = True
+        with _open_lock:
+            stale = _open_sections.get((self.thread_id, name))
+        if stale is not None:
+            stale.stop()
+        with _open_lock:
+            _open_sections[(self.thread_id, name)] = self
+        if _mode == "cprofile":
+            if not getattr(_cprofiling, "active", False):
+                _cprofiling.active = True
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+        else:
+            global _sampler
+            if _sampler is None:
+                _sampler = _Sampler(_interval)
+                _sampler.start()
+            self.stacks = Counter()
+            _sampler.sections.add(self)
+            _sampler.wake.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _filename(self, suffix):
+        os.makedirs(_directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(_directory,
+                            f"{self.name}-{stamp}-{os.getpid()}-{next(_sequence)}{suffix}")
+
+    def stop(self):
+        """Write the profile (once); returns its path, or None if nothing was recorded"""
+        with self._lock:
+            if not self._open:
+                return self.path
+            self._open = False
+        with _open_lock:
+            if _open_sections.get((self.thread_id, self.name)) is self:
+                del _open_sections[(self.thread_id, self.name)]
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+                _cprofiling.active = False
+                self.path = self._filename(".prof")
+                self._profile.dump_stats(self.path)
+            elif _mode != "cprofile":
+                _sampler.sections.discard(self)
+                if self.stacks:
+                    self.path = self._filename(".folded")
+                    with open(self.path, "w") as f:
+                        f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.items())
+        except OSError as e:
+            # A profile that cannot be written must not fail the request it measured
+            print(f"profiling: could not write {self.name} profile: {e}", file=sys.stderr)
+            self.path = None
+        return self.path
+
+
+def section(name):
+    """Context manager (or start/stop object) profiling one named span"""
+    if _directory is None:
+        return _NO_SECTION
+    return Section(name)
+
+
+def start(name):
+    """section() for spans that do not fit a with block; call .stop() at the end"""
+    return section(name)
+
+
+# ---------------------------------------------------------
+# SUMMARY
+# ---------------------------------------------------------
+def summarize(directory, top=15):
+    """Print the hottest frames across the profiles in a directory"""
+    folded = sorted(glob.glob(os.path.join(directory, "*.folded")))
+    if folded:
+        own, total, samples = Counter(), Counter(), 0
+        for path in folded:
+            with open(path) as f:
+                for line in f:
+                    stack, count = line.rsplit(" ", 1)
+                    frames = stack.split(";")
+                    count = int(count)
+                    samples += count
+                    own[frames[-1]] += count
+                    for frame in set(frames):
+                        total[frame] += count
+        print(f"   {len(folded)} sampled profiles, {samples:,} samples")
+        print(f"\n   {'Self %':>7}{'Total %':>9}  Frame")
+        for frame, count in own.most_common(top):
+            print(f"   {100 * count / samples:>7.1f}{100 * total[frame] / samples:>9.1f}  {frame}")
+    prof = sorted(glob.glob(os.path.join(directory, "*.prof")))
+    if prof:
+        print(f"\n   {len(prof)} cProfile profiles")
+        stats = pstats.Stats(*prof, stream=sys.stdout)
+        stats.sort_stats("cumulative").print_stats(top)
+    if not folded and not prof:
+        print(f"   No profiles in {directory}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize profiles written with IPL_PROFILE")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sp = sub.add_parser("summary", help="hottest frames across a profile directory")
+    sp.add_argument("directory", nargs="?", default="profiles")
+    sp.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Profile Summary")
+    print("=" * 60)
+    summarize(args.directory, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+In-memory model registry with A/B routing and shadow scoring.
+
+Holds several model versions at once. Every request is served by the
+champion, or by the challenger for a configurable percentage of routing
+keys (one key per app session, so a user sees one model consistently).
+Shadow versions are scored on every request without being served.
+
+All versions involved in a request (served + challenger/champion +
+shadows) are scored in one StackedScorer pass over the same feature
+batch, so comparing models costs a few extra multiply-adds, not another
+predict_proba call per model. Per-version deltas against the served model
+go to the prediction log; summarize them with:
+
+    python prediction_log.py compare predictions.jsonl
+
+The app configures the registry from the environment:
+
+    IPL_CHALLENGER_MODEL=candidate.pkl IPL_CHALLENGER_PERCENT=10
+    IPL_SHADOW_MODELS=a.pkl,b.pkl
+
+With a prediction_cache attached (registry.cache), rows already scored by
+this set of versions, in this or another replica, are read back instead
+of scored; only the misses go through the StackedScorer.
+"""
+import os
+import pickle
+import random
+import time
+import zlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from artifact import ArtifactError, manifest_path, verify_artifact
+from prediction_log import model_fingerprint
+from prediction_cache import state_keys
+from scoring import Explanation, LinearScorer, StackedScorer
+
+# win: (n, len(versions)) win probabilities, column 0 is the served version
+ScoreResult = namedtuple("ScoreResult", ["version", "explanation", "versions", "win", "latency_ms"])
+RegisteredModel = namedtuple("RegisteredModel", ["version", "model", "scorer", "path"])
+
+
+def route_bucket(key):
+    """Stable 0-99 bucket for a routing key"""
+    return zlib.crc32(str(key).encode("utf-8")) % 100
+
+
+class ModelRegistry:
+    """Model versions held in memory with champion/challenger/shadow roles"""
+
+    def __init__(self):
+        self.models = {}
+        self.champion = None
+        self.challenger = None
+        self.challenger_percent = 0
+        self.shadows = []
+        self._history = []
+        self._stacks = {}
+        self.cache = None  # prediction_cache.TieredCache, or None to always score
+
+    def register(self, model, version, path=None):
+        if version not in self.models:
+            self.models[version] = RegisteredModel(version, model, LinearScorer.from_pipeline(model),
+                                                   path)
+        return version
+
+    def register_file(self, path):
+        """Load a model file (verified against its manifest when it has one)"""
+        if os.path.exists(manifest_path(path)):
+            loaded = verify_artifact(path)
+            return self.register(loaded.model, loaded.version, path)
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+        except Exception as e:
+            raise ArtifactError(f"{path}: {e}") from e
+        return self.register(model, model_fingerprint(path), path)
+
+    def promote(self, version):
+        """Make a registered version the champion (rollback() undoes it)"""
+        if version not in self.models:
+            raise KeyError(f"Unknown model version {version!r}")
+        if self.champion is not None and self.champion != version:
+            self._history.append(self.champion)
+        self.champion = version
+        if self.challenger == version:
+            self.set_challenger(None)
+
+    def rollback(self):
+        """Restore the previous champion"""
+        if not self._history:
+            raise RuntimeError("No previous champion to roll back to")
+        self.champion = self._history.pop()
+        return self.champion
+
+    def set_challenger(self, version, percent=0):
+        if version is not None and version not in self.models:
+            raise KeyError(f"Unknown model version {version!r}")
+        if not 0 <= percent <= 100:
+            raise ValueError("percent must be between 0 and 100")
+        self.challenger = version
+        self.challenger_percent = percent if version is not None else 0
+
+    def set_shadows(self, versions):
+        unknown = [v for v in versions if v not in self.models]
+        if unknown:
+            raise KeyError(f"Unknown model version {unknown[0]!r}")
+        self.shadows = list(versions)
+
+    def configure_from_env(self, environ=os.environ):
+        """Challenger/shadow models from IPL_CHALLENGER_MODEL(_PERCENT) and IPL_SHADOW_MODELS"""
+        challenger = environ.get("IPL_CHALLENGER_MODEL")
+        if challenger:
+            self.set_challenger(self.register_file(challenger),
+                                float(environ.get("IPL_CHALLENGER_PERCENT", "10")))
+        shadows = [p.strip() for p in environ.get("IPL_SHADOW_MODELS", "").split(",") if p.strip()]
+        if shadows:
+            self.set_shadows([self.register_file(p) for p in shadows])
+
+    def route(self, key=None):
+        """Version that serves a request with this routing key"""
+        if self.champion is None:
+            raise RuntimeError("No champion model registered")
+        if self.challenger is not None and self.challenger_percent > 0:
+            bucket = route_bucket(key) if key is not None else random.random() * 100
+            if bucket < self.challenger_percent:
+                return self.challenger
+        return self.champion
+
+    def _stack(self, versions):
+        stack = self._stacks.get(versions)
+        if stack is None:
+            stack = StackedScorer([self.models[v].scorer for v in versions])
+            self._stacks[versions] = stack
+        return stack
+
+    def score(self, features, key=None):
+        """Serve a batch and shadow-score it with every other active version in one pass"""
+        served = self.route(key)
+        versions = [served]
+        for version in [self.champion, self.challenger] + self.shadows:
+            if version is not None and version not in versions:
+                versions.append(version)
+        versions = tuple(versions)
+        start = time.perf_counter()
+        stack = self._stack(versions)
+        if self.cache is None:
+            win, explanation = stack.explain(features)
+        else:
+            win, explanation = self._cached_explain(stack, versions, features)
+        latency_ms = (time.perf_counter() - start) * 1000
+        return ScoreResult(served, explanation, versions, win, latency_ms)
+
+    def _cached_explain(self, stack, versions, features):
+        """stack.explain(features), reading rows from the cache and scoring only the misses.
+
+        A cached row is float64 [win of each version, served logit, served
+        contributions]; anything else under the key is treated as a miss.
+        """
+        m, columns = len(versions), stack.scorers[0].columns
+        width = m + 1 + len(columns)
+        keys = state_keys("|".join(versions), features, stack.columns)
+        rows = np.full((len(keys), width), np.nan)
+        missing = []
+        for i, value in enumerate(self.cache.get_many(keys)):
+            if value is not None and len(value) == width * 8:
+                rows[i] = np.frombuffer(value, dtype=np.float64)
+            else:
+                missing.append(i)
+        if missing:
+            win, explanation = stack.explain(features.iloc[missing])
+            scored = np.column_stack([win, explanation.logit,
+                                      explanation.contributions.to_numpy(dtype=float)])
+            rows[missing] = scored
+            self.cache.set_many([(keys[i], row.tobytes()) for i, row in zip(missing, scored)])
+        win, p = rows[:, :m], rows[:, 0]
+        contributions = pd.DataFrame(rows[:, m + 1:], columns=columns,
+                                     index=getattr(features, "index", None))
+        return win, Explanation(np.column_stack([1 - p, p]), rows[:, m], contributions,
+                                stack.intercept[0])
@@ -1,193 +1,325 @@
 """
 Retrain the IPL Win Predictor model from scratch to fix the pickle serialization issue.
 
-This script recreates the entire training pipeline from the CSV files.
+This script recreates the entire training pipeline from the CSV files as a
+DAG of named stages (stages.py): independent stages run concurrently,
+outputs are cached under a content hash of their inputs, code and seed,
+so a re-run only recomputes what changed, and every stage is seeded. A
+run report with each stage's time and peak RSS growth (and exact peak
+traced memory, with --trace-memory) is printed and written to
+retrain_report.json.
+
+Usage:
+    python retrain_model.py [--bootstrap N] [--seed 0] [--workers 4] [--no-cache]
+                            [--trace-memory] [--profile DIR]
 """
-import pandas as pd
+import argparse
+import json
+import time
+from functools import partial
+
 import numpy as np
-import pickle
+import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, Ridge
 from sklearn.pipeline import Pipeline
 
-print("="*60)
-print("IPL Win Predictor - Model Retraining Script")
-print("="*60)
-
-# Load data
-print("\n1. Loading data from CSV files...")
-match = pd.read_csv('matches.csv')
-delivery = pd.read_csv('deliveries.csv')
-print(f"   Matches: {match.shape}")
-print(f"   Deliveries: {delivery.shape}")
-
-# Calculate total runs scored in each first innings
-print("\n2. Processing match and delivery data...")
-total_score_df = delivery.groupby(['match_id','inning']).sum()['total_runs'].reset_index()
-total_score_df = total_score_df[total_score_df['inning'] == 1]
-
-# Merge with match data
-match_df = match.merge(total_score_df[['match_id','total_runs']], left_on='id', right_on='match_id')
-
-# Define active teams
-teams = [
-    'Sunrisers Hyderabad',
-    'Mumbai Indians',
-    'Royal Challengers Bangalore',
-    'Kolkata Knight Riders',
-    'Kings XI Punjab',
-    'Chennai Super Kings',
-    'Rajasthan Royals',
-    'Delhi Capitals'
-]
-
-# Replace and filter teams
-print("\n3. Filtering and cleaning team data...")
-match_df['team1'] = match_df['team1'].str.replace('Delhi Daredevils','Delhi Capitals')
-match_df['team2'] = match_df['team2'].str.replace('Delhi Daredevils','Delhi Capitals')
-match_df['team1'] = match_df['team1'].str.replace('Deccan Chargers','Sunrisers Hyderabad')
-match_df['team2'] = match_df['team2'].str.replace('Deccan Chargers','Sunrisers Hyderabad')
-
-match_df = match_df[match_df['team1'].isin(teams)]
-match_df = match_df[match_df['team2'].isin(teams)]
-
-# Process delivery data
-print("\n4. Processing delivery-level data...")
-delivery_df = match_df.merge(delivery, on='match_id')
-delivery_df = delivery_df[delivery_df['inning'] == 2]
-
-# Same team name replacements
-delivery_df['batting_team'] = delivery_df['batting_team'].str.replace('Delhi Daredevils','Delhi Capitals')
-delivery_df['batting_team'] = delivery_df['batting_team'].str.replace('Deccan Chargers','Sunrisers Hyderabad')
-delivery_df['bowling_team'] = delivery_df['bowling_team'].str.replace('Delhi Daredevils','Delhi Capitals')
-delivery_df['bowling_team'] = delivery_df['bowling_team'].str.replace('Deccan Chargers','Sunrisers Hyderabad')
-
-delivery_df = delivery_df[delivery_df['batting_team'].isin(teams)]
-delivery_df = delivery_df[delivery_df['bowling_team'].isin(teams)]
-
-# Calculate match statistics
-print("\n5. Calculating match statistics...")
-delivery_df['current_score'] = delivery_df.groupby('match_id')['total_runs_y'].cumsum()
-delivery_df['runs_left'] = delivery_df['total_runs_x'] - delivery_df['current_score']
-delivery_df['balls_left'] = 126 - (delivery_df['over']*6 + delivery_df['ball'])
-
-# Wickets calculation
-delivery_df['player_dismissed'] = delivery_df['player_dismissed'].fillna("0")
-delivery_df['player_dismissed'] = delivery_df['player_dismissed'].apply(lambda x:x if x == "0" else "1")
-delivery_df['player_dismissed'] = delivery_df['player_dismissed'].astype('int')
-wickets = delivery_df.groupby('match_id')['player_dismissed'].cumsum().values
-delivery_df['wickets'] = 10 - wickets
-
-# Calculate run rates
-delivery_df['crr'] = (delivery_df['current_score']*6/(120 - delivery_df['balls_left']))
-delivery_df['rrr'] = (delivery_df['runs_left']*6/delivery_df['balls_left'])
-
-# Create result column
-def result(row):
-    return 1 if row['batting_team'] == row['winner'] else 0
-
-delivery_df['result'] = delivery_df.apply(result, axis=1)
-
-# Create final dataset
-print("\n6. Creating final dataset...")
-final_df = delivery_df[['batting_team','bowling_team','city','runs_left','balls_left','wickets','total_runs_x','crr','rrr','result']]
-final_df = final_df.sample(final_df.shape[0])
-final_df.dropna(inplace=True)
-final_df = final_df[final_df['balls_left'] != 0]
-
-print(f"   Final dataset shape: {final_df.shape}")
-print(f"   Features: {list(final_df.columns[:-1])}")
-
-# Split into train and test
-print("\n7. Splitting data into train and test sets...")
-X = final_df.iloc[:,:-1]
-y = final_df.iloc[:,-1]
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=1)
-
-print(f"   Training set: {X_train.shape}")
-print(f"   Test set: {X_test.shape}")
-
-# Create pipeline
-print("\n8. Creating machine learning pipeline...")
-trf = ColumnTransformer([
-    ('trf', OneHotEncoder(sparse_output=False, drop='first'), ['batting_team', 'bowling_team', 'city'])
-],
-remainder='passthrough')
-
-pipe = Pipeline(steps=[
-    ('step1', trf),
-    ('step2', LogisticRegression(solver='liblinear'))
-])
-
-print("   Pipeline created:")
-print(f"   - Step 1: ColumnTransformer (OneHotEncoder + passthrough)")
-print(f"   - Step 2: LogisticRegression")
-
-# Train the model
-print("\n9. Training the model...")
-pipe.fit(X_train, y_train)
-print("   ✅ Training complete!")
-
-# Test the model
-print("\n10. Testing the model...")
-train_score = pipe.score(X_train, y_train)
-test_score = pipe.score(X_test, y_test)
-print(f"   Training accuracy: {train_score:.4f}")
-print(f"   Test accuracy: {test_score:.4f}")
-
-# Test with a sample prediction
-print("\n11. Running sample prediction...")
-test_df = pd.DataFrame({
-    "batting_team": ["Mumbai Indians"],
-    "bowling_team": ["Chennai Super Kings"],
-    "city": ["Mumbai"],
-    "runs_left": [65],
-    "balls_left": [36],
-    "wickets": [7],
-    "total_runs_x": [189],
-    "crr": [8.17],
-    "rrr": [10.83]
-})
-
-prob = pipe.predict_proba(test_df)
-print(f"   Test input: MI vs CSK, 65 runs needed off 36 balls")
-print(f"   Prediction: {prob[0][1]*100:.2f}% win probability for batting team")
-
-# Check the column transformer
-print("\n12. Verifying ColumnTransformer structure...")
-ct = pipe.steps[0][1]
-print(f"   Remainder type: {type(ct.remainder)}")
-print(f"   Transformers_:")
-for name, transformer, columns in ct.transformers_:
-    print(f"     - {name}: {type(transformer).__name__}")
-
-# Save the model
-print("\n13. Saving the model...")
-import shutil
-import os
-
-if os.path.exists('pipe.pkl'):
-    shutil.copy('pipe.pkl', 'pipe.pkl.backup')
-    print("   ✅ Created backup: pipe.pkl.backup")
-
-pickle.dump(pipe, open('pipe.pkl', 'wb'))
-print("   ✅ Saved new model to pipe.pkl")
-
-# Verify  the saved model
-print("\n14. Verifying saved model...")
-loaded_pipe = pickle.load(open('pipe.pkl', 'rb'))
-prob_verify = loaded_pipe.predict_proba(test_df)
-print(f"   ✅ Loaded model prediction: {prob_verify[0][1]*100:.2f}%")
-
-print("\n" + "="*60)
-print("✅ SUCCESS! Model has been retrained and saved.")
-print("="*60)
-print("\nModel Statistics:")
-print(f"  - Training samples: {X_train.shape[0]:,}")
-print(f"  - Test accuracy: {test_score:.4f}")
-print(f"  - Features: {X_train.shape[1]}")
-print(f"  - Teams: {len(teams)}")
-print(f"  - Cities: {len(delivery_df['city'].unique())}")
-print("\nThe model is ready to use!")
+import profiling
+from artifact import save_artifact, verify_artifact
+from ensemble import DEFAULT_ENSEMBLE_PATH, DEFAULT_LEVEL, fit_bootstrap
+from aggregates import STRENGTH_FEATURES, StrengthTable
+from features import (chase_conditions, first_innings_states, first_innings_totals,
+                      normalize_matches, second_innings_states, training_frame)
+from first_innings import DEFAULT_FIRST_INNINGS_PATH, FirstInningsModel
+from schema import CITIES, FEATURES, FIRST_INNINGS_FEATURES, TEAMS, VOCABULARY_PATH
+from scoring import center_categories
+from situations import DEFAULT_SITUATIONS_PATH, SituationIndex
+from stages import StageGraph
+
+TRAINING_DATA = ['matches.csv', 'deliveries.csv']
+
+
+# ---------------------------------------------------------
+# STAGES (each takes its inputs' outputs and a seed)
+# ---------------------------------------------------------
+def load_matches(path, seed):
+    return pd.read_csv(path)
+
+
+def load_deliveries(path, seed):
+    return pd.read_csv(path)
+
+
+def innings_totals(delivery, seed):
+    return first_innings_totals(delivery)
+
+
+def conditions(match, delivery, seed):
+    return chase_conditions(match, delivery)
+
+
+def active_matches(match, seed):
+    return normalize_matches(match)
+
+
+def match_frame(normalized, chase, seed):
+    return normalized.merge(chase, left_on='id', right_on='match_id')
+
+
+def strength_table(match, totals, seed):
+    # Form, head-to-head and venue strength as of each match date (no leakage)
+    return StrengthTable.build(match, totals)
+
+
+def ball_states(match_df, delivery, seed):
+    return second_innings_states(match_df, delivery)
+
+
+def situation_index(states, seed):
+    return SituationIndex.from_states(states)
+
+
+def dataset(states, strength, seed):
+    states = states.copy()
+    states[STRENGTH_FEATURES] = strength.as_of_match(states)
+    final_df = training_frame(states, FEATURES + STRENGTH_FEATURES)
+    final_df = final_df.sample(final_df.shape[0], random_state=seed)
+    final_df['match_id'] = states.loc[final_df.index, 'match_id']
+    return final_df
+
+
+def split(final_df, seed):
+    X = final_df[FEATURES + STRENGTH_FEATURES]
+    y = final_df['result']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=1)
+    groups = final_df.loc[X_train.index, 'match_id']
+    return X_train, X_test, y_train, y_test, groups
+
+
+def make_pipeline(estimator=None):
+    # One column per vocabulary.json franchise/city, whether or not the
+    # training data has it yet; names outside it encode as all zeros, which
+    # after center_categories() is the weight of an average team/venue
+    encoder = OneHotEncoder(categories=[TEAMS, TEAMS, CITIES], handle_unknown='ignore',
+                            sparse_output=False)
+    trf = ColumnTransformer([
+        ('trf', encoder, ['batting_team', 'bowling_team', 'city'])
+    ],
+    remainder='passthrough')
+
+    return Pipeline(steps=[
+        ('step1', trf),
+        ('step2', estimator or LogisticRegression(solver='liblinear', random_state=0))
+    ])
+
+
+def fit(data, seed):
+    X_train, _, y_train, _, _ = data
+    return center_categories(make_pipeline().fit(X_train, y_train), X_train)
+
+
+def evaluate(pipe, data, seed):
+    X_train, X_test, y_train, y_test, _ = data
+    return {"train_accuracy": pipe.score(X_train, y_train),
+            "test_accuracy": pipe.score(X_test, y_test)}
+
+
+def first_innings_ball_states(match_df, delivery, seed):
+    return first_innings_states(match_df, delivery)
+
+
+def first_innings_split(states, seed):
+    final_df = states[FIRST_INNINGS_FEATURES + ['result', 'final_total']].dropna()
+    final_df = final_df[final_df['balls_left'] > 0]
+    return train_test_split(final_df, test_size=0.2, random_state=1)
+
+
+def first_innings_fit(data, seed):
+    train, _ = data
+    return FirstInningsModel.fit(make_pipeline(), make_pipeline(Ridge(alpha=1.0)),
+                                 train[FIRST_INNINGS_FEATURES], train['result'],
+                                 train['final_total'])
+
+
+def first_innings_evaluate(model, data, seed):
+    _, test = data
+    projection = model.project(test[FIRST_INNINGS_FEATURES])
+    low, high = model.interval(projection)
+    actual = test['final_total'].to_numpy()
+    return {"test_accuracy": float(((projection.win > 0.5) == test['result']).mean()),
+            "total_mae": float(np.abs(projection.total - actual).mean()),
+            "interval_coverage": float(((actual >= low) & (actual <= high)).mean())}
+
+
+def bootstrap(pipe, data, seed, n_models=0):
+    X_train, _, y_train, _, groups = data
+    return fit_bootstrap(pipe, X_train, y_train, groups, n_models, seed=seed)
+
+
+def build_graph(args):
+    graph = StageGraph(seed=args.seed, cache_dir=args.cache_dir, workers=args.workers,
+                       shared_files=[VOCABULARY_PATH], trace_memory=args.trace_memory)
+    graph.source('load_matches', 'matches.csv', load_matches)
+    graph.source('load_deliveries', 'deliveries.csv', load_deliveries)
+    graph.add('first_innings_totals', innings_totals, ['load_deliveries'])
+    graph.add('chase_conditions', conditions, ['load_matches', 'load_deliveries'])
+    graph.add('normalize_teams', active_matches, ['load_matches'])
+    graph.add('match_frame', match_frame, ['normalize_teams', 'chase_conditions'])
+    graph.add('strength_table', strength_table, ['load_matches', 'first_innings_totals'])
+    graph.add('ball_states', ball_states, ['match_frame', 'load_deliveries'])
+    graph.add('situation_index', situation_index, ['ball_states'])
+    graph.add('dataset', dataset, ['ball_states', 'strength_table'])
+    graph.add('split', split, ['dataset'])
+    graph.add('fit', fit, ['split'])
+    graph.add('evaluate', evaluate, ['fit', 'split'])
+    graph.add('first_innings_states', first_innings_ball_states, ['match_frame', 'load_deliveries'])
+    graph.add('first_innings_split', first_innings_split, ['first_innings_states'])
+    graph.add('first_innings_fit', first_innings_fit, ['first_innings_split'])
+    graph.add('first_innings_evaluate', first_innings_evaluate,
+              ['first_innings_fit', 'first_innings_split'])
+    if args.bootstrap:
+        graph.add(f'bootstrap_{args.bootstrap}', partial(bootstrap, n_models=args.bootstrap),
+                  ['fit', 'split'])
+    return graph
+
+
+def print_report(reports, elapsed):
+    print(f"\n   {'Stage':<24}{'Status':<8}{'Seconds':>9}{'RSS MiB':>9}{'Peak MiB':>10}{'Seed':>12}  Key")
+    for r in reports:
+        rss = "-" if r.rss_mib is None else f"{r.rss_mib:.1f}"
+        peak = "-" if r.peak_mib is None else f"{r.peak_mib:.1f}"
+        print(f"   {r.name:<24}{r.status:<8}{r.seconds:>9.3f}{rss:>9}{peak:>10}{r.seed:>12}  {r.key}")
+    ran = sum(r.status == "ran" for r in reports)
+    print(f"   {ran} of {len(reports)} stages ran, {elapsed:.2f}s wall time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain the IPL win predictor")
+    parser.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                        help=f"also fit N match-level bootstrap models for confidence intervals "
+                             f"({DEFAULT_ENSEMBLE_PATH})")
+    parser.add_argument("--seed", type=int, default=0, help="run seed (per-stage seeds derive from it)")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent stage processes")
+    parser.add_argument("--cache-dir", default=".retrain_cache")
+    parser.add_argument("--no-cache", action="store_true", help="recompute every stage")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also report each stage's peak traced memory (slower)")
+    parser.add_argument("--report", default="retrain_report.json")
+    parser.add_argument("--profile", metavar="DIR", help="write a profile per stage to DIR")
+    parser.add_argument("--profile-mode", choices=profiling.MODES, default="sample")
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable(args.profile, args.profile_mode)
+
+    print("="*60)
+    print("IPL Win Predictor - Model Retraining Script")
+    print("="*60)
+
+    graph = build_graph(args)
+    targets = ['fit', 'evaluate', 'strength_table', 'situation_index', 'dataset', 'match_frame',
+               'first_innings_fit', 'first_innings_evaluate']
+    if args.bootstrap:
+        targets.append(f'bootstrap_{args.bootstrap}')
+
+    print(f"\n1. Running {len(graph.stages)} stages (seed {args.seed})...")
+    start = time.perf_counter()
+    outputs, reports = graph.run(targets, use_cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+    print_report(reports, elapsed)
+
+    pipe, scores = outputs['fit'], outputs['evaluate']
+    strength, final_df, match_df = outputs['strength_table'], outputs['dataset'], outputs['match_frame']
+
+    print("\n2. Training data...")
+    print(f"   Matches between active teams: {match_df.shape[0]}")
+    print(f"   Rain-shortened (D/L) matches modelled: {int((match_df['dl_applied'] == 1).sum())}")
+    print(f"   Final dataset shape: {final_df.shape}")
+    print(f"   Features: {FEATURES + STRENGTH_FEATURES}")
+    print(f"   Training accuracy: {scores['train_accuracy']:.4f}")
+    print(f"   Test accuracy: {scores['test_accuracy']:.4f}")
+    first_scores = outputs['first_innings_evaluate']
+    print(f"   First innings: test accuracy {first_scores['test_accuracy']:.4f}, "
+          f"projected total MAE {first_scores['total_mae']:.1f} runs, "
+          f"80% range covers {first_scores['interval_coverage']:.1%}")
+
+    # Test with a sample prediction
+    print("\n3. Running sample prediction...")
+    test_df = pd.DataFrame({
+        "batting_team": ["Mumbai Indians"],
+        "bowling_team": ["Chennai Super Kings"],
+        "city": ["Mumbai"],
+        "runs_left": [65],
+        "balls_left": [36],
+        "wickets": [7],
+        "total_runs_x": [189],
+        "crr": [8.17],
+        "rrr": [10.83],
+        "total_balls": [120]
+    })
+    test_df = strength.add_features(test_df)
+    prob = pipe.predict_proba(test_df)
+    print(f"   Test input: MI vs CSK, 65 runs needed off 36 balls")
+    print(f"   Prediction: {prob[0][1]*100:.2f}% win probability for batting team")
+    first_innings = outputs['first_innings_fit']
+    projection = first_innings.project(pd.DataFrame({
+        "batting_team": ["Mumbai Indians"], "bowling_team": ["Chennai Super Kings"],
+        "city": ["Mumbai"], "current_score": [85], "balls_left": [60], "wickets": [8],
+        "crr": [8.5]}))
+    low, high = first_innings.interval(projection)
+    print(f"   First innings: MI 85/2 after 10 overs -> projected {projection.total[0]:.0f} "
+          f"(80%: {low[0]:.0f}-{high[0]:.0f}), {projection.win[0]*100:.2f}% win probability")
+
+    # Save the model
+    print("\n4. Saving the model...")
+    manifest = save_artifact(pipe, 'pipe.pkl', training_data=TRAINING_DATA)
+    print(f"   ✅ Saved new model to pipe.pkl ({manifest['version']}, previous verified model kept as pipe.pkl.backup)")
+    print("   ✅ Wrote manifest: pipe.pkl.manifest.json")
+    strength.save('strength.npz')
+    print("   ✅ Saved strength table: strength.npz")
+    outputs['situation_index'].save(DEFAULT_SITUATIONS_PATH)
+    print(f"   ✅ Saved situation index: {DEFAULT_SITUATIONS_PATH}")
+    save_artifact(first_innings, DEFAULT_FIRST_INNINGS_PATH, training_data=TRAINING_DATA,
+                  backup_path=None)
+    print(f"   ✅ Saved first-innings model: {DEFAULT_FIRST_INNINGS_PATH}")
+
+    # Verify  the saved model
+    print("\n5. Verifying saved model...")
+    loaded = verify_artifact('pipe.pkl')
+    prob_verify = loaded.model.predict_proba(test_df)
+    print(f"   ✅ Golden predictions reproduced in {loaded.verify_seconds * 1000:.1f} ms")
+    print(f"   ✅ Loaded model prediction: {prob_verify[0][1]*100:.2f}%")
+
+    # Optional bootstrap ensemble for confidence intervals
+    if args.bootstrap:
+        print(f"\n6. Saving {args.bootstrap}-model bootstrap ensemble...")
+        ensemble = outputs[f'bootstrap_{args.bootstrap}']
+        sample_low, sample_high = ensemble.interval(test_df, center=prob_verify[:, 1])
+        print(f"   Sample prediction {DEFAULT_LEVEL:.0%} interval: "
+              f"{sample_low[0]*100:.1f}% - {sample_high[0]*100:.1f}%")
+        save_artifact(ensemble, DEFAULT_ENSEMBLE_PATH, training_data=TRAINING_DATA, backup_path=None)
+        print(f"   ✅ Saved ensemble to {DEFAULT_ENSEMBLE_PATH}")
+
+    with open(args.report, "w") as f:
+        json.dump({"seed": args.seed, "model_version": manifest['version'],
+                   "wall_seconds": round(elapsed, 3),
+                   "stages": [r._asdict() for r in reports]}, f, indent=2)
+
+    print("\n" + "="*60)
+    print("✅ SUCCESS! Model has been retrained and saved.")
+    print("="*60)
+    print("\nModel Statistics:")
+    print(f"  - Training samples: {int(len(final_df) * 0.8):,}")
+    print(f"  - Test accuracy: {scores['test_accuracy']:.4f}")
+    print(f"  - Features: {len(FEATURES + STRENGTH_FEATURES)}")
+    print(f"  - Teams: {len(TEAMS)}")
+    print(f"  - Cities: {match_df['city'].nunique()}")
+    print(f"  - Run report: {args.report}")
+    if args.profile:
+        print(f"  - Stage profiles: {args.profile}/ (python profiling.py summary {args.profile})")
+    print("\nThe model is ready to use!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Shared input schema for the IPL Win Predictor.
+
+One place for the model's team and city vocabulary, the historical name
+aliases (Delhi Daredevils -> Delhi Capitals, Bengaluru -> Bangalore, ...),
+numeric range checks and the derivation of the model features from a raw
+match state. Used by training (retrain_model.py) and inference
+(app_streamlit.py) so both see identical inputs.
+
+The vocabulary is data, not code: franchises (with their aliases and app
+icons) and venues (with aliases) are read from vocabulary.json, or the
+file named by IPL_VOCABULARY. Adding a franchise or city there makes it
+selectable and scorable; retrain_model.py encodes exactly these
+categories, and models that never saw one score it with a neutral
+fallback weight (scoring.LinearScorer).
+
+Everything works on whole columns: name canonicalization is a precompiled
+dict lookup mapped over the column, range checks are NumPy masks, and
+build_features() reports every bad row instead of raising on the first.
+"""
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+VOCABULARY_PATH = os.environ.get("IPL_VOCABULARY") or \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocabulary.json")
+
+Vocabulary = namedtuple("Vocabulary", ["teams", "team_aliases", "team_icons", "cities", "city_aliases"])
+
+
+def load_vocabulary(path=VOCABULARY_PATH):
+    """Teams, cities and their aliases from a vocabulary file, in file order"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    teams, cities = data["teams"], data["cities"]
+    return Vocabulary(
+        teams=list(teams),
+        team_aliases={alias: team for team, entry in teams.items() for alias in entry["aliases"]},
+        team_icons={team: entry.get("icon", "🏏") for team, entry in teams.items()},
+        cities=list(cities),
+        city_aliases={alias: city for city, aliases in cities.items() for alias in aliases},
+    )
+
+
+VOCABULARY = load_vocabulary()
+TEAMS = VOCABULARY.teams
+CITIES = VOCABULARY.cities
+TEAM_ALIASES = VOCABULARY.team_aliases
+CITY_ALIASES = VOCABULARY.city_aliases
+TEAM_ICONS = VOCABULARY.team_icons
+
+# Model feature columns, in training order. total_balls (balls allotted to
+# the chase; < 120 in rain-shortened matches) was added after the original
+# pipe.pkl was fitted, so score with the columns a model was fitted on.
+FEATURES = ['batting_team', 'bowling_team', 'city', 'runs_left', 'balls_left',
+            'wickets', 'total_runs_x', 'crr', 'rrr', 'total_balls']
+# First-innings model features (first_innings.py): the state of the innings
+# so far, with no target yet
+FIRST_INNINGS_FEATURES = ['batting_team', 'bowling_team', 'city', 'current_score',
+                          'balls_left', 'wickets', 'crr']
+
+TOTAL_BALLS = 120
+MAX_OVERS = 20
+MAX_WICKETS = 10
+
+ValidationResult = namedtuple("ValidationResult", ["features", "valid", "errors"])
+
+
+def model_features(model):
+    """Feature columns a fitted pipeline expects (older models predate total_balls)"""
+    names = getattr(model, "feature_names_in_", None)
+    return list(names) if names is not None else list(FEATURES)
+
+
+def _normalize(name):
+    return " ".join(str(name).split()).casefold()
+
+
+def _compile_lookup(canonical, aliases):
+    """Exact and case/whitespace-insensitive spellings -> canonical name"""
+    lookup = {}
+    for name in canonical:
+        lookup[name] = name
+        lookup[_normalize(name)] = name
+    for alias, name in aliases.items():
+        lookup[alias] = name
+        lookup[_normalize(alias)] = name
+    return lookup
+
+
+_TEAM_LOOKUP = _compile_lookup(TEAMS, TEAM_ALIASES)
+_CITY_LOOKUP = _compile_lookup(CITIES, CITY_ALIASES)
+
+
+def _canonicalize(values, lookup):
+    series = pd.Series(values, dtype=object)
+    out = series.map(lookup)
+    missing = out.isna() & series.notna()
+    if missing.any():
+        out[missing] = series[missing].map(_normalize).map(lookup)
+    return out.to_numpy(dtype=object)
+
+
+def canonical_team(name):
+    """Canonical franchise name, or None if unknown"""
+    return _TEAM_LOOKUP.get(name) or _TEAM_LOOKUP.get(_normalize(name))
+
+
+def canonical_city(name):
+    """Canonical city name, or None if unknown"""
+    return _CITY_LOOKUP.get(name) or _CITY_LOOKUP.get(_normalize(name))
+
+
+def canonicalize_teams(values):
+    """Vectorized canonical_team over an array/Series; unknown names -> NaN"""
+    return _canonicalize(values, _TEAM_LOOKUP)
+
+
+def canonicalize_cities(values):
+    """Vectorized canonical_city over an array/Series; unknown names -> NaN"""
+    return _canonicalize(values, _CITY_LOOKUP)
+
+
+def run_rate(runs, balls):
+    """Runs per over, 0 where no balls were bowled"""
+    runs = np.asarray(runs, dtype=float)
+    balls = np.asarray(balls, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(balls > 0, runs * 6 / balls, 0.0)
+
+
+def derive_rates(score, target, balls_bowled, total_balls=TOTAL_BALLS):
+    """runs_left, balls_left, crr and rrr from the raw chase state.
+
+    crr is 0 before the first ball and rrr is 0 once no balls are left,
+    matching what the app has always sent to the model.
+    """
+    score = np.asarray(score, dtype=float)
+    target = np.asarray(target, dtype=float)
+    balls_bowled = np.asarray(balls_bowled, dtype=float)
+    runs_left = target - score
+    balls_left = total_balls - balls_bowled
+    return runs_left, balls_left, run_rate(score, balls_bowled), run_rate(runs_left, balls_left)
+
+
+class _Checks:
+    """Row-level validation shared by both innings; collects every error"""
+
+    def __init__(self, n):
+        self.invalid = np.zeros(n, dtype=bool)
+        self.errors = []
+
+    def __call__(self, mask, field, message):
+        mask = np.asarray(mask, dtype=bool)
+        for row in np.flatnonzero(mask):
+            self.errors.append({"row": int(row), "field": field, "error": message})
+        self.invalid |= mask
+        return mask
+
+    def result(self, features):
+        self.errors.sort(key=lambda e: e["row"])
+        return ValidationResult(features, ~self.invalid, self.errors)
+
+
+def _innings_state(df, check):
+    """Canonical names and numeric innings progress, checked"""
+    n = len(df)
+    bat = canonicalize_teams(df["batting_team"])
+    bowl = canonicalize_teams(df["bowling_team"])
+    city = canonicalize_cities(df["city"])
+
+    def numeric(column):
+        return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
+    score, wickets = numeric("score"), numeric("wickets")
+    overs, balls = numeric("overs"), numeric("balls")
+    balls_bowled = overs * 6 + balls
+    if "total_balls" in df:
+        total_balls = numeric("total_balls")
+    else:
+        total_balls = np.full(n, float(TOTAL_BALLS))
+
+    check(pd.isna(bat), "batting_team", "unknown batting team")
+    check(pd.isna(bowl), "bowling_team", "unknown bowling team")
+    check(pd.notna(bat) & (bat == bowl), "bowling_team",
+          "batting and bowling teams must be different")
+    check(pd.isna(city), "city", "unknown city")
+    check(~(score >= 0), "score", "score must be >= 0")
+    check(~((wickets >= 0) & (wickets <= MAX_WICKETS)), "wickets",
+          f"wickets must be between 0 and {MAX_WICKETS}")
+    if "target" in df:
+        check(~(numeric("target") >= 1), "target", "target must be >= 1")
+    check(~((overs >= 0) & (overs <= MAX_OVERS)), "overs",
+          f"overs must be between 0 and {MAX_OVERS}")
+    check(~((balls >= 0) & (balls <= 5)), "balls", "balls must be between 0 and 5")
+    check(~((total_balls >= 1) & (total_balls <= TOTAL_BALLS)), "total_balls",
+          f"total_balls must be between 1 and {TOTAL_BALLS}")
+    check(~check.invalid & (balls_bowled > total_balls), "balls",
+          "more balls bowled than the innings allows")
+    return bat, bowl, city, score, wickets, balls_bowled, total_balls
+
+
+def build_features(states):
+    """Validate raw match states and derive the model features.
+
+    states: DataFrame or dict of columns batting_team, bowling_team, city,
+    score, wickets (fallen), target, overs, balls and optionally
+    total_balls (balls allotted to the chase, default 120; pass the
+    revised target as target for rain-shortened matches).
+
+    Returns ValidationResult(features, valid, errors): the feature frame for
+    every row, a boolean mask of rows safe to score, and a list of
+    {"row", "field", "error"} dicts describing each problem found.
+    """
+    df = pd.DataFrame(states)
+    check = _Checks(len(df))
+    bat, bowl, city, score, wickets, balls_bowled, total_balls = _innings_state(df, check)
+    target = pd.to_numeric(df["target"], errors="coerce").to_numpy(dtype=float)
+
+    runs_left, balls_left, crr, rrr = derive_rates(score, target, balls_bowled, total_balls)
+    check(~check.invalid & ((balls_left <= 0) | (wickets >= MAX_WICKETS) | (runs_left <= 0)),
+          "state", "match already finished")
+
+    features = pd.DataFrame({
+        "batting_team": bat,
+        "bowling_team": bowl,
+        "city": city,
+        "runs_left": runs_left,
+        "balls_left": balls_left,
+        "wickets": MAX_WICKETS - wickets,
+        "total_runs_x": target,
+        "crr": crr,
+        "rrr": rrr,
+        "total_balls": total_balls,
+    }, index=df.index)
+    return check.result(features)
+
+
+def build_first_innings_features(states):
+    """build_features() for the side batting first: the same columns
+    without target, and FIRST_INNINGS_FEATURES out (total_balls is the
+    first innings' allotment)."""
+    df = pd.DataFrame(states).drop(columns="target", errors="ignore")
+    check = _Checks(len(df))
+    bat, bowl, city, score, wickets, balls_bowled, total_balls = _innings_state(df, check)
+
+    balls_left = total_balls - balls_bowled
+    check(~check.invalid & ((balls_left <= 0) | (wickets >= MAX_WICKETS)),
+          "state", "innings already finished")
+
+    features = pd.DataFrame({
+        "batting_team": bat,
+        "bowling_team": bowl,
+        "city": city,
+        "current_score": score,
+        "balls_left": balls_left,
+        "wickets": MAX_WICKETS - wickets,
+        "crr": run_rate(score, balls_bowled),
+    }, index=df.index)
+    return check.result(features)
@@ -0,0 +1,254 @@
+"""
+Vectorized scoring and exact explanations for the win-probability model.
+
+The model is Pipeline(OneHotEncoder + passthrough -> LogisticRegression),
+so the logit is the intercept plus one coefficient per active team/city
+category plus coefficient x value for each numeric feature. LinearScorer
+pulls those weights out of the fitted pipeline once and scores with plain
+NumPy gathers and multiply-adds, without building the one-hot matrix.
+
+The same extraction works for a linear regressor in place of the
+logistic regression (the first-innings run-rate model): decision_function()
+is then its prediction.
+
+Because the logit is a sum, the per-feature terms *are* the exact
+contributions: explain() returns them alongside the probabilities in the
+same pass, with no sampling (unlike SHAP/LIME).
+
+Team and city names the model never saw (a new franchise or venue added
+to vocabulary.json) do not raise: they get the column's fallback weight.
+That is 0.0 for encoders with handle_unknown='ignore' (what scikit-learn
+itself computes: an all-zero one-hot row, which center_categories() makes
+the average team/venue) and the mean category weight for older models
+that would reject the name. Lookups are a hash-table probe per row and an
+array gather, however many categories there are.
+
+StackedScorer evaluates several such models (champion, challenger and
+shadow versions) in the same pass: weights are stacked into one table per
+column, so every extra model costs a gather and a multiply-add rather
+than another pipeline call. A category one model knows and another does
+not gets the other model's fallback weight.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+Explanation = namedtuple("Explanation", ["proba", "logit", "contributions", "intercept"])
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class LinearScorer:
+    """NumPy re-implementation of a fitted one-hot + logistic regression pipeline"""
+
+    def __init__(self, categorical, numeric, intercept, fallback=None):
+        # categorical: [(column, categories, coef per category)] with 0 for the dropped one
+        # numeric: [(column, coef)]
+        # fallback: weight per categorical column for unseen names (default: mean weight)
+        self.categorical = categorical
+        self.numeric = numeric
+        self.intercept = float(intercept)
+        if fallback is None:
+            fallback = [float(np.mean(coef)) if len(coef) else 0.0 for _, _, coef in categorical]
+        self.fallback = list(fallback)
+        self.columns = [c for c, _, _ in categorical] + [c for c, _ in numeric]
+        self._index = [pd.Index(cats) for _, cats, _ in categorical]
+        # Category weights with the fallback appended: unseen names gather the last entry
+        self._tables = [np.append(coef, w) for (_, _, coef), w in zip(categorical, self.fallback)]
+        self._num_coef = np.array([w for _, w in numeric], dtype=float)
+
+    @classmethod
+    def from_pipeline(cls, pipe):
+        """Extract weights from Pipeline(ColumnTransformer, LogisticRegression)"""
+        ct = pipe.steps[0][1]
+        lr = pipe.steps[-1][1]
+        coef = np.asarray(lr.coef_, dtype=float).ravel()
+        names_in = list(ct.feature_names_in_)
+
+        categorical, numeric, fallback = [], [], []
+        for name, transformer, columns in ct.transformers_:
+            out = ct.output_indices_[name]
+            w = coef[out]
+            if name == "remainder" and transformer == "drop":
+                continue
+            columns = [names_in[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            if hasattr(transformer, "categories_"):
+                pos = 0
+                for column, cats, drop in zip(columns, transformer.categories_,
+                                              _drop_indices(transformer)):
+                    cat_coef = np.zeros(len(cats))
+                    keep = [i for i in range(len(cats)) if i != drop]
+                    cat_coef[keep] = w[pos:pos + len(keep)]
+                    pos += len(keep)
+                    categorical.append((column, list(cats), cat_coef))
+                    fallback.append(_fallback_weight(transformer, cat_coef))
+            else:
+                numeric.extend(zip(columns, w))
+        return cls(categorical, numeric, np.ravel(lr.intercept_)[0], fallback)
+
+    def category_weights(self, column, names):
+        """Logit weight of each name in a categorical column (fallback for unseen names)"""
+        for (col, _, _), index, table in zip(self.categorical, self._index, self._tables):
+            if col == column:
+                return table[_lookup(names, index)]
+        return np.zeros(len(names))
+
+    def _terms(self, features):
+        """(n, n_columns) matrix of per-feature logit contributions"""
+        if not isinstance(features, pd.DataFrame):
+            features = pd.DataFrame(features)
+        n = len(features)
+        terms = np.empty((n, len(self.columns)))
+        for j, ((column, _, _), index, table) in enumerate(zip(self.categorical, self._index,
+                                                               self._tables)):
+            terms[:, j] = table[_lookup(features[column], index)]
+        k = len(self.categorical)
+        values = features[[c for c, _ in self.numeric]].to_numpy(dtype=float)
+        terms[:, k:] = values * self._num_coef
+        return terms
+
+    def decision_function(self, features):
+        return self._terms(features).sum(axis=1) + self.intercept
+
+    def predict_proba(self, features):
+        """Same output as pipe.predict_proba: columns [loss, win]"""
+        p = _sigmoid(self.decision_function(features))
+        return np.column_stack([1 - p, p])
+
+    def explain(self, features):
+        """Probabilities plus per-feature logit contributions in one pass"""
+        terms = self._terms(features)
+        logit = terms.sum(axis=1) + self.intercept
+        p = _sigmoid(logit)
+        contributions = pd.DataFrame(terms, columns=self.columns,
+                                     index=getattr(features, "index", None))
+        return Explanation(np.column_stack([1 - p, p]), logit, contributions, self.intercept)
+
+
+class StackedScorer:
+    """Several LinearScorers evaluated together; outputs have one column per model"""
+
+    def __init__(self, scorers):
+        self.scorers = list(scorers)
+        m = len(self.scorers)
+        self.intercept = np.array([s.intercept for s in self.scorers])
+
+        # Union of categories per column; a model's fallback weight where it
+        # does not know a category, 0 where it does not use the column at all
+        fallback = {}
+        for i, scorer in enumerate(self.scorers):
+            for (column, _, _), w in zip(scorer.categorical, scorer.fallback):
+                fallback.setdefault(column, np.zeros(m))[i] = w
+        categorical = {column: {} for column in fallback}
+        for i, scorer in enumerate(self.scorers):
+            for column, cats, coef in scorer.categorical:
+                for cat, w in zip(cats, coef):
+                    categorical[column].setdefault(cat, fallback[column].copy())[i] = w
+        self.categorical = [(column, list(weights), np.array(list(weights.values())).T)
+                            for column, weights in categorical.items()]
+        self.fallback = [fallback[column] for column, _, _ in self.categorical]
+        self._index = [pd.Index(cats) for _, cats, _ in self.categorical]
+        self._tables = [np.column_stack([table, w]) if table.size else w[:, None]
+                        for (_, _, table), w in zip(self.categorical, self.fallback)]
+
+        numeric = {}
+        for i, scorer in enumerate(self.scorers):
+            for column, w in scorer.numeric:
+                numeric.setdefault(column, np.zeros(m))[i] = w
+        self.numeric = list(numeric)
+        self._num_coef = np.array(list(numeric.values())).reshape(len(numeric), m)
+        self.columns = [c for c, _, _ in self.categorical] + self.numeric
+
+    def _terms(self, features):
+        """(n, n_models, n_columns) per-feature logit contributions"""
+        if not isinstance(features, pd.DataFrame):
+            features = pd.DataFrame(features)
+        n, m = len(features), len(self.scorers)
+        terms = np.empty((n, m, len(self.columns)))
+        for j, ((column, _, _), index, table) in enumerate(zip(self.categorical, self._index,
+                                                               self._tables)):
+            terms[:, :, j] = table[:, _lookup(features[column], index)].T
+        values = features[self.numeric].to_numpy(dtype=float)
+        terms[:, :, len(self.categorical):] = values[:, None, :] * self._num_coef.T[None, :, :]
+        return terms
+
+    def decision_function(self, features):
+        """(n, n_models) logits: one gather per categorical column + one matmul"""
+        if not isinstance(features, pd.DataFrame):
+            features = pd.DataFrame(features)
+        logit = features[self.numeric].to_numpy(dtype=float) @ self._num_coef + self.intercept
+        for (column, _, _), index, table in zip(self.categorical, self._index, self._tables):
+            logit += table[:, _lookup(features[column], index)].T
+        return logit
+
+    def predict_proba(self, features):
+        """(n, n_models) win probabilities"""
+        return _sigmoid(self.decision_function(features))
+
+    def explain(self, features, model=0):
+        """Win probabilities of every model plus one model's Explanation"""
+        terms = self._terms(features)
+        logit = terms.sum(axis=2) + self.intercept
+        p = _sigmoid(logit)
+        own = [self.columns.index(c) for c in self.scorers[model].columns]
+        contributions = pd.DataFrame(terms[:, model, own], columns=self.scorers[model].columns,
+                                     index=getattr(features, "index", None))
+        pm = p[:, model]
+        return p, Explanation(np.column_stack([1 - pm, pm]), logit[:, model], contributions,
+                              self.intercept[model])
+
+
+def center_categories(pipe, X):
+    """Move each one-hot column's mean weight over the categories seen in X
+    into the intercept, in place.
+
+    Predictions for seen categories are unchanged (each row has exactly one
+    of them per column), but a name the model never saw, whose one-hot row
+    is all zero, now scores as an average team or venue instead of
+    whatever the solver left at 0. Encoders with a dropped category are
+    left alone: their weights are relative to it.
+    """
+    ct = pipe.steps[0][1]
+    lr = pipe.steps[-1][1]
+    names_in = list(ct.feature_names_in_)
+    for name, transformer, columns in ct.transformers_:
+        if not hasattr(transformer, "categories_") or \
+                any(d is not None for d in _drop_indices(transformer)):
+            continue
+        pos = ct.output_indices_[name].start
+        for column, cats in zip(columns, transformer.categories_):
+            column = names_in[column] if isinstance(column, (int, np.integer)) else column
+            present = set(X[column].unique())
+            seen = np.array([cat in present for cat in cats])
+            weights = np.atleast_2d(lr.coef_)[0, pos:pos + len(cats)]
+            if seen.any():
+                shift = weights[seen].mean()
+                weights[seen] -= shift
+                lr.intercept_ += shift  # in place, or rebinds a regressor's scalar
+            pos += len(cats)
+    return pipe
+
+
+def _lookup(values, index):
+    """Row -> category position in a pd.Index (a cached hash table, so O(1) per
+    row whatever the vocabulary size); unknown names map to len(index), the
+    fallback slot"""
+    idx = index.get_indexer(values)
+    idx[idx < 0] = len(index)
+    return idx
+
+
+def _fallback_weight(encoder, coef):
+    if getattr(encoder, "handle_unknown", "error") != "error":
+        return 0.0  # scikit-learn encodes unknown names as all zeros
+    return float(np.mean(coef))
+
+
+def _drop_indices(encoder):
+    drop_idx = getattr(encoder, "drop_idx_", None)
+    if drop_idx is None:
+        return [None] * len(encoder.categories_)
+    return [None if d is None else int(d) for d in drop_idx]
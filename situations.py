@@ -0,0 +1,175 @@
+"""
+Nearest historical chase situations for a match state.
+
+Every live second-innings ball state in deliveries.csv (runs still needed,
+balls left and wickets in hand all above zero) is indexed on
+
+    (runs_left, balls_left, wickets, target)
+
+in the app's terms (runs needed to win, the target to reach), one more
+than the training rows' runs to tie and first-innings total, with each
+axis scaled by WEIGHTS, so one wicket in hand counts as much as
+six runs or balls and the target only breaks ties between otherwise
+similar chases. A scipy KD-tree over the scaled points answers a query
+in about a tenth of a millisecond. Consecutive balls of one chase are nearly the
+same point, so nearest() keeps only the closest state of each match and
+returns k different chases with how each one ended, plus the share the
+batting side went on to win: a data-driven counterpart to the model's
+probability.
+
+    python situations.py build deliveries.csv [--matches matches.csv] [--output situations.npz]
+    python situations.py query 65 36 7 189 [-k 10]
+"""
+import argparse
+import io
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from artifact import atomic_write
+from delivery_store import read_deliveries
+from features import prepare_matches, second_innings_states
+
+DEFAULT_SITUATIONS_PATH = "situations.npz"
+KEYS = ('runs_left', 'balls_left', 'wickets', 'target')
+WEIGHTS = np.array([1.0, 1.0, 6.0, 0.25])
+DEFAULT_K = 10
+# Neighbour states fetched per match wanted, before keeping one per match
+OVERSAMPLE = 8
+
+Similar = namedtuple("Similar", ["rows", "distances", "wins", "win_rate"])
+
+
+class SituationIndex:
+    """Second-innings ball states in a KD-tree, with each state's match and result"""
+
+    def __init__(self, states, result, match_id, season, batting_team, bowling_team, city):
+        self.states = states              # (n, 4) int16 in KEYS order
+        self.result = result              # (n,) int8, 1 if the batting side won
+        self.match_id = match_id          # (n,) int32
+        self.season = season              # (n,) str
+        self.batting_team = batting_team  # (n,) str
+        self.bowling_team = bowling_team  # (n,) str
+        self.city = city                  # (n,) str
+        self._tree = cKDTree(states * WEIGHTS)
+
+    def __len__(self):
+        return len(self.result)
+
+    @classmethod
+    def build(cls, match, delivery):
+        """Index from matches.csv and deliveries.csv frames"""
+        return cls.from_states(second_innings_states(prepare_matches(match, delivery), delivery))
+
+    @classmethod
+    def from_states(cls, df):
+        """Index from features.second_innings_states() rows"""
+        # Training rows count runs to tie the first-innings total; queries
+        # (and the table) use the target and runs needed to win
+        df = df.assign(runs_left=df['runs_left'] + 1, target=df['total_runs_x'] + 1)
+        df = df[(df['runs_left'] > 0) & (df['balls_left'] > 0) & (df['wickets'] > 0)]
+        df = df.dropna(subset=list(KEYS))
+        return cls(
+            df[list(KEYS)].to_numpy(dtype=np.int16),
+            df['result'].to_numpy(dtype=np.int8),
+            df['match_id'].to_numpy(dtype=np.int32),
+            df['Season'].fillna("").to_numpy(dtype=str),
+            df['batting_team'].to_numpy(dtype=str),
+            df['bowling_team'].to_numpy(dtype=str),
+            df['city'].fillna("").to_numpy(dtype=str),
+        )
+
+    def nearest(self, runs_left, balls_left, wickets, target, k=DEFAULT_K):
+        """The k closest states from different matches, nearest first"""
+        point = np.array([runs_left, balls_left, wickets, target]) * WEIGHTS
+        fetch = k * OVERSAMPLE
+        while True:
+            distances, rows = self._tree.query(point, k=min(fetch, len(self)))
+            distances, rows = np.atleast_1d(distances), np.atleast_1d(rows)
+            # First occurrence of each match in distance order is its closest state
+            _, first = np.unique(self.match_id[rows], return_index=True)
+            if len(first) >= k or fetch >= len(self):
+                break
+            fetch *= 4
+        first = np.sort(first)[:k]
+        rows, distances = rows[first], distances[first]
+        wins = int(self.result[rows].sum())
+        return Similar(rows, distances, wins, wins / len(rows) if len(rows) else float("nan"))
+
+    def table(self, similar):
+        """Display frame for the states nearest() returned"""
+        rows = similar.rows
+        runs_left, balls_left, wickets, target = self.states[rows].T
+        return pd.DataFrame({
+            "Season": self.season[rows],
+            "Batting": self.batting_team[rows],
+            "Bowling": self.bowling_team[rows],
+            "City": self.city[rows],
+            "Target": target,
+            "Needed": runs_left,
+            "Balls": balls_left,
+            "Wickets": wickets,
+            "Result": np.where(self.result[rows] == 1, "Won", "Lost"),
+        })
+
+    def save(self, path=DEFAULT_SITUATIONS_PATH):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, states=self.states, result=self.result,
+                            match_id=self.match_id, season=self.season,
+                            batting_team=self.batting_team, bowling_team=self.bowling_team,
+                            city=self.city)
+        atomic_write(path, buffer.getvalue())
+
+    @classmethod
+    def load(cls, path=DEFAULT_SITUATIONS_PATH):
+        with np.load(path) as z:
+            return cls(z['states'], z['result'], z['match_id'], z['season'],
+                       z['batting_team'], z['bowling_team'], z['city'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nearest historical chase situations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bp = sub.add_parser("build", help="index the second-innings states of deliveries.csv")
+    bp.add_argument("deliveries", nargs="?", default="deliveries.csv",
+                    help="deliveries CSV or a store from delivery_store.py")
+    bp.add_argument("--matches", default="matches.csv")
+    bp.add_argument("--output", default=DEFAULT_SITUATIONS_PATH)
+    qp = sub.add_parser("query", help="closest situations to a chase state")
+    for key in KEYS:
+        qp.add_argument(key, type=int)
+    qp.add_argument("-k", type=int, default=DEFAULT_K)
+    qp.add_argument("--index", default=DEFAULT_SITUATIONS_PATH)
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Historical Situation Index")
+    print("=" * 60)
+    if args.command == "build":
+        start = time.perf_counter()
+        index = SituationIndex.build(pd.read_csv(args.matches), read_deliveries(args.deliveries))
+        index.save(args.output)
+        print(f"   States:    {len(index):,} from {len(np.unique(index.match_id)):,} chases")
+        print(f"   Built in:  {time.perf_counter() - start:.2f}s")
+        print(f"   ✅ Saved {args.output}")
+        return
+
+    start = time.perf_counter()
+    index = SituationIndex.load(args.index)
+    load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    similar = index.nearest(args.runs_left, args.balls_left, args.wickets, args.target, args.k)
+    query_ms = (time.perf_counter() - start) * 1000
+    print(f"   Needing {args.runs_left} off {args.balls_left} with {args.wickets} wickets "
+          f"in hand, chasing {args.target}")
+    print(f"   Loaded in {load_ms:.0f} ms, queried in {query_ms:.3f} ms\n")
+    print(index.table(similar).to_string(index=False))
+    print(f"\n   Batting side won {similar.wins} of {len(similar.rows)} "
+          f"({similar.win_rate:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Small DAG runner with content-hashed stage caching (used by retrain_model.py).
+
+A stage is a named function of the outputs of other stages. Its cache key
+hashes the stage name, its seed, its code, any shared data files and the
+keys of its inputs; source stages hash only their file contents. A
+stage's code is the source of its function and of the helpers it calls
+from the same script, the values of plain constants they use, and the
+files of the project modules they use, with those modules' own project
+imports. Editing one stage (or a module it uses) therefore re-runs that
+stage and what depends on it, not the whole graph. Every key is known
+before anything runs: stages whose output is already cached under their
+key are skipped (and not even loaded unless a stage that has to run needs
+them).
+
+Stages that do run go to a process pool as soon as their inputs are
+ready, so independent branches (first-innings totals and team
+normalization, strength table and ball states, ...) run concurrently.
+Each run seeds `random` and NumPy with the stage seed, which is derived
+from the run seed and the stage name. Every stage reports its peak
+resident memory above what its worker held when it started (from the
+kernel's counters, so it costs nothing). trace_memory adds tracemalloc's
+peak traced memory, which counts Python allocations exactly but slows
+the stage down. With profiling on (profiling.py) each
+stage also writes a profile.
+"""
+import hashlib
+import inspect
+import os
+import pickle
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+
+import numpy as np
+
+import profiling
+from artifact import atomic_write, sha256_files
+
+Stage = namedtuple("Stage", ["name", "fn", "inputs", "path"])
+StageReport = namedtuple("StageReport",
+                         ["name", "status", "seconds", "rss_mib", "peak_mib", "seed", "key"])
+
+
+def stage_seed(run_seed, name):
+    """Per-stage seed: stable for a (run seed, stage name) pair"""
+    return int(hashlib.sha256(f"{run_seed}:{name}".encode()).hexdigest()[:8], 16)
+
+
+# Constants whose value (repr) goes into the code key of a stage using them
+_CONSTANT_TYPES = (str, bytes, int, float, bool, tuple, list, dict, frozenset, type(None))
+
+
+def _names(code):
+    """Global names a code object and the functions/comprehensions nested in it use"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _names(const)
+    return names
+
+
+def _project_module(obj, root):
+    """Module defining obj, if it is a project file under root (not a library)"""
+    module = obj if inspect.ismodule(obj) else sys.modules.get(getattr(obj, "__module__", None) or "")
+    path = getattr(module, "__file__", None)
+    if path is None:
+        return None
+    path = os.path.abspath(path)
+    if not path.startswith(root + os.sep) or "site-packages" in path:
+        return None
+    return module
+
+
+def _module_files(module, root, files):
+    """Add module's file and those of the project modules it uses, transitively"""
+    path = os.path.abspath(module.__file__)
+    if path in files:
+        return
+    files.add(path)
+    for obj in list(vars(module).values()):
+        used = _project_module(obj, root)
+        if used is not None and used is not module:
+            _module_files(used, root, files)
+
+
+def code_key(fn):
+    """Hash of what a stage function runs: its source, the source of same-module
+    helpers it calls, the constants they use and the project module files they use
+    (partials include their bound arguments)"""
+    if isinstance(fn, partial):
+        return hashlib.sha256((code_key(fn.func) + repr(fn.args)
+                               + repr(sorted(fn.keywords.items()))).encode()).hexdigest()
+    root = os.path.dirname(os.path.abspath(inspect.getsourcefile(fn)))
+    digest = hashlib.sha256()
+    files, seen, todo = set(), set(), [fn]
+    while todo:
+        f = todo.pop()
+        if f in seen:
+            continue
+        seen.add(f)
+        digest.update(inspect.getsource(f).encode())
+        for name in sorted(_names(f.__code__)):
+            obj = f.__globals__.get(name)
+            if inspect.isfunction(obj) and obj.__module__ == f.__module__:
+                todo.append(obj)
+            elif isinstance(obj, _CONSTANT_TYPES):
+                digest.update(f"{name}={obj!r}".encode())
+            elif obj is not None:
+                module = _project_module(obj, root)
+                if module is not None and module.__name__ != f.__module__:
+                    _module_files(module, root, files)
+    digest.update(sha256_files(sorted(files)).encode())
+    return digest.hexdigest()
+
+
+def _max_rss():
+    """Peak resident memory of this process so far, in bytes"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _proc_rss():
+    """(current, peak) resident bytes from /proc/self/status"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":")
+                values[key] = int(value.split()[0]) * 1024
+    return values["VmRSS"], values["VmHWM"]
+
+
+class _RssMeter:
+    """Peak resident memory a stage adds to its worker. On Linux the
+    kernel's peak counter is reset first, so the figure is the stage's own
+    even in a worker that peaked higher earlier; elsewhere it is how much
+    the stage raised ru_maxrss (0 if an earlier stage peaked higher)."""
+
+    def __init__(self):
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            self.start = _proc_rss()[0]
+            self.proc = True
+        except OSError:
+            self.start = _max_rss()
+            self.proc = False
+
+    def growth(self):
+        return (_proc_rss()[1] if self.proc else _max_rss()) - self.start
+
+
+def _execute(name, fn, args, seed, trace_memory):
+    """Worker: run one stage with its seed, timing, peak RSS growth and
+    (optionally) peak traced memory"""
+    random.seed(seed)
+    np.random.seed(seed)
+    if trace_memory:
+        tracemalloc.start()
+    rss = _RssMeter()
+    start = time.perf_counter()
+    try:
+        with profiling.section(f"stage-{name}"):
+            out = fn(*args, seed=seed)
+        seconds = time.perf_counter() - start
+        rss_growth = max(rss.growth(), 0)
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return out, seconds, rss_growth, peak
+
+
+class StageGraph:
+    """Named stages, their dependencies and a content-addressed output cache"""
+
+    def __init__(self, seed=0, cache_dir=".retrain_cache", workers=None, shared_files=(),
+                 trace_memory=False):
+        """shared_files: data every computed stage may read (e.g. vocabulary.json)"""
+        self.seed = seed
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._shared = sha256_files([f for f in shared_files if os.path.exists(f)])
+
+    def source(self, name, path, fn):
+        """Stage reading a file: fn(path, seed=...); keyed by the file's contents"""
+        self.stages[name] = Stage(name, fn, (), path)
+
+    def add(self, name, fn, inputs=()):
+        """Stage computing fn(*outputs of inputs, seed=...)"""
+        missing = [i for i in inputs if i not in self.stages]
+        if missing:
+            raise KeyError(f"Stage {name!r} depends on unknown stage {missing[0]!r}")
+        self.stages[name] = Stage(name, fn, tuple(inputs), None)
+
+    def keys(self):
+        """Cache key of every stage, in dependency (insertion) order"""
+        keys = {}
+        for stage in self.stages.values():
+            digest = hashlib.sha256()
+            digest.update(stage.name.encode())
+            if stage.path is not None:
+                digest.update(sha256_files([stage.path]).encode())
+                keys[stage.name] = digest.hexdigest()
+                continue
+            digest.update(str(stage_seed(self.seed, stage.name)).encode())
+            digest.update(self._shared.encode())
+            digest.update(code_key(stage.fn).encode())
+            for name in stage.inputs:
+                digest.update(keys[name].encode())
+            keys[stage.name] = digest.hexdigest()
+        return keys
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load(self, key):
+        with open(self._cache_path(key), "rb") as f:
+            return pickle.load(f)
+
+    def run(self, targets, use_cache=True):
+        """Outputs of the target stages plus a StageReport per stage"""
+        keys = self.keys()
+        cached = {name for name, key in keys.items()
+                  if use_cache and os.path.exists(self._cache_path(key))}
+
+        # Stages to run: uncached ones that targets depend on
+        to_run, needed = [], set(targets)
+        for stage in reversed(list(self.stages.values())):
+            if stage.name in needed and stage.name not in cached:
+                to_run.append(stage.name)
+                needed.update(stage.inputs)
+        to_run.reverse()
+
+        values, reports = {}, {}
+
+        def value(name):
+            if name not in values:
+                values[name] = self._load(keys[name])
+            return values[name]
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pending, running = list(to_run), {}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while pending or running:
+                for name in [n for n in pending
+                             if all(i in values or i not in to_run
+                                    for i in self.stages[n].inputs)]:
+                    stage = self.stages[name]
+                    args = (stage.path,) if stage.path is not None else tuple(
+                        value(i) for i in stage.inputs)
+                    running[pool.submit(_execute, name, stage.fn, args,
+                                        stage_seed(self.seed, name), self.trace_memory)] = name
+                    pending.remove(name)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    out, seconds, rss, peak = future.result()
+                    values[name] = out
+                    atomic_write(self._cache_path(keys[name]), pickle.dumps(out))
+                    reports[name] = StageReport(name, "ran", seconds,
+                                                rss / 2**20,
+                                                None if peak is None else peak / 2**20,
+                                                stage_seed(self.seed, name), keys[name][:12])
+
+        for name in self.stages:
+            if name not in reports:
+                status = "cached" if name in cached else "unused"
+                reports[name] = StageReport(name, status, 0.0, None, None,
+                                            stage_seed(self.seed, name), keys[name][:12])
+        outputs = {name: value(name) for name in targets}
+        return outputs, [reports[name] for name in self.stages]
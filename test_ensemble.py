@@ -0,0 +1,58 @@
+"""
+Checks for the bootstrap ensemble's interval (ensemble.py) on models
+fitted to small synthetic chases: around the served probability, the
+band always contains it, including with the app's rounding.
+
+Usage:
+    python test_ensemble.py
+"""
+import sys
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from ensemble import fit_bootstrap
+from retrain_model import make_pipeline
+from schema import FEATURES, build_features
+from scoring import center_categories
+from test_first_innings import raw_states
+
+
+def main():
+    rng = np.random.default_rng(0)
+    X = build_features(raw_states(3000, 2, seed=0)).features[FEATURES]
+    y = (X['rrr'] < rng.uniform(6, 12, len(X))).astype(int)
+    groups = np.arange(len(X)) // 30   # 30 balls per "match"
+    served = center_categories(make_pipeline().fit(X, y), X)
+    ensemble = fit_bootstrap(served, X, y, groups, n_models=20)
+    # A served model fitted differently from the members, as a promoted
+    # model can be, so its probabilities fall outside the members' range
+    other = center_categories(make_pipeline(LogisticRegression(C=0.01, max_iter=1000)).fit(X, y), X)
+
+    states = build_features(raw_states(500, 2, seed=1)).features[FEATURES]
+    print("=" * 60)
+    print("Ensemble Interval Checks")
+    print("=" * 60)
+    checks = []
+    for label, model in (("served", served), ("differently fitted", other)):
+        p = model.predict_proba(states)[:, 1]
+        raw_low, raw_high = ensemble.interval(states)
+        low, high = ensemble.interval(states, center=p)
+        shown = np.round(p * 100, 2)
+        shown_low, shown_high = np.floor(low * 1000) / 10, np.ceil(high * 1000) / 10
+        outside = ((p < raw_low) | (p > raw_high)).mean()
+        print(f"   {label}: {outside:.1%} outside the raw member range")
+        checks.append(((low <= p).all() and (p <= high).all(),
+                       f"interval around the {label} probability contains it"))
+        checks.append(((shown_low <= shown).all() and (shown <= shown_high).all(),
+                       f"rounded as shown, it still contains the {label} probability"))
+    likely = (p > 0.01) & (p < 0.99)
+    checks.append((((high - low)[likely] > 0).all(), "intervals keep the members' spread"))
+    for ok, label in checks:
+        print(f"   {'✅' if ok else '❌'} {label}")
+    if not all(ok for ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Checks for the chase conditions features.py derives for rain-shortened
+(D/L) matches, on small hand-built matches.
+
+Usage:
+    python test_features.py
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from features import chase_conditions, prepare_matches
+from schema import CITIES, TEAMS, TOTAL_BALLS
+
+BAT_FIRST, CHASING = TEAMS[0], TEAMS[1]
+
+
+def innings(match_id, inning, overs, wickets=0, runs_per_ball=1):
+    """Deliveries of an innings that lasted `overs` overs, losing `wickets` on its last balls"""
+    balls = overs * 6
+    batting, bowling = (BAT_FIRST, CHASING) if inning == 1 else (CHASING, BAT_FIRST)
+    dismissed = np.full(balls, None, dtype=object)
+    if wickets:
+        dismissed[-wickets:] = "batter"
+    return pd.DataFrame({
+        "match_id": match_id, "inning": inning,
+        "batting_team": batting, "bowling_team": bowling,
+        "over": np.arange(balls) // 6 + 1, "ball": np.arange(balls) % 6 + 1,
+        "wide_runs": 0, "noball_runs": 0, "total_runs": runs_per_ball,
+        "player_dismissed": dismissed,
+    })
+
+
+def match(match_id, winner, dl_applied):
+    return {"id": match_id, "season": 2019, "city": CITIES[0], "team1": BAT_FIRST,
+            "team2": CHASING, "winner": winner, "dl_applied": dl_applied}
+
+
+def main():
+    # id: (first innings overs, wickets), (chase overs, wickets), winner, dl_applied
+    cases = {
+        1: ((20, 3), (12, 0), CHASING, 1),    # D/L, chase won early: allotment unknown
+        2: ((20, 3), (15, 4), BAT_FIRST, 1),  # D/L, chase ran out of overs: 15 overs
+        3: ((14, 10), (10, 2), CHASING, 1),   # D/L, first innings all out short
+        4: ((20, 5), (8, 10), BAT_FIRST, 1),  # D/L, chase all out short
+        5: ((20, 5), (12, 1), CHASING, 0),    # normal match won early: 20 overs
+    }
+    matches = pd.DataFrame([match(i, winner, dl) for i, (_, _, winner, dl) in cases.items()])
+    delivery = pd.concat([innings(i, 1, *first) for i, (first, _, _, _) in cases.items()]
+                         + [innings(i, 2, *chase) for i, (_, chase, _, _) in cases.items()],
+                         ignore_index=True)
+
+    print("=" * 60)
+    print("Feature Checks")
+    print("=" * 60)
+    cond = chase_conditions(matches, delivery).set_index("match_id")
+    match_df = prepare_matches(matches, delivery).set_index("id")
+    checks = [
+        (1 not in cond.index, "D/L match won early by the chase is dropped"),
+        (3 not in cond.index, "D/L match with a first innings all out short is dropped"),
+        (4 not in cond.index, "D/L match with the chase all out short is dropped"),
+        (2 in cond.index and cond.loc[2, "total_balls"] == 90,
+         "D/L chase that ran out of overs is allotted the overs reached"),
+        (2 in cond.index and cond.loc[2, "total_runs"] == round(120 * 90 / TOTAL_BALLS),
+         "its target is scaled by the balls available"),
+        (5 in cond.index and cond.loc[5, "total_balls"] == TOTAL_BALLS,
+         "a normal match won early keeps the full allotment"),
+        (sorted(match_df.index) == [2, 5], "prepare_matches keeps only estimable matches"),
+    ]
+    for ok, label in checks:
+        print(f"   {'✅' if ok else '❌'} {label}")
+    if not all(ok for ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Checks for first_innings.score_innings() on models fitted to small
+synthetic data: batches of either innings alone (without the other
+innings' columns), a mixed batch, and invalid rows.
+
+Usage:
+    python test_first_innings.py
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+
+from first_innings import FirstInningsModel, score_innings
+from retrain_model import make_pipeline
+from schema import CITIES, FEATURES, TEAMS, build_features, build_first_innings_features
+from scoring import center_categories
+
+
+def raw_states(n, innings, seed):
+    rng = np.random.default_rng(seed)
+    bat = rng.integers(len(TEAMS), size=n)
+    balls = rng.integers(1, 115, size=n)
+    states = pd.DataFrame({
+        "batting_team": np.array(TEAMS)[bat],
+        "bowling_team": np.array(TEAMS)[(bat + rng.integers(1, len(TEAMS), size=n)) % len(TEAMS)],
+        "city": np.array(CITIES)[rng.integers(len(CITIES), size=n)],
+        "score": (balls * rng.uniform(1.0, 1.6, size=n)).astype(int),
+        "wickets": rng.integers(0, 9, size=n),
+        "overs": balls // 6,
+        "balls": balls % 6,
+        "innings": innings,
+    })
+    if innings == 2:
+        states["target"] = states["score"] + rng.integers(1, 120, size=n)
+    return states
+
+
+def fitted_models(seed=0):
+    rng = np.random.default_rng(seed)
+    first = build_first_innings_features(raw_states(2000, 1, seed)).features
+    final_total = first['current_score'] + first['balls_left'] * rng.uniform(1.0, 1.8, len(first))
+    first_innings = FirstInningsModel.fit(make_pipeline(), make_pipeline(Ridge(alpha=1.0)), first,
+                                          (final_total > 165).astype(int), final_total)
+    chase_X = build_features(raw_states(2000, 2, seed + 1)).features[FEATURES]
+    chase_y = (chase_X['rrr'] < rng.uniform(6, 12, len(chase_X))).astype(int)
+    chase = center_categories(make_pipeline().fit(chase_X, chase_y), chase_X)
+    return chase, first_innings
+
+
+def main():
+    print("=" * 60)
+    print("First Innings Checks")
+    print("=" * 60)
+    chase, first_innings = fitted_models()
+    first = raw_states(50, 1, seed=10)
+    second = raw_states(50, 2, seed=11)
+
+    alone_first = score_innings(first, chase, first_innings)
+    expected_first = first_innings.project(build_first_innings_features(first).features)
+    alone_second = score_innings(second, chase, first_innings)
+    expected_second = chase.predict_proba(build_features(second).features[FEATURES])[:, 1]
+
+    mixed = pd.concat([second.iloc[:25], first, second.iloc[25:]], ignore_index=True)
+    scored = score_innings(mixed, chase, first_innings)
+    is_first = mixed['innings'].to_numpy() == 1
+
+    bad = pd.concat([first.iloc[:3], second.iloc[:3]], ignore_index=True)
+    bad.loc[1, "wickets"] = 10   # first innings already over
+    bad.loc[4, "score"] = 500    # chase already won
+    invalid = score_innings(bad, chase, first_innings)
+
+    checks = [
+        (alone_first.valid.all() and np.allclose(alone_first.win, expected_first.win)
+         and np.allclose(alone_first.projected, expected_first.total),
+         "first-innings batch without a target column"),
+        (alone_second.valid.all() and np.allclose(alone_second.win, expected_second)
+         and np.isnan(alone_second.projected).all(),
+         "second-innings batch matches the chase model"),
+        (scored.valid.all()
+         and np.allclose(scored.win[is_first], expected_first.win)
+         and np.allclose(scored.win[~is_first], expected_second)
+         and np.allclose(scored.quantiles[is_first], expected_first.quantiles),
+         "mixed batch matches each innings scored alone"),
+        ([e["row"] for e in invalid.errors] == [1, 4] and list(invalid.valid) == [1, 0, 1, 1, 0, 1]
+         and np.isnan(invalid.win[[1, 4]]).all(),
+         "invalid rows are NaN and reported against their own row"),
+    ]
+    for ok, label in checks:
+        print(f"   {'✅' if ok else '❌'} {label}")
+    if not all(ok for ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
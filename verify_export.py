@@ -0,0 +1,135 @@
+"""
+Equivalence and latency check for the exported models (export_model.py).
+
+Generates random valid match states (default 1M) through
+schema.build_features, exports pipe.pkl to a temporary NumPy module and
+ONNX graph, and compares both against pipe.predict_proba row by row.
+Also times a full batch and single-state calls for each scorer.
+
+Usage:
+    python verify_export.py [--model pipe.pkl] [--rows 1000000]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from export_model import export_numpy, export_onnx, load_scorer, onnx_feeds
+from schema import CITIES, TEAMS, build_features, model_features
+
+TOLERANCE = 1e-9
+SINGLE_CALLS = 2000
+
+
+def random_states(n, seed=0):
+    """n random valid second-innings states (model feature frame)"""
+    rng = np.random.default_rng(seed)
+    parts, have = [], 0
+    while have < n:
+        m = 2 * (n - have) + 1000
+        bat = rng.integers(len(TEAMS), size=m)
+        bowl = (bat + rng.integers(1, len(TEAMS), size=m)) % len(TEAMS)
+        total_balls = np.where(rng.random(m) < 0.1, rng.integers(30, 115, size=m), 120)
+        bowled = rng.integers(0, total_balls)
+        result = build_features({
+            "batting_team": np.asarray(TEAMS, dtype=object)[bat],
+            "bowling_team": np.asarray(TEAMS, dtype=object)[bowl],
+            "city": rng.choice(CITIES, size=m),
+            "score": rng.integers(0, 250, size=m),
+            "wickets": rng.integers(0, 10, size=m),
+            "target": rng.integers(60, 280, size=m),
+            "overs": bowled // 6,
+            "balls": bowled % 6,
+            "total_balls": total_balls,
+        })
+        valid = result.features[result.valid]
+        parts.append(valid)
+        have += len(valid)
+    return pd.concat(parts, ignore_index=True).iloc[:n]
+
+
+def load_module(path):
+    spec = importlib.util.spec_from_file_location("ipl_scorer", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - start, out
+
+
+def single_latency_us(fn, rows):
+    times = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        times.append(time.perf_counter() - start)
+    return np.percentile(times, [50, 99]) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check exported models against pipe.pkl")
+    parser.add_argument("--model", default="pipe.pkl")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("Model Export Verification")
+    print("=" * 70)
+    pipe, scorer = load_scorer(args.model)
+    columns = model_features(pipe)
+    states = random_states(args.rows)[columns]
+    # Older encoders reject names they never saw; compare on the ones they know
+    for column, cats, _ in scorer.categorical:
+        states = states[states[column].isin(cats)]
+    print(f"   States: {len(states):,} random valid second-innings states")
+
+    tmp = tempfile.mkdtemp(prefix="ipl_export_")
+    module = load_module(export_numpy(scorer, columns, os.path.join(tmp, "ipl_scorer.py")))
+    scorers = {"scikit-learn pipe.pkl": pipe.predict_proba,
+               "NumPy module": lambda df: module.predict_proba(dict(df.items()))}
+    try:
+        import onnxruntime
+        session = onnxruntime.InferenceSession(export_onnx(scorer, os.path.join(tmp, "pipe.onnx")))
+        scorers["ONNX (onnxruntime)"] = lambda df: session.run(None, onnx_feeds(df, scorer))[0]
+    except ImportError as e:
+        print(f"   ⚠️  ONNX skipped: {e} (pip install onnx onnxruntime)")
+
+    records = states.iloc[:SINGLE_CALLS].to_dict("records")
+    frames = [states.iloc[[i]] for i in range(SINGLE_CALLS)]
+    single = {
+        "scikit-learn pipe.pkl": lambda i: pipe.predict_proba(frames[i]),
+        "NumPy module": lambda i: module.predict_proba([records[i]]),
+    }
+    if "ONNX (onnxruntime)" in scorers:
+        feeds = [onnx_feeds(f, scorer) for f in frames]
+        single["ONNX (onnxruntime)"] = lambda i: session.run(None, feeds[i])
+
+    print(f"\n{'Scorer':<24}{'Batch (s)':>10}{'Rows/s':>13}{'p50 µs':>9}{'p99 µs':>9}{'Max |diff|':>13}")
+    reference, ok = None, True
+    for name, fn in scorers.items():
+        elapsed, proba = timed(fn, states)
+        if reference is None:
+            reference = proba[:, 1]
+        diff = float(np.max(np.abs(proba[:, 1] - reference)))
+        ok &= diff <= TOLERANCE
+        p50, p99 = single_latency_us(single[name], range(SINGLE_CALLS))
+        print(f"{name:<24}{elapsed:>10.3f}{len(states) / elapsed:>13,.0f}{p50:>9.1f}{p99:>9.1f}"
+              f"{diff:>13.2e}")
+
+    print("\n   ✅ Exports match pipe.predict_proba" if ok
+          else f"\n   ❌ Export differs from pipe.predict_proba by more than {TOLERANCE}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()